@@ -1,19 +1,20 @@
 import pandas as pd
-import numpy as np
 import streamlit as st
-from PIL import Image
-import folium
-from streamlit_folium import folium_static
-from locale import atof, setlocale, LC_NUMERIC
+import streamlit.components.v1 as components
 from dbutil import DbUtil  # Certifique-se de que o nome do arquivo é dbutil.py e o import está correto
+from mapview import CITY_MAPS
+from export import EXPORTS, EXPORT_FORMATS
+from instrument import PROFILER, instrument_page
 
 #--------- CLASSE: PÁGINA 'HOME' ----------------------------------------------
 class app_home():
     def __init__(self) -> None:
         self.dfhome: pd.core.frame.DataFrame = None
         self.util: DbUtil = None
+        self.country_options: list = None
 
     def BarraLateral(self) -> None:
+        from PIL import Image
         image_path = 'Restaurant_Icon.png'
         image = Image.open(image_path)
         st.sidebar.image(image, width=80)
@@ -23,7 +24,7 @@ class app_home():
         st.sidebar.write('Escolha os **PAÍSES** cujas **INFORMAÇÕES** deseja visualizar:')
 
         the_countries = self.util.get_all_countries()
-        default_countries = self.util.countries_with_more_restaurants(6)
+        default_countries = self.util.cached(self.util.rollup()).countries_with_more_restaurants(6)
         qty_countries = st.sidebar.radio("", ('Principais', 'Todos'), label_visibility="collapsed")
         if qty_countries == 'Todos':
             default_countries = the_countries
@@ -34,13 +35,10 @@ class app_home():
             default=default_countries
         )
 
-        self.dfhome = self.util.get_items_with_these_countries(country_options)
+        self.country_options = country_options
 
         st.sidebar.markdown("""---""")
-        csv_file = self.dfhome.to_csv()
-        txt = 'Dados tratados e com filtragem do usuário'
-        if st.sidebar.download_button('Baixar dados', csv_file, None, 'text/csv', help=txt):
-            st.sidebar.write('Download OK :thumbsup:')
+        self.download_section()
 
         st.sidebar.markdown("""---""")
         st.sidebar.write('')
@@ -48,10 +46,30 @@ class app_home():
         st.sidebar.caption(':blue[servicoseletricosloiola@gmail.com]')
         st.sidebar.caption('[github](https://github.com/MarceloAlmeida369)')
 
+    def download_section(self) -> None:
+        # O arquivo só é gerado quando pedido, e fica guardado por seleção e formato
+        txt = 'Dados tratados e com filtragem do usuário'
+        formato = st.sidebar.selectbox('Formato do arquivo:', list(EXPORT_FORMATS))
+        key = None
+        if self.util.dataset is not None:
+            key = (self.util.dataset.key, self.util.dataset.version, tuple(sorted(self.country_options)), formato)
+
+        path = EXPORTS.ready(key) if key is not None else None
+        if path is None and st.sidebar.button('Preparar arquivo', help=txt):
+            with st.spinner('Gerando arquivo...'):
+                path = EXPORTS.get_file(key, self.selected_rows(), formato)
+
+        if path is not None:
+            extensao, mime = EXPORT_FORMATS[formato]
+            with open(path, 'rb') as arquivo:
+                if st.sidebar.download_button('Baixar dados', arquivo, 'restaurantes' + extensao, mime, help=txt):
+                    st.sidebar.write('Download OK :thumbsup:')
+
     def MainPage(self):
         with st.container():
             col1, col2, col3 = st.columns(3)
             with col1:
+                from PIL import Image
                 image_path = 'Restaurant_Icon.png'
                 image = Image.open(image_path)
                 st.image(image, width=160)
@@ -75,46 +93,47 @@ class app_home():
             with col5:
                 st.write('**Tipos de culinárias ofertadas**')
 
+        # KPIs da tabela por país (kpis.py), combinando no máximo uma linha por país;
+        # esboços por país, exatos até seus limites (estimativas marcadas com ≈); RESTAURANTS_EXACT_STATS=1: contagens exatas
+        kpis = self.util.cached().home_kpis(self.country_options)
+        approx = lambda column: '≈ ' if column in kpis['approximate'] else ''
         with st.container():
             col1, col2, col3, col4, col5 = st.columns(5)
             with col1:
-                tot = len(self.dfhome['country_name'].unique())  # países
-                st.markdown('## **' + str(tot) + '**')
+                tot = kpis['country_name']  # países
+                st.markdown('## **' + approx('country_name') + str(tot) + '**')
             with col2:
-                tot = len(self.dfhome['city'].unique())  # cidades
-                st.markdown('## **' + str(tot) + '**')
+                tot = kpis['city']  # cidades
+                st.markdown('## **' + approx('city') + str(tot) + '**')
             with col3:
-                tot = len(self.dfhome['restaurant_name'].unique())  # restaurantes
+                tot = kpis['restaurant_name']  # restaurantes
                 txt = self.num_to_str(tot)
-                st.markdown('## **' + txt + '**')
+                st.markdown('## **' + approx('restaurant_name') + txt + '**')
             with col4:
-                df1 = self.dfhome['votes']  # avaliações
-                tot = df1.sum()
+                tot = kpis['votes']  # avaliações
                 txt = self.num_to_str(tot)
                 st.markdown('## **' + txt + '**')
             with col5:
-                tot = len(self.dfhome['unique_cuisine'].unique())  # culinárias
-                st.markdown('## **' + str(tot) + '**')
+                tot = kpis['unique_cuisine']  # culinárias
+                st.markdown('## **' + approx('unique_cuisine') + str(tot) + '**')
 
         st.markdown("""---""")
         self.country_map()
 
     def country_map(self) -> None:
-        colunas = ['city', 'aggregate_rating', 'rating_color', 'latitude', 'longitude']
-        df2 = self.dfhome.loc[:, colunas]
-        df3 = (df2.loc[:, :].groupby(['city', 'aggregate_rating', 'rating_color'])
-              .median()
-              .reset_index())
-
-        CityMap = folium.Map(zoom_start=11)
-
-        for _, location_info in df3.iterrows():
-            folium.Marker(
-                [location_info['latitude'], location_info['longitude']],
-                popup=location_info[['city', 'aggregate_rating']],
-                icon=folium.Icon(color=self.util.color_name(location_info['rating_color']))
-            ).add_to(CityMap)
-        folium_static(CityMap, width=1024, height=600)
+        # Marcadores agrupados (cluster) e HTML em cache por seleção de países.
+        # O índice espacial (spatial.py) não entra aqui: o mapa não faz consultas
+        # por ponto ou raio, só desenha as medianas por (país, cidade, nota, cor)
+        key = None
+        if self.util.dataset is not None:
+            key = (self.util.dataset.version, tuple(sorted(self.country_options)))
+        html = CITY_MAPS.get_html(key, self.selected_rows, self.util.color_name)
+        components.html(html, width=1024, height=600 + 10)
+
+    def selected_rows(self):
+        # Linhas dos países selecionados, lidas só para gerar o mapa ou o arquivo
+        # (RESTAURANTS_BACKEND=sqlite: uma consulta, sem dataframe em memória)
+        return self.util.get_items_with_these_countries(self.country_options)
 
     def num_to_str(self, inNUM: float) -> str:
         if inNUM < 10000:
@@ -132,14 +151,17 @@ def main():
     # Passe o caminho do arquivo diretamente
     csv_path = 'dataset/zomato.csv'
 
-    util = DbUtil()
-    util.LoadDataframe(csv_path)  # Passe o caminho do arquivo aqui
-    util.GeneralCleansing()  # Limpar e ajustar os dados
-
-    HomePage = app_home()
-    HomePage.util = util
-    HomePage.BarraLateral()
-    HomePage.MainPage()
+    # RESTAURANTS_PROFILE=1: tempos e memória por método, painel no fim da barra lateral
+    instrument_page(app_home)
+    with PROFILER.rerun('Home'):
+        util = DbUtil()
+        util.LoadShared(csv_path)  # Dados limpos uma vez por versão do arquivo, compartilhados entre sessões
+
+        HomePage = app_home()
+        HomePage.util = util
+        HomePage.BarraLateral()
+        HomePage.MainPage()
+    PROFILER.sidebar_panel()
 
 
 
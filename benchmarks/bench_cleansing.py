@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+import inflection
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from dbutil import DbUtil
+from synthetic import scaled_raw
+
+#--------- BENCHMARK: LIMPEZA VETORIZADA x LIMPEZA LINHA A LINHA --------------
+#
+# Compares DbUtil.GeneralCleansing (+ create_price_range_txt) against the
+# previous row-by-row implementation (per-row apply lambdas), on the CSV
+# replicated 1x, 10x and 100x. Both outputs must be identical.
+#
+#     python benchmarks/bench_cleansing.py [--scales 1 10 100] [--repeat 3]
+#
+
+#..... Previous implementation, kept here only as the reference
+def legacy_cleansing(util: DbUtil) -> pd.core.frame.DataFrame:
+    df = util.dtframe
+    cols = list(df.columns)
+    cols = list(map(lambda x: inflection.titleize(x), cols))
+    cols = list(map(lambda x: x.replace(" ", ""), cols))
+    df.columns = list(map(lambda x: inflection.underscore(x), cols))
+    df['country_name'] = df.loc[:, 'country_code'].apply(lambda x: util.country_name(x))
+    df.drop_duplicates(subset=['restaurant_id'], inplace=True)
+    df.drop(columns=['switch_to_order_menu'], inplace=True)
+    for col in ['restaurant_name', 'city', 'locality', 'locality_verbose']:
+        df[col] = df[col].str.strip()
+    df['unique_cuisine'] = ( df.loc[:, 'cuisines']
+                               .apply(lambda x: x.split(",")[0] if isinstance(x, str) else "") )
+    df['price_range_txt'] = df.loc[:, 'price_range'].apply(lambda x: util.create_price_tye(x))
+    return df
+
+#..... Current implementation
+def vectorized_cleansing(util: DbUtil) -> pd.core.frame.DataFrame:
+    util.GeneralCleansing()
+    util.create_price_range_txt()
+    return util.dtframe
+
+def time_cleansing(cleansing, raw: pd.core.frame.DataFrame, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        util = DbUtil()
+        util.dtframe = raw.copy()
+        start = time.perf_counter()
+        out = cleansing(util)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da limpeza vetorizada.')
+    parser.add_argument('--csv', default='dataset/zomato.csv')
+    parser.add_argument('--scales', nargs='+', type=int, default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    raw = pd.read_csv(args.csv)
+    print(f"{'scale':>6} {'rows':>10} {'legacy (s)':>11} {'vectorized (s)':>15} {'speedup':>8}")
+    for scale in args.scales:
+        df = scaled_raw(raw, scale)
+        t_old, out_old = time_cleansing(legacy_cleansing, df, args.repeat)
+        t_new, out_new = time_cleansing(vectorized_cleansing, df, args.repeat)
+        pd.testing.assert_frame_equal(out_old, out_new)
+        print(f'{scale:>5}x {len(df):>10} {t_old:>11.3f} {t_new:>15.3f} {t_old / t_new:>7.1f}x')
+
+#--------- START ME UP --------------------------------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import ast
+import glob
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from run import environment
+
+#--------- BENCHMARK: TEMPO DE IMPORTAÇÃO E PRIMEIRA RENDERIZAÇÃO DAS PÁGINAS --
+#
+# For each page script, in fresh interpreters (python -X importtime):
+#   imports: the script's module-level import statements alone
+#   render:  the whole first run of the script (Streamlit bare mode), i.e. the
+#            first request to a freshly started worker, and the import time
+#            spent inside it (libraries imported at first use included)
+# Times are medians of --repeat runs and move with the machine's load; the
+# module counts do not, so they show what each change stopped importing.
+# The tracked report is benchmarks/importtime.json:
+#
+#     python benchmarks/bench_imports.py [--repeat 5] --output benchmarks/importtime.json
+#     python benchmarks/bench_imports.py compare old.json new.json
+#
+
+#..... One line of -X importtime: self us, cumulative us, nesting, module
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+#..... First run of a page, timed inside the interpreter (bare mode: no server)
+RENDER_CODE = """
+import logging, runpy, sys, time
+logging.disable(logging.WARNING)
+start = time.perf_counter()
+runpy.run_path(sys.argv[1], run_name='__main__')
+print(time.perf_counter() - start)
+"""
+
+#..... Home.py and the pages, in the sidebar order
+def app_scripts() -> list:
+    return ['Home.py'] + sorted(glob.glob('pages/*.py', root_dir=ROOT))
+
+#..... The module-level import statements of 'inScript', as source code
+def script_imports(inScript) -> str:
+    with open(os.path.join(ROOT, inScript), encoding='utf-8') as fp:
+        source = fp.read()
+    tree = ast.parse(source)
+    return '\n'.join(ast.get_source_segment(source, node) for node in tree.body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+#..... Parsed -X importtime lines: [(self us, cumulative us, depth, module)]
+def importtime_records(inStderr: str) -> list:
+    records = []
+    for line in inStderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            records.append((int(match[1]), int(match[2]), len(match[3]) // 2, match[4]))
+    return records
+
+#..... Fresh interpreter with -X importtime: (stdout, records)
+def profile(inArgs: list) -> tuple:
+    proc = subprocess.run([sys.executable, '-X', 'importtime'] + inArgs,
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return proc.stdout, importtime_records(proc.stderr)
+
+def measure(inScript, inRepeat: int) -> dict:
+    imports, streamlit, render, render_imports = [], [], [], []
+    top = {}
+    for _ in range(inRepeat):
+        _, records = profile(['-c', script_imports(inScript)])
+        modules = len(records)
+        imports.append(sum(r[0] for r in records) / 1000)
+        streamlit.append(sum(r[1] for r in records if r[2] == 0 and r[3] == 'streamlit') / 1000)
+        for self_us, cumulative, depth, module in records:
+            if depth == 0:
+                top.setdefault(module, []).append(cumulative / 1000)
+
+        stdout, records = profile(['-c', RENDER_CODE, inScript])
+        render.append(float(stdout.strip().splitlines()[-1]) * 1000)
+        render_imports.append(sum(r[0] for r in records) / 1000)
+        render_modules = len(records)
+
+    heaviest = sorted(((module, statistics.median(ms)) for module, ms in top.items()),
+                      key=lambda x: -x[1])[:10]
+    return {
+        'script': inScript,
+        'imports_ms': statistics.median(imports),
+        'modules': modules,
+        'streamlit_ms': statistics.median(streamlit),
+        'render_ms': statistics.median(render),
+        'render_imports_ms': statistics.median(render_imports),
+        'render_modules': render_modules,
+        'heaviest_imports': [[module, round(ms, 2)] for module, ms in heaviest],
+    }
+
+#----- COMMANDS ----------------------------------------------------------------
+
+def command_run(args) -> int:
+    results = []
+    print(f'{"script":<30} {"imports":>9} {"modules":>8} {"streamlit":>10} {"render":>9} {"render imports":>15}',
+          file=sys.stderr)
+    for script in args.scripts:
+        result = measure(script, args.repeat)
+        results.append(result)
+        print(f'{script:<30} {result["imports_ms"]:>7.1f}ms {result["modules"]:>8} {result["streamlit_ms"]:>8.1f}ms '
+              f'{result["render_ms"]:>7.1f}ms {result["render_imports_ms"]:>13.1f}ms', file=sys.stderr)
+
+    report = {'environment': environment(), 'results': results}
+    text = json.dumps(report, indent=1, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            fp.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+def command_compare(args) -> int:
+    with open(args.baseline, encoding='utf-8') as fp:
+        old = {r['script']: r for r in json.load(fp)['results']}
+    with open(args.candidate, encoding='utf-8') as fp:
+        new = {r['script']: r for r in json.load(fp)['results']}
+
+    print(f'{"script":<30} {"imports old":>11} {"imports new":>11} {"modules":>11} '
+          f'{"render old":>10} {"render new":>10} {"ratio":>6}')
+    for script in sorted(old.keys() & new.keys()):
+        o, n = old[script], new[script]
+        ratio = n['render_ms'] / o['render_ms'] if o['render_ms'] else float('inf')
+        print(f'{script:<30} {o["imports_ms"]:>9.1f}ms {n["imports_ms"]:>9.1f}ms '
+              f'{o["modules"]:>5}->{n["modules"]:<5} '
+              f'{o["render_ms"]:>8.1f}ms {n["render_ms"]:>8.1f}ms {ratio:>6.2f}')
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de importação (-X importtime) das páginas.')
+    sub = parser.add_subparsers(dest='command')
+
+    run = sub.add_parser('run', help='mede as páginas (padrão)')
+    for p in (parser, run):
+        p.add_argument('--scripts', nargs='+', default=app_scripts())
+        p.add_argument('--repeat', type=int, default=5)
+        p.add_argument('--output', default=None, help='arquivo JSON de saída (padrão: stdout)')
+
+    compare = sub.add_parser('compare', help='compara dois relatórios JSON')
+    compare.add_argument('baseline')
+    compare.add_argument('candidate')
+
+    args = parser.parse_args()
+    if args.command == 'compare':
+        return command_compare(args)
+    return command_run(args)
+
+#--------- START ME UP --------------------------------------------------------
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import argparse
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from dbutil import DbUtil
+from synthetic import scaled_raw
+
+#--------- BENCHMARK: MEMÓRIA DO DATAFRAME LIMPO x ESQUEMA COMPACTO -----------
+#
+# Memory held by the cleaned frame before and after DbUtil.CompactSchema, on
+# the CSV replicated 1x, 10x and 100x, with the per-column report of the
+# largest scale.
+#
+#     python benchmarks/bench_memory.py [--scales 1 10 100]
+#
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default='dataset/zomato.csv')
+    parser.add_argument('--scales', nargs='+', type=int, default=[1, 10, 100])
+    args = parser.parse_args()
+
+    raw = pd.read_csv(args.csv)
+    print(f'{"scale":>6} {"rows":>10} {"before MiB":>11} {"after MiB":>10} {"ratio":>7}')
+    for scale in args.scales:
+        util = DbUtil()
+        util.dtframe = scaled_raw(raw, scale)
+        util.GeneralCleansing()
+        report = util.CompactSchema()
+        total = report.loc['total']
+        print(f'{scale:>5}x {len(util.dtframe):>10} {total["before"] / 2**20:>11.2f} '
+              f'{total["after"] / 2**20:>10.2f} {total["ratio"]:>7.3f}')
+
+    print()
+    print(report.to_string())
+
+#--------- START ME UP --------------------------------------------------------
+if __name__ == "__main__":
+    main()
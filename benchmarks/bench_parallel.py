@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from dbutil import DbUtil
+from rollup import rollup_cells
+from run import environment
+
+#--------- BENCHMARK: CUBO ROLLUP SERIAL x PARTICIONADO EM PARALELO -----------
+#
+# Time to build the rollup cells from the cleaned frame replicated up to
+# --rows rows (default 10M), serially and with 2, 4, ... worker processes,
+# checking that every parallel build is identical to the serial one.
+# Processes only help with several cores: see the 'cpus' of the report.
+# The tracked report is benchmarks/parallel.json:
+#
+#     python benchmarks/bench_parallel.py [--rows 10000000] [--workers 1 2 4 8] --output benchmarks/parallel.json
+#
+
+#..... Cleaned frame replicated until 'inRows' rows, with distinct restaurant ids
+def scaled_cleaned(inCSVfile, inRows: int) -> pd.core.frame.DataFrame:
+    util = DbUtil()
+    util.LoadDataframe(inCSVfile)
+    util.GeneralCleansing()
+    base = util.dtframe
+    step = int(base['restaurant_id'].max()) + 1
+    copies = []
+    for i in range(-(-inRows // len(base))):
+        part = base.copy()
+        part['restaurant_id'] = part['restaurant_id'] + i * step
+        copies.append(part)
+    return pd.concat(copies, ignore_index=True).iloc[:inRows]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default='dataset/zomato.csv')
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None, help='arquivo JSON de saída')
+    args = parser.parse_args()
+
+    df = scaled_cleaned(args.csv, args.rows)
+    print(f'rows {len(df)}, cores {os.cpu_count()}')
+    print(f'{"workers":>8} {"best s":>9} {"speedup":>8} {"identical":>10}')
+    serial, baseline = None, None
+    results = []
+    for workers in args.workers:
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            cells = rollup_cells(df, workers)
+            times.append(time.perf_counter() - start)
+        if serial is None:
+            serial, baseline = cells, min(times)
+        same = cells.equals(serial)
+        print(f'{workers:>8} {min(times):>9.3f} {baseline / min(times):>8.2f} {str(same):>10}')
+        results.append({'workers': workers, 'best_s': round(min(times), 3),
+                        'speedup': round(baseline / min(times), 2), 'identical': same})
+
+    if args.output:
+        report = {'environment': environment(), 'rows': len(df), 'results': results}
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            fp.write(json.dumps(report, indent=1) + '\n')
+
+#--------- START ME UP --------------------------------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+#--------- SUÍTE DE BENCHMARKS: CARGA, LIMPEZA, FILTROS E AGREGAÇÕES ----------
+#
+# Each (case, scale) runs in its own process, so peak RSS is not polluted by
+# the previous cases. Scales replicate dataset/zomato.csv N times.
+#
+#     python benchmarks/run.py --scales 1 10 100 1000 --output new.json
+#     python benchmarks/run.py compare old.json new.json [--threshold 0.10]
+#
+
+#..... Dashboard defaults: 6 countries and 12 cuisines with more restaurants
+def dashboard_selection(util):
+    countries = util.rollup().countries_with_more_restaurants(6)
+    cuisines = util.rollup().cuisines_with_more_restaurants(12)
+    return countries, cuisines
+
+#..... Cleaned, shared engine over the scaled CSV, plus the filtered frames
+def engine_context(csv_path):
+    from dbutil import DbUtil
+    util = DbUtil()
+    util.LoadShared(csv_path)
+    countries, cuisines = dashboard_selection(util)
+    df_countries = util.get_items_with_these_countries(countries)
+    df_cuisines = util.get_items_with_these_cuisines(df_countries, cuisines)
+    return {'util': util, 'countries': countries, 'cuisines': cuisines,
+            'df_countries': df_countries, 'df_cuisines': df_cuisines}
+
+def raw_context(csv_path):
+    import pandas as pd
+    return {'csv': csv_path, 'raw': pd.read_csv(csv_path)}
+
+#..... Each case: (context builder, per-run setup (not timed), timed body)
+def case_load(ctx, _):
+    from dbutil import DbUtil
+    DbUtil().LoadDataframe(ctx['csv'])
+
+def setup_cleanse(ctx):
+    from dbutil import DbUtil
+    util = DbUtil()
+    util.dtframe = ctx['raw'].copy()
+    return util
+
+def case_cleanse(ctx, util):
+    util.GeneralCleansing()
+
+def case_filter_countries(ctx, _):
+    ctx['util'].get_items_with_these_countries(ctx['countries'])
+
+def case_filter_cuisines(ctx, _):
+    ctx['util'].get_items_with_these_cuisines(ctx['df_countries'], ctx['cuisines'])
+
+def case_filter_serving_cuisines(ctx, _):
+    ctx['util'].get_items_serving_cuisines(ctx['df_countries'], ctx['cuisines'])
+
+def case_cuisines_per_city(ctx, _):
+    ctx['util'].cuisine_index().qty_cuisines_per_city(ctx['countries'])
+
+def case_best_restaurants_from_cuisine(ctx, _):
+    for cuisine in ctx['cuisines'][:5]:
+        ctx['util'].best_restaurants_from_cuisine(cuisine, ctx['df_cuisines'])
+
+def case_best_restaurants(ctx, _):
+    ctx['util'].best_restaurants(ctx['df_cuisines'])
+
+def case_best_restaurants_top_k(ctx, _):
+    ctx['util'].best_restaurants(ctx['df_cuisines'], 20)
+
+def case_best_per_cuisine_cards(ctx, _):
+    ctx['util'].best_restaurants_per_cuisine(ctx['cuisines'][:5], 1, ctx['countries'])
+
+def case_best_cuisines(ctx, _):
+    ctx['util'].best_cuisines(False, ctx['df_cuisines'])
+
+def case_country_aggregations(ctx, _):
+    util, df = ctx['util'], ctx['df_countries']
+    util.qty_restaurants_per_country(df)
+    util.qty_cities_per_country(df)
+    util.mean_rating_per_country(df)
+    util.mean_costfor2_per_country(df)
+
+def case_rollup_country_aggregations(ctx, _):
+    cube, countries = ctx['util'].rollup(), ctx['countries']
+    cube.qty_restaurants_per_country(countries)
+    cube.qty_cities_per_country(countries)
+    cube.mean_rating_per_country(countries)
+    cube.mean_costfor2_per_country(countries)
+
+CASES = {
+    'load':                          (lambda csv: {'csv': csv}, None, case_load),
+    'cleanse':                       (raw_context, setup_cleanse, case_cleanse),
+    'filter_countries':              (engine_context, None, case_filter_countries),
+    'filter_cuisines':               (engine_context, None, case_filter_cuisines),
+    'filter_serving_cuisines':       (engine_context, None, case_filter_serving_cuisines),
+    'cuisines_per_city':             (engine_context, None, case_cuisines_per_city),
+    'best_restaurants_from_cuisine': (engine_context, None, case_best_restaurants_from_cuisine),
+    'best_restaurants':              (engine_context, None, case_best_restaurants),
+    'best_restaurants_top_k':        (engine_context, None, case_best_restaurants_top_k),
+    'best_per_cuisine_cards':        (engine_context, None, case_best_per_cuisine_cards),
+    'best_cuisines':                 (engine_context, None, case_best_cuisines),
+    'country_aggregations':          (engine_context, None, case_country_aggregations),
+    'rollup_country_aggregations':   (engine_context, None, case_rollup_country_aggregations),
+}
+
+#..... Peak resident set size of this process, in bytes
+def peak_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+#..... Run one case in this process and return its measurements
+def measure(case: str, csv_path: str, repeat: int) -> dict:
+    build, setup, body = CASES[case]
+    ctx = build(csv_path)
+
+    # Warm-up run: first-use indexes and caches are not part of the timing
+    body(ctx, setup(ctx) if setup else None)
+    rss_before = peak_rss()
+
+    times = []
+    for _ in range(repeat):
+        state = setup(ctx) if setup else None
+        start = time.perf_counter()
+        body(ctx, state)
+        times.append(time.perf_counter() - start)
+    rss_peak = peak_rss()
+
+    # Allocations in a separate run: tracemalloc slows everything down
+    state = setup(ctx) if setup else None
+    tracemalloc.start()
+    body(ctx, state)
+    alloc_current, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'case': case,
+        'repeat': repeat,
+        'wall_min_s': min(times),
+        'wall_median_s': statistics.median(times),
+        'wall_mean_s': statistics.fmean(times),
+        'rss_before_bytes': rss_before,
+        'rss_peak_bytes': rss_peak,
+        'alloc_peak_bytes': alloc_peak,
+        'alloc_retained_bytes': alloc_current,
+    }
+
+def environment() -> dict:
+    import numpy as np
+    import pandas as pd
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+#----- COMMANDS ----------------------------------------------------------------
+
+def command_run(args) -> int:
+    from synthetic import scaled_csv
+    import pandas as pd
+
+    results = []
+    for scale in args.scales:
+        csv_path = scaled_csv(args.csv, scale)
+        rows = len(pd.read_csv(csv_path, usecols=[0]))
+        for case in args.cases:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), 'worker',
+                                   '--case', case, '--csv', csv_path, '--repeat', str(args.repeat)],
+                                  cwd=ROOT, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                return proc.returncode
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            result.update(scale=scale, rows=rows)
+            results.append(result)
+            print(f"{case:<31} {scale:>5}x {result['wall_median_s'] * 1000:>10.2f} ms "
+                  f"{result['rss_peak_bytes'] / 2**20:>8.1f} MiB rss "
+                  f"{result['alloc_peak_bytes'] / 2**20:>8.1f} MiB alloc", file=sys.stderr)
+
+    report = {'environment': environment(), 'results': results}
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            fp.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+def command_worker(args) -> int:
+    os.chdir(ROOT)
+    print(json.dumps(measure(args.case, args.csv, args.repeat)))
+    return 0
+
+def command_compare(args) -> int:
+    with open(args.baseline) as fp:
+        old = {(r['case'], r['scale']): r for r in json.load(fp)['results']}
+    with open(args.candidate) as fp:
+        new = {(r['case'], r['scale']): r for r in json.load(fp)['results']}
+
+    regressions = 0
+    print(f"{'case':<31} {'scale':>6} {'time old':>10} {'time new':>10} {'ratio':>7} "
+          f"{'rss ratio':>9} {'alloc ratio':>11}")
+    for key in sorted(old.keys() & new.keys()):
+        o, n = old[key], new[key]
+        ratio = n['wall_median_s'] / o['wall_median_s'] if o['wall_median_s'] else float('inf')
+        rss = n['rss_peak_bytes'] / o['rss_peak_bytes'] if o['rss_peak_bytes'] else float('inf')
+        alloc = n['alloc_peak_bytes'] / o['alloc_peak_bytes'] if o['alloc_peak_bytes'] else float('inf')
+        flag = ''
+        if ratio > 1 + args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            flag = '  faster'
+        print(f'{key[0]:<31} {key[1]:>5}x {o["wall_median_s"] * 1000:>8.2f}ms {n["wall_median_s"] * 1000:>8.2f}ms '
+              f'{ratio:>7.2f} {rss:>9.2f} {alloc:>11.2f}{flag}')
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f'{key[0]:<31} {key[1]:>5}x  only in {"baseline" if key in old else "candidate"}')
+    return 1 if regressions else 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks dos caminhos críticos do DbUtil.')
+    sub = parser.add_subparsers(dest='command')
+
+    run = sub.add_parser('run', help='executa a suíte (padrão)')
+    for p in (parser, run):
+        p.add_argument('--csv', default='dataset/zomato.csv')
+        p.add_argument('--scales', nargs='+', type=int, default=[1, 10, 100])
+        p.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+        p.add_argument('--repeat', type=int, default=5)
+        p.add_argument('--output', default=None, help='arquivo JSON de saída (padrão: stdout)')
+
+    worker = sub.add_parser('worker', help=argparse.SUPPRESS)
+    worker.add_argument('--case', required=True, choices=list(CASES))
+    worker.add_argument('--csv', required=True)
+    worker.add_argument('--repeat', type=int, default=5)
+
+    compare = sub.add_parser('compare', help='compara dois resultados JSON')
+    compare.add_argument('baseline')
+    compare.add_argument('candidate')
+    compare.add_argument('--threshold', type=float, default=0.10,
+                         help='variação relativa do tempo mediano tolerada (padrão: 0.10)')
+
+    args = parser.parse_args()
+    if args.command == 'worker':
+        return command_worker(args)
+    if args.command == 'compare':
+        return command_compare(args)
+    return command_run(args)
+
+#--------- START ME UP --------------------------------------------------------
+if __name__ == "__main__":
+    sys.exit(main())
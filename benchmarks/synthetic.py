@@ -0,0 +1,34 @@
+import os
+import tempfile
+import pandas as pd
+
+#--------- DADOS SINTÉTICOS: zomato.csv REPLICADO N VEZES ---------------------
+
+#..... Raw CSV replicated 'scale' times, with distinct restaurant ids per copy
+def scaled_raw(raw: pd.core.frame.DataFrame, scale: int) -> pd.core.frame.DataFrame:
+    copies = []
+    step = int(raw['Restaurant ID'].max()) + 1
+    for i in range(scale):
+        part = raw.copy()
+        part['Restaurant ID'] = part['Restaurant ID'] + i * step
+        copies.append(part)
+    return pd.concat(copies, ignore_index=True)
+
+#..... CSV file of the scaled data, written once and reused by later runs
+def scaled_csv(inCSVfile, scale: int, inDirectory=None) -> str:
+    if scale == 1:
+        return inCSVfile
+    directory = inDirectory or os.path.join(tempfile.gettempdir(), 'restaurants_bench')
+    os.makedirs(directory, exist_ok=True)
+    stat = os.stat(inCSVfile)
+    name = f'{os.path.splitext(os.path.basename(inCSVfile))[0]}_{stat.st_size}_{stat.st_mtime_ns}_x{scale}.csv'
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        scaled_raw(pd.read_csv(inCSVfile), scale).to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    return path
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
@@ -0,0 +1,44 @@
+import argparse
+import time
+from dbutil import DbUtil, file_digest
+from rollup import RollupCube
+
+#--------- BUILD: SNAPSHOT COLUNAR DOS DADOS JÁ LIMPOS -------------------------
+#
+# Executa a limpeza (GeneralCleansing) uma única vez e grava o resultado em
+# um arquivo Arrow IPC tipado, ao lado do CSV (dataset/zomato.arrow).
+# O app carrega esse arquivo (sem parse nem limpeza) em vez do CSV.
+# Também grava as células do cubo rollup (dataset/zomato.cube.arrow),
+# agregadas em processos paralelos: aqui não há threads, então o fork é
+# seguro (no servidor o cubo só usaria threads). Rodar após cada deploy ou
+# atualização do CSV:
+#
+#     python build_snapshot.py [dataset/zomato.csv] [--workers N]
+#
+def main():
+    parser = argparse.ArgumentParser(description='Gera o snapshot colunar dos dados limpos.')
+    parser.add_argument('csv', nargs='?', default='dataset/zomato.csv', help='arquivo CSV de origem')
+    parser.add_argument('-o', '--output', default=None, help='arquivo de saída (padrão: <csv>.arrow)')
+    parser.add_argument('--workers', type=int, default=0, help='processos do cubo (padrão: todos os núcleos)')
+    args = parser.parse_args()
+
+    output = args.output or DbUtil.snapshot_file(args.csv)
+    digest = file_digest(args.csv)
+
+    start = time.perf_counter()
+    util = DbUtil()
+    util.LoadDataframe(args.csv)
+    util.GeneralCleansing()
+    util.SaveSnapshot(output, digest)
+    elapsed = time.perf_counter() - start
+    print(f'{output}: {len(util.dtframe)} linhas, {elapsed:.2f}s')
+
+    start = time.perf_counter()
+    cube = RollupCube(util.dtframe, args.workers or None)
+    DbUtil.SaveCube(cube, DbUtil.cube_file(args.csv), digest)
+    elapsed = time.perf_counter() - start
+    print(f'{DbUtil.cube_file(args.csv)}: {len(cube.cells)} células, {elapsed:.2f}s')
+
+#--------- START ME UP --------------------------------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+
+import numpy as np
+import pandas as pd
+
+#--------- CLASSE: ÍNDICE INVERTIDO DE CULINÁRIAS (TODAS, NÃO SÓ A PRIMEIRA) --
+class CuisineIndex():
+
+    #----- INITIAL METHODS: CONSTRUCTOR ---------------------------------------
+    #..... CONSTRUCTOR: split every 'cuisines' list once, at load time
+    def __init__(self, inDF: pd.core.frame.DataFrame) -> None:
+        #
+        # Sparse restaurant x cuisine incidence matrix, with numpy arrays only:
+        #   CSR (by row):      row_ptr[i]:row_ptr[i+1] -> cuisine ids of row i
+        #   CSC (by cuisine):  col_ptr[c]:col_ptr[c+1] -> row positions serving c
+        # plus a (city x cuisine) bitmap for the per-city questions.
+        #
+        self.rows = len(inDF)
+
+        # Split each distinct 'cuisines' text once; rows reuse the parsed list
+        codes, texts = pd.factorize(inDF['cuisines'])
+        parsed = [normalized_cuisines(text) for text in texts]
+        self.vocabulary = sorted({name for names in parsed for name in names})
+        self.ids = {name: i for i, name in enumerate(self.vocabulary)}
+        lists = [sorted({self.ids[name] for name in names}) for names in parsed] + [[]]   # code -1: no cuisine
+        lengths = np.array([len(ids) for ids in lists])
+        text_ptr = np.concatenate(([0], np.cumsum(lengths)))
+        text_cuisines = np.array([i for ids in lists for i in ids], dtype=np.int32)
+
+        # Rows copy the segment of their text: one gather, no loop per row
+        row_lengths = lengths[codes]
+        self.row_ptr = np.concatenate(([0], np.cumsum(row_lengths)))
+        entry_rows = np.repeat(np.arange(self.rows), row_lengths)
+        offsets = np.arange(self.row_ptr[-1]) - self.row_ptr[entry_rows]
+        self.row_cuisines = text_cuisines[text_ptr[codes][entry_rows] + offsets]
+
+        order = np.argsort(self.row_cuisines, kind='stable')
+        self.cuisine_rows = entry_rows[order]              # ascending inside each cuisine
+        self.col_ptr = np.searchsorted(self.row_cuisines[order], np.arange(len(self.vocabulary) + 1))
+
+        # Ratings for the per-cuisine means
+        self.ratings = inDF['aggregate_rating'].to_numpy(dtype=float, na_value=np.nan)
+
+        # (country, city) x cuisine: does any restaurant of the city serve it?
+        cities = inDF[['country_name', 'city']].astype(object)
+        city_codes, city_keys = pd.factorize(pd.MultiIndex.from_frame(cities))
+        self.city_keys = city_keys.to_frame(index=False, name=['country_name', 'city'])
+        self.city_cuisines = np.zeros((len(city_keys), len(self.vocabulary)), dtype=bool)
+        self.city_cuisines[city_codes[entry_rows], self.row_cuisines] = True
+        self.city_counts = self.city_cuisines.sum(axis=1)
+        return
+
+    #..... Row positions (ascending) serving 'cuisine'
+    def rows_of(self, cuisine) -> np.ndarray:
+        i = self.ids.get(cuisine)
+        if i is None:
+            return np.empty(0, dtype=int)
+        return self.cuisine_rows[self.col_ptr[i]:self.col_ptr[i + 1]]
+
+    #..... Bitmap of the rows serving any (or all, with inMatchAll) of the cuisines
+    def bitmap(self, list_of_cuisines, inMatchAll=False) -> np.ndarray:
+        if not inMatchAll:
+            mask = np.zeros(self.rows, dtype=bool)
+            for cuisine in list_of_cuisines:
+                mask[self.rows_of(cuisine)] = True
+            return mask
+
+        wanted = set(list_of_cuisines)
+        if not wanted:
+            return np.ones(self.rows, dtype=bool)
+        hits = np.zeros(self.rows, dtype=np.int32)
+        for cuisine in wanted:
+            hits[self.rows_of(cuisine)] += 1
+        return hits == len(wanted)
+
+    #----- AGGREGATES FROM THE MATRIX (optionally only rows in 'inMask') ------
+
+    #..... Restaurants and mean rating per cuisine served (any position in the list)
+    def aggregates(self, inMask=None) -> pd.core.frame.DataFrame:
+        cuisines = self.row_cuisines
+        ratings = np.repeat(self.ratings, np.diff(self.row_ptr))
+        if inMask is not None:
+            keep = np.repeat(inMask, np.diff(self.row_ptr))
+            cuisines, ratings = cuisines[keep], ratings[keep]
+
+        rated = ~np.isnan(ratings)
+        size = len(self.vocabulary)
+        restaurants = np.bincount(cuisines, minlength=size)
+        rating_sum = np.bincount(cuisines[rated], weights=ratings[rated], minlength=size)
+        rating_count = np.bincount(cuisines[rated], minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = rating_sum / rating_count
+
+        df = pd.DataFrame({'cuisine': self.vocabulary,
+                           'restaurants': restaurants,
+                           'aggregate_rating': mean})
+        df = df.loc[df['restaurants'] > 0]
+        return df.sort_values(by=['restaurants', 'cuisine'], ascending=[False, True]).reset_index(drop=True)
+
+    #..... Distinct cuisines served per city: OR of the restaurants' bitmaps
+    #      (ties by country and city, as SqlBackend.qty_cuisines_per_city)
+    def qty_cuisines_per_city(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        df = self.city_keys.copy()
+        df['unique_cuisine'] = self.city_counts
+        if list_of_countries is not None:
+            df = df.loc[df['country_name'].isin(list_of_countries)]
+        return ( df.sort_values(by=['unique_cuisine', 'country_name', 'city'], ascending=[False, True, True])
+                   .reset_index(drop=True) )
+
+
+#..... Cuisine names of one 'cuisines' text: split on commas, trimmed, spaces collapsed
+def normalized_cuisines(inText) -> list:
+    if not isinstance(inText, str):
+        return []
+    names = (' '.join(name.split()) for name in inText.split(','))
+    return [name for name in names if name]
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
@@ -1,6 +1,46 @@
 
+import os
+import sys
+import hashlib
+import threading
+import numpy as np
 import pandas as pd
-import inflection
+from rollup import RollupCube, ROLLUP_DIMENSIONS, ROLLUP_MEASURES, cuisine_means, ranked_cuisines
+from spatial import SpatialIndex
+from leaderboard import CuisineLeaderboard, top_k_order
+from cuisines import CuisineIndex
+from querycache import CachedQueries, QUERY_CACHE, query_key
+from sqlstore import SqlBackend, open_database, database_is_current
+from sketches import CountrySketches
+from kpis import KpiTable
+
+#..... Low-cardinality columns stored as dictionaries (categoricals) in the snapshot
+SNAPSHOT_CATEGORICALS = ['country_name', 'city', 'unique_cuisine', 'rating_color']
+
+#..... Bump whenever GeneralCleansing changes its output: older snapshots get stale
+CLEANSING_VERSION = '2'
+
+#..... Compact schema (CompactSchema): set RESTAURANTS_COMPACT=1 to load it in LoadShared
+COMPACT_ENV = 'RESTAURANTS_COMPACT'
+COMPACT_FLAGS = ['has_table_booking', 'has_online_delivery', 'is_delivering_now']
+COMPACT_FLOAT32 = ['longitude', 'latitude']     # not the ratings: their means are rounded to 0.1
+COMPACT_MAX_CARDINALITY = 0.10      # strings become categories up to 1 distinct value per 10 rows
+
+#..... Queries from a SQLite file (sqlstore.py): set RESTAURANTS_BACKEND=sqlite.
+#      RESTAURANTS_DATABASE overrides its path (default: next to the CSV, .sqlite).
+#      LoadShared then keeps no frame (dtframe is None): aggregates, filters, top-k,
+#      KPIs, map and export rows are SQL queries that read only what they return
+BACKEND_ENV = 'RESTAURANTS_BACKEND'
+DATABASE_ENV = 'RESTAURANTS_DATABASE'
+
+#..... Workers that build the rollup cube in parallel (partitioned.py); default 1.
+#      Threads inside the Streamlit server: it is never forked. Processes build it
+#      offline in build_snapshot.py, and rollup() loads those cells when they are fresh
+WORKERS_ENV = 'RESTAURANTS_WORKERS'
+
+#..... KPIs come from the per-country sketches (sketches.py: exact up to their limits,
+#      estimates past them); RESTAURANTS_EXACT_STATS=1 counts them from exact sets
+EXACT_STATS_ENV = 'RESTAURANTS_EXACT_STATS'
 
 #--------- CLASSE: UTILITÁRIOS PARA ACESSO AOS DADOS --------------------------
 class DbUtil():
@@ -9,6 +49,7 @@ class DbUtil():
     #..... CONSTRUCTOR
     def __init__(self) -> None:
         self.dtframe = None
+        self.dataset = None
         # CODE kindly supplied in the assignment statement
         self.COUNTRIES = {
             1: "India",
@@ -19,7 +60,7 @@ class DbUtil():
             148: "New Zealand",
             162: "Philippines",
             166: "Qatar",
-            184: "Singapure",
+            184: "Singapore",
             189: "South Africa",
             191: "Sri Lanka",
             208: "Turkey",
@@ -43,10 +84,215 @@ class DbUtil():
         self.dtframe = pd.read_csv( inCSVfile )
         return
 
+    #..... LOAD DATAFRAME FROM THE RAW API DUMPS (dataset/archive/file*.json)
+    def LoadJsonArchive(self, inDirectory, inWorkers=None) -> None:
+        # Same raw columns as the CSV: call GeneralCleansing() afterwards
+        from jsonarchive import archive_files, read_archive
+        self.dtframe = read_archive(archive_files(inDirectory), inWorkers)
+        return
+
+    #..... LOAD THE CLEANED DATAFRAME FROM THE PROCESS-WIDE STORE
+    def LoadShared(self, inCSVfile, inCompact=None) -> None:
+        #
+        # Streamlit reruns the page script on every widget interaction, so
+        # the CSV is parsed and cleaned once per file version and every
+        # session/page receives a read-only view of the same frame.
+        # inCompact: use the compact schema (default: RESTAURANTS_COMPACT=1)
+        #
+        if inCompact is None:
+            inCompact = DbUtil.compact_mode()
+        if DbUtil.backend_mode() == 'sqlite':
+            # No frame in memory: the store only keeps the database current
+            self.dataset = DATASET_STORE.get(inCSVfile, DbUtil.load_into_database, inKey='dbutil-sqlite')
+            self.dtframe = None
+            return
+        # When the CSV changes, only the changed rows are cleaned again (see refresh_cleansed)
+        if inCompact:
+            self.dataset = DATASET_STORE.get(inCSVfile, DbUtil.load_and_compact, inKey='dbutil-compact',
+                                             inRefresher=DbUtil.refresh_compact)
+        else:
+            self.dataset = DATASET_STORE.get(inCSVfile, DbUtil.load_and_cleanse,
+                                             inRefresher=DbUtil.refresh_cleansed)
+        self.dtframe = self.dataset.view()
+        return
+
+    #..... Build the cleaned frame (loader used by the store): (frame, row fingerprints)
+    @staticmethod
+    def load_and_cleanse(inCSVfile, inDigest=None) -> tuple:
+        util = DbUtil()
+        # A snapshot built from this very CSV skips parsing and cleansing
+        # (no fingerprints: the first refresh after it is a full reload)
+        snapshot = DbUtil.snapshot_file(inCSVfile)
+        if DbUtil.snapshot_is_fresh(snapshot, inCSVfile, inDigest):
+            util.LoadSnapshot(snapshot)
+            return util.dtframe, None
+        util.LoadDataframe(inCSVfile)
+        util.PrepareRows()
+        fingerprints = row_fingerprints(util.dtframe)
+        return util.CleanseRows(), fingerprints
+
+    #..... (Re)build the database of the CSV when it is stale (loader used by the store
+    #      with RESTAURANTS_BACKEND=sqlite): the cleaned frame only lives meanwhile
+    @staticmethod
+    def load_into_database(inCSVfile, inDigest) -> None:
+        database = DbUtil.database_file(inCSVfile)
+        version = DbUtil.sql_version(inDigest)
+        if not database_is_current(database, version):
+            frame, _ = DbUtil.load_and_cleanse(inCSVfile, inDigest)
+            open_database(database, frame, version)
+        return None
+
+    #..... Build the cleaned frame with the compact schema (loader used by the store)
+    @staticmethod
+    def load_and_compact(inCSVfile, inDigest=None) -> tuple:
+        util = DbUtil()
+        util.dtframe, fingerprints = DbUtil.load_and_cleanse(inCSVfile, inDigest)
+        util.CompactSchema()
+        return util.dtframe, fingerprints
+
+    #----- INCREMENTAL REFRESH: DELTA BY restaurant_id -------------------------
+
+    #..... Cleaned frame of the changed CSV, reusing the cleaned rows that did not change
+    @staticmethod
+    def refresh_cleansed(inEntry, inCSVfile) -> tuple:
+        #
+        # The CSV is parsed again (there is no way around it), but only new
+        # or changed rows (by restaurant_id and a hash of the raw row) go
+        # through the cleansing. Rows gone from the file are dropped. The
+        # result is the same frame a full reload would build, in file order.
+        # The cube is additive: it gets the delta instead of a rebuild. The
+        # KPI table and the sketches recompute only the countries the delta
+        # touches. The value, spatial and cuisine indexes and the leaderboard
+        # hold row positions, which the delta shifts: they are rebuilt, lazily,
+        # on their first use of the new version.
+        #
+        util = DbUtil()
+        util.LoadDataframe(inCSVfile)
+        raw = util.PrepareRows()
+        fingerprints = row_fingerprints(raw)
+
+        ids = raw['restaurant_id'].to_numpy()
+        old_hashes = inEntry.fingerprints
+        old_pos = old_hashes.index.get_indexer(ids)
+        unchanged = old_pos >= 0
+        unchanged[unchanged] = old_hashes.to_numpy()[old_pos[unchanged]] == fingerprints.to_numpy()[unchanged]
+
+        old = inEntry.frame
+        kept_pos = pd.Index(old['restaurant_id']).get_indexer(ids[unchanged])
+        kept = old.iloc[kept_pos]
+        util.dtframe = raw.iloc[np.flatnonzero(~unchanged)].copy()
+        added = util.CleanseRows()
+
+        # Back to the file order, with the file's row labels
+        order = np.empty(len(raw), dtype=int)
+        order[unchanged] = np.arange(len(kept))
+        order[~unchanged] = len(kept) + np.arange(len(added))
+        frame = pd.concat([kept, added]).iloc[order]
+        frame.index = raw.index
+
+        gone = np.ones(len(old), dtype=bool)
+        gone[kept_pos] = False
+        removed = old.iloc[np.flatnonzero(gone)]
+        touched = set(added['country_name'].astype(object)) | set(removed['country_name'].astype(object))
+
+        derived = {}
+        if 'rollup' in inEntry.derived:
+            derived['rollup'] = inEntry.derived['rollup'].updated(added, removed)
+        for name in ('kpi_table', 'sketches'):
+            if name in inEntry.derived:
+                derived[name] = inEntry.derived[name].updated(frame, touched)
+        return frame, fingerprints, derived
+
+    #..... Same, for the compact schema
+    @staticmethod
+    def refresh_compact(inEntry, inCSVfile) -> tuple:
+        util = DbUtil()
+        util.dtframe, fingerprints, derived = DbUtil.refresh_cleansed(inEntry, inCSVfile)
+        util.CompactSchema()
+        return util.dtframe, fingerprints, derived
+
+    #..... True when RESTAURANTS_COMPACT asks for the compact schema
+    @staticmethod
+    def compact_mode() -> bool:
+        return os.environ.get(COMPACT_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+    #----- COLUMNAR SNAPSHOT (ARROW IPC), BUILT OFFLINE BY build_snapshot.py --
+
+    #..... LOAD THE ALREADY CLEANED DATAFRAME FROM A SNAPSHOT
+    def LoadSnapshot(self, inSnapshotFile) -> None:
+        import pyarrow.feather as feather
+        # to_pandas() copies the columns into pandas blocks: the gain is the
+        # skipped parsing and cleansing, not a zero-copy frame
+        table = feather.read_table(inSnapshotFile)
+        self.dtframe = table.to_pandas()
+        return
+
+    #..... SAVE THE CLEANED DATAFRAME AS A TYPED SNAPSHOT
+    def SaveSnapshot(self, inSnapshotFile, inSourceDigest: str) -> None:
+        import pyarrow as pa
+
+        df = self.dtframe.copy()
+        # Dictionary-encoded columns: small on disk, categoricals when loaded
+        for col in SNAPSHOT_CATEGORICALS:
+            df[col] = df[col].astype('category')
+
+        # Keep the index: it carries the row labels left by drop_duplicates()
+        write_tagged(pa.Table.from_pandas(df, preserve_index=True), inSnapshotFile, inSourceDigest)
+        return
+
+    #..... Rollup cube built offline from the CSV (build_snapshot.py), None when missing or stale
+    @staticmethod
+    def LoadCube(inCSVfile, inDigest=None):
+        cube_file = DbUtil.cube_file(inCSVfile)
+        if not DbUtil.snapshot_is_fresh(cube_file, inCSVfile, inDigest):
+            return None
+        import pyarrow.feather as feather
+        cells = feather.read_table(cube_file).to_pandas()
+        if list(cells.columns) != ROLLUP_DIMENSIONS + ROLLUP_MEASURES:
+            return None
+        return RollupCube.from_cells(cells)
+
+    #..... SAVE THE CUBE'S CELLS NEXT TO THE SNAPSHOT
+    @staticmethod
+    def SaveCube(inCube: RollupCube, inCubeFile, inSourceDigest: str) -> None:
+        import pyarrow as pa
+        write_tagged(pa.Table.from_pandas(inCube.cells, preserve_index=False), inCubeFile, inSourceDigest)
+        return
+
+    #..... Snapshot file that goes with a CSV file
+    @staticmethod
+    def snapshot_file(inCSVfile) -> str:
+        return os.path.splitext(inCSVfile)[0] + '.arrow'
+
+    #..... Cube file that goes with a CSV file
+    @staticmethod
+    def cube_file(inCSVfile) -> str:
+        return os.path.splitext(inCSVfile)[0] + '.cube.arrow'
+
+    #..... True when the snapshot (or cube) was built from the current CSV by the current cleansing
+    #      (inDigest: the CSV's digest when the caller already has it)
+    @staticmethod
+    def snapshot_is_fresh(inSnapshotFile, inCSVfile, inDigest=None) -> bool:
+        if not os.path.exists(inSnapshotFile):
+            return False
+        import pyarrow as pa
+        with pa.memory_map(inSnapshotFile, 'r') as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        if metadata.get(b'cleansing_version', b'').decode() != CLEANSING_VERSION:
+            return False
+        if inDigest is None:
+            inDigest = file_digest(inCSVfile)
+        return metadata.get(b'source_sha256', b'').decode() == inDigest
+
     #----- CLEANSING METHODS, TO ADJUST DATA ----------------------------------
 
     #..... Perform the main general cleansing operations (JUST CALL THIS ONE)
     def GeneralCleansing(self) -> pd.core.frame.DataFrame:
+        self.PrepareRows()
+        return self.CleanseRows()
+
+    #..... Whole-frame steps: column names and one row per restaurant
+    def PrepareRows(self) -> pd.core.frame.DataFrame:
 
         # First op: rename columns
         self.rename_columns()
@@ -54,8 +300,13 @@ class DbUtil():
         # Remove duplicated restaurant regs
         self.dtframe.drop_duplicates(subset=['restaurant_id'], inplace=True)
 
+        return self.dtframe
+
+    #..... Row-by-row steps (also run alone on the delta of an incremental refresh)
+    def CleanseRows(self) -> pd.core.frame.DataFrame:
+
         # Remove 'switch_to_order_menu' column: not needed
-        self.dtframe.drop( columns=['switch_to_order_menu'] )
+        self.dtframe.drop( columns=['switch_to_order_menu'], inplace=True )
 
         # Eliminate white spaces at beginning & ending
         self.StripColumns()
@@ -67,10 +318,10 @@ class DbUtil():
 
     #..... Apply strip() command to some columns.
     def StripColumns(self) -> None:
-        self.dtframe['restaurant_name'] = self.dtframe['restaurant_name'].str.strip()
-        self.dtframe['city'] = self.dtframe['city'].str.strip()
-        self.dtframe['locality'] = self.dtframe['locality'].str.strip()
-        self.dtframe['locality_verbose'] = self.dtframe['locality_verbose'].str.strip()
+        # As .str.strip(): cells that are not text (numbers from the JSON dumps) become NaN
+        strip = lambda x: x.strip() if isinstance(x, str) else np.nan
+        for col in ['restaurant_name', 'city', 'locality', 'locality_verbose']:
+            self.dtframe[col] = map_distinct(self.dtframe[col], strip)
         return
 
     #..... Create column to receive the first type of Cuisine shown in 'Cuisines' column
@@ -80,14 +331,15 @@ class DbUtil():
         # ...we noticed that 'Cuisines' column has 13. Other columns do not have it.
         # Solution: when 'Cuisines' = nan, make 'UniqueCuisine' = ""
         #
-        self.dtframe['unique_cuisine'] = ( self.dtframe.loc[:, 'cuisines']
-                                  .apply(lambda x: x.split(",")[0] if isinstance(x, str) else "") )
+        self.dtframe['unique_cuisine'] = map_distinct( self.dtframe['cuisines'],
+                                                       lambda x: x.split(",")[0] if isinstance(x, str) else "", "" )
         return
 
     #..... Adjust column names, extract white spaces, etc
     def rename_columns( self ) -> pd.core.frame.DataFrame:
     
         # Kindly offered by the teacher :)
+        import inflection
         title = lambda x: inflection.titleize(x)
         snakecase = lambda x: inflection.underscore(x)
         spaces = lambda x: x.replace(" ", "")
@@ -97,9 +349,8 @@ class DbUtil():
         cols_new = list(map(snakecase, cols_old))
         self.dtframe.columns = cols_new
 
-        # create 'country_name' column
-        self.dtframe['country_name'] = ( self.dtframe.loc[:, 'country_code']
-                                             .apply(lambda x: self.country_name(x)) )
+        # create 'country_name' column (one dict lookup per distinct code)
+        self.dtframe['country_name'] = self.dtframe['country_code'].map(self.COUNTRIES).fillna("Unknown")
 
         return self.dtframe
 
@@ -109,7 +360,7 @@ class DbUtil():
 
     #..... CODE kindly supplied in the assignment statement
     def country_name(self, country_id):
-        return self.COUNTRIES[country_id]
+        return self.COUNTRIES.get(country_id, "Unknown")
 
     #..... CODE kindly supplied in the assignment statement
     def create_price_tye(self, price_range):
@@ -129,23 +380,217 @@ class DbUtil():
         # Force a column with the string info.
         # Price range . . . . : int, values = [ 1, 2, 3, 4 ]
         #
-        self.dtframe['price_range_txt'] = ( self.dtframe.loc[:, 'price_range']
-                                  .apply(lambda x: self.create_price_tye(x) ) )
+        # Lookup table indexed by the price range; anything else is 'gourmet'
+        names = np.array(['gourmet', 'cheap', 'normal', 'expensive'], dtype=object)
+        price_range = self.dtframe['price_range'].to_numpy()
+        position = np.where((price_range >= 1) & (price_range <= 3), price_range, 0)
+        self.dtframe['price_range_txt'] = names[position]
         return
 
+    #----- COMPACT SCHEMA: LESS RESIDENT MEMORY PER STREAMLIT WORKER ----------
+
+    #..... Shrink the cleaned frame's dtypes; returns the memory report (bytes per column)
+    def CompactSchema(self) -> pd.core.frame.DataFrame:
+        #
+        # - low-cardinality strings   -> category (small codes + one copy of each value)
+        # - other strings (addresses)  -> interned: equal strings share one object
+        # - 0/1 flags                  -> uint8
+        # - integers                   -> the smallest signed int that holds them
+        # - coordinates                -> float32 (~1 m precision)
+        #
+        df = self.dtframe
+        before = frame_memory(df)
+
+        for col in df.columns:
+            values = df[col]
+            if col in COMPACT_FLAGS:
+                df[col] = values.astype(np.uint8)
+            elif col in COMPACT_FLOAT32:
+                df[col] = values.astype(np.float32)
+            elif pd.api.types.is_integer_dtype(values):
+                df[col] = pd.to_numeric(values, downcast='integer')
+            elif values.dtype == object:
+                if values.nunique() <= COMPACT_MAX_CARDINALITY * len(values):
+                    df[col] = values.astype('category')
+                else:
+                    df[col] = map_distinct(values, sys.intern)
+
+        return memory_report(before, frame_memory(df))
+
+    #----- INDEXES AND OTHER OBJECTS DERIVED FROM THE DATAFRAME ---------------
+
+    #..... Cached in the shared store (per file version) when there is one. Without a
+    #      frame (RESTAURANTS_BACKEND=sqlite) the builder gets 'inColumns' from the
+    #      database, in file order, and only the built object is kept
+    def derived(self, name, builder, inColumns=None):
+        if self.dataset is None:
+            return builder(self.dtframe)
+        if self.in_database():
+            backend = self.sql_backend()    # outside the entry's lock, which is not reentrant
+            return self.dataset.get_derived(name, lambda _: builder(backend.restaurants(inColumns=inColumns)))
+        return self.dataset.get_derived(name, builder)
+
+    #..... True when the rows live in the SQLite database only (LoadShared, RESTAURANTS_BACKEND=sqlite)
+    def in_database(self) -> bool:
+        return self.dtframe is None and self.dataset is not None
+
+    #..... Inverted index for 'column': value -> row positions
+    def value_index(self, column) -> dict:
+        return self.derived(('value_index', column), lambda df: build_value_index(df[column]))
+
+    #..... Pre-aggregated cube that answers the dashboards' charts (see rollup.py),
+    #      or the SQLite database with the same queries when RESTAURANTS_BACKEND=sqlite
+    def rollup(self) -> RollupCube:
+        if DbUtil.backend_mode() == 'sqlite' and self.dataset is not None:
+            return self.sql_backend()
+        def build(df):
+            if self.dataset is not None:
+                cube = DbUtil.LoadCube(self.dataset.path, self.dataset.digest)
+                if cube is not None:
+                    return cube
+            return RollupCube(df, DbUtil.aggregation_workers())
+        return self.derived('rollup', build)
+
+    #..... Database file shared by the workers, rebuilt when the data version changes
+    #      (without a frame, load_into_database already did)
+    def sql_backend(self) -> SqlBackend:
+        database = DbUtil.database_file(self.dataset.path)
+        version = DbUtil.sql_version(self.dataset.digest)
+        return self.dataset.get_derived(('sql_backend', database),
+                                        lambda df: open_database(database, df, version))
+
+    #..... Version of the database built from a CSV with this digest
+    @staticmethod
+    def sql_version(inDigest: str) -> str:
+        return f'{inDigest[:16]}-{CLEANSING_VERSION}'
+
+    #..... 'sqlite' or 'rollup' (default), from RESTAURANTS_BACKEND
+    @staticmethod
+    def backend_mode() -> str:
+        return os.environ.get(BACKEND_ENV, '').strip().lower() or 'rollup'
+
+    #..... True when RESTAURANTS_EXACT_STATS asks for exact KPIs instead of the sketches
+    @staticmethod
+    def exact_stats() -> bool:
+        return os.environ.get(EXACT_STATS_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+    #..... Pool size for the partitioned aggregations, from RESTAURANTS_WORKERS (0: every core)
+    @staticmethod
+    def aggregation_workers() -> int:
+        value = os.environ.get(WORKERS_ENV, '').strip()
+        if not value:
+            return 1
+        return int(value) or os.cpu_count() or 1
+
+    @staticmethod
+    def database_file(inCSVfile) -> str:
+        return os.environ.get(DATABASE_ENV) or os.path.splitext(inCSVfile)[0] + '.sqlite'
+
+    #..... Lat/lon grid index for nearest / radius / density queries (see spatial.py)
+    def spatial_index(self) -> SpatialIndex:
+        return self.derived('spatial_index', SpatialIndex, ['latitude', 'longitude'])
+
+    #..... Restaurants of each cuisine, already in ranking order (see leaderboard.py)
+    def leaderboard(self) -> CuisineLeaderboard:
+        return self.derived('leaderboard', CuisineLeaderboard)
+
+    #..... Every cuisine of every restaurant, not only the first (see cuisines.py)
+    def cuisine_index(self) -> CuisineIndex:
+        return self.derived('cuisine_index', CuisineIndex)
+
+    #..... Source of qty_cuisines_per_city (every cuisine of each restaurant): the
+    #      cuisine index, or the SQLite database when RESTAURANTS_BACKEND=sqlite
+    def city_cuisines(self):
+        if DbUtil.backend_mode() == 'sqlite' and self.dataset is not None:
+            return self.sql_backend()
+        return self.cuisine_index()
+
+    #..... Mergeable per-country sketches: distinct counts and quantiles (see sketches.py)
+    def sketches(self) -> CountrySketches:
+        return self.derived('sketches', CountrySketches)
+
+    #..... Per-country counts, vote sums and distinct sets of the Home header (see kpis.py)
+    def kpi_table(self) -> KpiTable:
+        return self.derived('kpi_table', KpiTable)
+
+    #..... Memoized queries of 'inTarget' (default: this DbUtil) for the loaded version:
+    #      util.cached(util.rollup()).qty_restaurants_per_city(countries). See querycache.py
+    def cached(self, inTarget=None) -> CachedQueries:
+        target = self if inTarget is None else inTarget
+        namespace = None if self.dataset is None else (self.dataset.key, self.dataset.version)
+        return CachedQueries(target, namespace, QUERY_CACHE)
+
+    #..... Key of a chart in the figure cache (figures.py): chart id, filters and
+    #      loaded version. None (not cached) without the shared store
+    def figure_key(self, inChart: str, *inFilters):
+        if self.dataset is None:
+            return None
+        return query_key((self.dataset.key, self.dataset.version), 'figure', inChart, inFilters, {})
+
+    #..... Positions of inDF's rows in self.dtframe (the frame the indexes were built on),
+    #      or in the database's file order
+    def positions_of(self, inDF: pd.core.frame.DataFrame) -> np.ndarray:
+        if self.in_database():
+            return self.sql_backend().positions_of(inDF.index)
+        if inDF is self.dtframe or inDF.index.equals(self.dtframe.index):
+            return np.arange(len(self.dtframe))
+        return self.dtframe.index.get_indexer(inDF.index)
+
+    #..... (countries, cuisines) a frame of database rows was selected with, so the next
+    #      filter or top-k on it is one more query; None for any other frame
+    def selection_of(self, inDF: pd.core.frame.DataFrame):
+        return inDF.attrs.get('selection') if self.in_database() else None
+
+    #----- KPIs: THE SKETCHES, OR EXACT WITH inExact=True / RESTAURANTS_EXACT_STATS=1
+
+    #..... Distinct values of 'column' in the selected countries (None = all)
+    def distinct_count(self, column, list_of_countries=None, inExact=None) -> int:
+        if self.in_database():
+            return self.sql_backend().distinct_count(column, list_of_countries)
+        if inExact is None:
+            inExact = DbUtil.exact_stats()
+        if not inExact:
+            return self.sketches().distinct(column, list_of_countries)
+        df = self.dtframe if list_of_countries is None else self.get_items_with_these_countries(list_of_countries)
+        return len(df[column].dropna().unique())
+
+    #..... Home header KPIs of the selected countries: KpiTable rows and the sketches
+    #      (exact sets with inExact=True / RESTAURANTS_EXACT_STATS=1; always exact in SQL)
+    def home_kpis(self, list_of_countries=None, inExact=None) -> dict:
+        if self.in_database():
+            return self.sql_backend().home_kpis(list_of_countries)
+        if inExact is None:
+            inExact = DbUtil.exact_stats()
+        return self.kpi_table().header(list_of_countries, None if inExact else self.sketches())
+
+    #..... Quantile q of 'column' in the selected countries (None = all)
+    def quantile(self, column, q: float, list_of_countries=None, inExact=None) -> float:
+        if self.in_database():
+            return self.sql_backend().quantile(column, q, list_of_countries)
+        if inExact is None:
+            inExact = DbUtil.exact_stats()
+        if not inExact:
+            return self.sketches().quantile(column, q, list_of_countries)
+        df = self.dtframe if list_of_countries is None else self.get_items_with_these_countries(list_of_countries)
+        return float(df[column].quantile(q, interpolation='lower'))
+
     #----- COUNTRIES DATA HANDLING METHODS ------------------------------------
 
     def get_all_countries(self) -> list:
+        if self.in_database():
+            return sorted(self.sql_backend().distinct_values('country_name'))
         all_countries = self.dtframe['country_name'].unique().tolist()
         return sorted(all_countries)
 
     def countries_with_more_restaurants(self, NumCountries: int) -> list:
         if NumCountries < 1:
             return []
+        if self.in_database():
+            return self.sql_backend().countries_with_more_restaurants(NumCountries)
 
         colunas = ['country_name','restaurant_id']
         df1 = ( self.dtframe.loc[:, colunas]
-                            .groupby('country_name').count()
+                            .groupby('country_name', observed=True).count()
                             .sort_values(by=['restaurant_id'], ascending=False)
                             .reset_index() )
         aux = df1.loc[0:(NumCountries-1), 'country_name']
@@ -156,18 +601,26 @@ class DbUtil():
             self, 
             list_of_countries: list) -> pd.core.frame.DataFrame:
         #
-        # From the whole base ('self.dtframe'), extract lines that match 'list_of_countries'
+        # From the whole base ('self.dtframe'), extract lines whose country is
+        # exactly one of 'list_of_countries'. The inverted index (country -> row
+        # positions) makes the cost follow the number of matched rows.
+        # Rows keep their original order and labels. Without a frame, one query.
         #
-        lines = ( self.dtframe.loc[:, 'country_name']
-                              .apply( lambda x: any(country in x for country in list_of_countries) ) )
-        df = self.dtframe.loc[lines, :].copy().reset_index()
-        return df
+        if self.in_database():
+            return self.sql_backend().restaurants(list(list_of_countries))
+        index = self.value_index('country_name')
+        positions = [index[country] for country in set(list_of_countries) if country in index]
+        if len(positions) == len(index):
+            return self.dtframe     # everything selected: no copy at all
+        if not positions:
+            return self.dtframe.iloc[0:0]
+        return self.dtframe.iloc[np.sort(np.concatenate(positions))]
 
     def qty_restaurants_per_country(self, inDF: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
         # Quantidade de restaurantes em cada país
         colunas = ['country_name','restaurant_id']
         df = ( inDF.loc[:, colunas]
-                   .groupby('country_name').count()
+                   .groupby('country_name', observed=True).count()
                    .sort_values(by=['restaurant_id'], ascending=False)
                    .reset_index() )
         return df
@@ -175,7 +628,7 @@ class DbUtil():
     def qty_cities_per_country(self, inDF: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
         colunas = ['country_name','city']
         df = ( inDF.loc[:, colunas]
-                    .groupby('country_name').nunique()
+                    .groupby('country_name', observed=True).nunique()
                     .sort_values(by=['city'], ascending=False)
                     .reset_index() )
         return df
@@ -183,7 +636,7 @@ class DbUtil():
     def mean_rating_per_country(self, inDF: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
         colunas = ['country_name','votes']
         df = ( inDF.loc[:, colunas]
-                    .groupby('country_name').mean()
+                    .groupby('country_name', observed=True).mean()
                     .sort_values(by=['votes'] , ascending=False )
                     .reset_index() )
         df['votes'] = df.loc[:,'votes'].apply( lambda x: round(x, 0) )
@@ -192,18 +645,55 @@ class DbUtil():
     def mean_costfor2_per_country(self, inDF: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
         colunas = ['country_code','country_name','average_cost_for_two']
         df = ( inDF.loc[:, colunas]
-                   .groupby(['country_code','country_name']).mean()
+                   .groupby(['country_code','country_name'], observed=True).mean()
                    .sort_values('average_cost_for_two', ascending=False)
                    .reset_index() )
         df['average_cost_for_two'] = df.loc[:,'average_cost_for_two'].apply( lambda x: round(x, 1) )
         return df
 
+    #----- LOCATION DATA HANDLING METHODS -------------------------------------
+
+    def nearest_restaurants(self, lat: float, lon: float, k: int) -> pd.core.frame.DataFrame:
+        positions, distances = self.spatial_index().nearest(lat, lon, k)
+        return self.located_restaurants(positions, distances)
+
+    def restaurants_within(self, lat: float, lon: float, radius_km: float) -> pd.core.frame.DataFrame:
+        positions, distances = self.spatial_index().within_radius(lat, lon, radius_km)
+        return self.located_restaurants(positions, distances)
+
+    def restaurant_density(self, inDF: pd.core.frame.DataFrame = None) -> pd.core.frame.DataFrame:
+        # Restaurants per grid cell; 'inDF' must be a row subset of 'self.dtframe'
+        positions = None
+        if inDF is not None:
+            positions = self.positions_of(inDF)
+        return self.spatial_index().density(positions)
+
+    def located_restaurants(self, positions, distances) -> pd.core.frame.DataFrame:
+        colunas = ['restaurant_id','restaurant_name','country_name','city','unique_cuisine',
+                   'aggregate_rating','latitude','longitude']
+        if self.in_database():
+            df = self.sql_backend().rows_at(positions, colunas)
+        else:
+            df = self.dtframe.iloc[positions].loc[:, colunas]
+        df['distance_km'] = np.round(distances, 2)
+        return df.reset_index(drop=True)
+
+    #..... Center of each (country, city): median of its restaurants' coordinates
+    def city_centers(self) -> pd.core.frame.DataFrame:
+        colunas = ['country_name', 'city', 'latitude', 'longitude']
+        if self.in_database():
+            df = self.sql_backend().restaurants(inColumns=colunas)
+        else:
+            df = self.dtframe.loc[:, colunas]
+        return df.groupby(['country_name', 'city'], observed=True).median()
+
     #----- CUISINES DATA HANDLING METHODS -------------------------------------
 
     def get_all_cuisines(self) -> list:
-        linhas = self.dtframe['unique_cuisine'] != ''
-        df2 = self.dtframe.loc[linhas, :].copy()
-        all_items = df2['unique_cuisine'].unique().tolist()
+        # Distinct values first: no row mask, no copy of the frame
+        if self.in_database():
+            return [x for x in self.sql_backend().distinct_values('unique_cuisine') if x != '']
+        all_items = [x for x in self.dtframe['unique_cuisine'].unique().tolist() if x != '']
         return sorted(all_items)
 
     def cuisines_with_more_restaurants(self, NumCuisines: int, inDF: pd.core.frame.DataFrame) -> list:
@@ -212,7 +702,7 @@ class DbUtil():
 
         colunas = ['unique_cuisine','restaurant_id']
         df1 = ( inDF.loc[:, colunas]
-                    .groupby('unique_cuisine').count()
+                    .groupby('unique_cuisine', observed=True).count()
                     .sort_values(by=['restaurant_id'], ascending=False)
                     .reset_index() )
         aux = df1.loc[0:(NumCuisines-1), 'unique_cuisine']
@@ -223,45 +713,274 @@ class DbUtil():
                                       inDF: pd.core.frame.DataFrame, 
                                       list_of_cuisines: list) -> pd.core.frame.DataFrame:
         #
-        # From the input base ('inDF'), extract lines that match 'list_of_cuisines'
+        # From the input base ('inDF'), extract lines whose cuisine is exactly
+        # one of 'list_of_cuisines' (isin bitmask, hashed against the selection)
         #
-        lines = ( inDF.loc[:, 'unique_cuisine']
-                              .apply( lambda x: any(cuizn in x for cuizn in list_of_cuisines) ) )
-        df = inDF.loc[lines, :].copy().reset_index()
-        return df
-
-    def best_restaurants_from_cuisine(self, cuisine:str, inDF: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+        selection = self.selection_of(inDF)
+        if selection is not None:
+            countries, cuisines = selection
+            wanted = set(list_of_cuisines) if cuisines is None else set(cuisines) & set(list_of_cuisines)
+            return self.sql_backend().restaurants(countries, sorted(wanted))
+        lines = inDF['unique_cuisine'].isin(list_of_cuisines)
+        if lines.all():
+            return inDF
+        return inDF.loc[lines]
+
+    #..... Rows of 'inDF' serving any of the cuisines (all of them, with inMatchAll),
+    #      in any position of the 'cuisines' list: bitmap of the cuisine index
+    def get_items_serving_cuisines(self,
+            inDF: pd.core.frame.DataFrame,
+            list_of_cuisines: list,
+            inMatchAll=False) -> pd.core.frame.DataFrame:
+        selection = self.selection_of(inDF)
+        if selection is not None:
+            where, params = SqlBackend.serving_filter(list_of_cuisines, inMatchAll)
+            return self.sql_backend().restaurants(*selection, inWhere=where, inParams=params)
+        bitmap = self.cuisine_index().bitmap(list_of_cuisines, inMatchAll)
+        lines = bitmap[self.positions_of(inDF)]
+        if lines.all():
+            return inDF
+        return inDF.iloc[np.flatnonzero(lines)]
+
+    #..... Restaurants and mean rating per cuisine served, over the rows of 'inDF'
+    def served_cuisines(self, inDF: pd.core.frame.DataFrame = None) -> pd.core.frame.DataFrame:
+        selection = (None, None) if inDF is None and self.in_database() else None
+        if inDF is not None:
+            selection = self.selection_of(inDF)
+        if selection is not None:
+            return self.sql_backend().served_cuisines(*selection)
+        index = self.cuisine_index()
+        if inDF is None:
+            return index.aggregates()
+        mask = np.zeros(index.rows, dtype=bool)
+        mask[self.positions_of(inDF)] = True
+        return index.aggregates(mask)
+
+    #..... Best rated restaurants of 'cuisine' (ties by restaurant_id); at most 'k' if given
+    def best_restaurants_from_cuisine(self, cuisine:str, inDF: pd.core.frame.DataFrame, k=None) -> pd.core.frame.DataFrame:
         # Select all regs of the 'cuisine'
         colunas = ['restaurant_id','restaurant_name','unique_cuisine','aggregate_rating','country_name']
-        linhas = (inDF['unique_cuisine']==cuisine)
-        df2 = inDF.loc[linhas, colunas].copy()
-        # Find the best rating
-        df3 = df2.sort_values(by='aggregate_rating', ascending=False).reset_index()
-        max_rating = df3.loc[0, 'aggregate_rating']
-        # Get the best ranked restaurants
-        linhas = df3['aggregate_rating']==max_rating
-        df4 = df3.loc[linhas,:].sort_values(by='restaurant_id').reset_index()
-        return df4
-
-    def best_restaurants(self, inDF: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+        selection = self.selection_of(inDF)
+        if selection is not None:
+            countries, cuisines = selection
+            if cuisines is not None and cuisine not in cuisines:
+                return pd.DataFrame(columns=colunas)
+            return self.sql_backend().best_restaurants_from_cuisine(colunas, cuisine, countries, k)
+        linhas = np.flatnonzero(inDF['unique_cuisine'].isin([cuisine]).to_numpy())
+        df2 = inDF.iloc[linhas].loc[:, colunas]
+        # Only the rows with the best rating: no need to sort the whole cuisine
+        ratings = df2['aggregate_rating'].to_numpy(dtype=float, na_value=np.nan)
+        if np.isnan(ratings).all():
+            return df2.iloc[0:0].reset_index(drop=True)
+        best = np.flatnonzero(ratings == np.nanmax(ratings))
+        order = top_k_order(df2['aggregate_rating'].iloc[best], df2['restaurant_id'].iloc[best], k)
+        return df2.iloc[best[order]].reset_index(drop=True)
+
+    #..... Restaurants by best rating, then lowest restaurant_id; only the top 'k' if given
+    def best_restaurants(self, inDF: pd.core.frame.DataFrame, k=None) -> pd.core.frame.DataFrame:
         colunas = ['restaurant_id','restaurant_name','country_name','city','unique_cuisine','aggregate_rating']
-        df3 = inDF.loc[:,colunas].copy()
-        df3['restaurant_id'] = -df3['restaurant_id']
-        df4 = ( df3.loc[:, :]
-                   .sort_values(by=['aggregate_rating','restaurant_id'], ascending=False)
-                   .reset_index() )
-        df4['restaurant_id'] = -df4['restaurant_id']
-        return df4
-
+        selection = self.selection_of(inDF)
+        if selection is not None:
+            return self.sql_backend().best_restaurants(colunas, *selection, k)
+        order = top_k_order(inDF['aggregate_rating'], inDF['restaurant_id'], k)
+        return inDF.iloc[order].loc[:, colunas].reset_index(drop=True)
+
+    #..... Same, over the selected countries and cuisines (None = all), without
+    #      building the filtered frame first
+    def best_restaurants_in(self, list_of_countries=None, list_of_cuisines=None, k=None) -> pd.core.frame.DataFrame:
+        if self.in_database():
+            colunas = ['restaurant_id','restaurant_name','country_name','city','unique_cuisine','aggregate_rating']
+            return self.sql_backend().best_restaurants(colunas, list_of_countries, list_of_cuisines, k)
+        df = self.dtframe
+        if list_of_countries is not None:
+            df = self.get_items_with_these_countries(list_of_countries)
+        if list_of_cuisines is not None:
+            df = self.get_items_with_these_cuisines(df, list_of_cuisines)
+        return self.best_restaurants(df, k)
+
+    #..... Best 'k' restaurants of each cuisine in the selected countries, from the
+    #      precomputed leaderboard: O(k) per cuisine, with the same order as above
+    def best_restaurants_per_cuisine(self, list_of_cuisines: list, k=1, list_of_countries=None) -> dict:
+        colunas = ['restaurant_id','restaurant_name','unique_cuisine','aggregate_rating','country_name']
+        if self.in_database():
+            return { cuisine: self.sql_backend().best_restaurants(colunas, list_of_countries, [cuisine], k)
+                     for cuisine in list_of_cuisines }
+        board = self.leaderboard()
+        return { cuisine: ( self.dtframe.iloc[board.top(cuisine, k, list_of_countries)]
+                                        .loc[:, colunas]
+                                        .reset_index(drop=True) )
+                 for cuisine in list_of_cuisines }
+
+    #..... Mean rating per cuisine, from integer tenths as in the cube and the database
     def best_cuisines(self, ascending_order: bool, inDF: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
-        colunas = ['unique_cuisine','aggregate_rating']
-        df = ( inDF.loc[:, colunas]
-                    .groupby('unique_cuisine').mean()
-                    .sort_values(by='aggregate_rating', ascending=ascending_order)
-                    .reset_index() )
-        df['aggregate_rating'] = df.loc[:,'aggregate_rating'].apply( lambda x: round(x, 1) )
-        return df
+        return ranked_cuisines(cuisine_means(inDF), ascending_order)
+
+
+#--------- CLASSE: CACHE DE DADOS COMPARTILHADO PELO PROCESSO -----------------
+class DatasetEntry():
+
+    #..... CONSTRUCTOR
+    def __init__(self, inPath, inFrame, inMtime, inSize, inDigest, inKey='dbutil', inFingerprints=None) -> None:
+        self.path = inPath
+        self.key = inKey
+        # Hash of each raw row by restaurant_id, for incremental refreshes
+        self.fingerprints = inFingerprints
+        self.frame = inFrame
+        self.mtime = inMtime
+        self.size = inSize
+        self.digest = inDigest
+        # Content based: equal files give equal versions, in any process
+        self.version = inDigest[:16]
+        self.derived = {}
+        self.lock = threading.Lock()
+        return
+
+    #..... Shallow copy: shares the (read-only) arrays, not the column index
+    #      (None when the rows live in the database only)
+    def view(self) -> pd.core.frame.DataFrame:
+        return None if self.frame is None else self.frame.copy(deep=False)
+
+    #..... Objects computed from the frame, cached while this version lives
+    def get_derived(self, name, builder):
+        with self.lock:
+            if name not in self.derived:
+                self.derived[name] = builder(self.frame)
+            return self.derived[name]
+
+
+class DatasetStore():
+
+    #..... CONSTRUCTOR
+    def __init__(self) -> None:
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.loading_locks = {}
+        return
 
-    #--------------------------------------------------------------------------
-    # end
-    #--------------------------------------------------------------------------
+    #..... Return the entry for ('inPath', 'inKey'), (re)loading it when needed.
+    #      inLoader(path, digest) -> frame or (frame, fingerprints); None: no frame kept
+    #      inRefresher(old entry, path) -> (frame, fingerprints, derived objects)
+    def get(self, inPath, inLoader, inKey='dbutil', inRefresher=None) -> DatasetEntry:
+        stat = os.stat(inPath)
+        cache_key = (os.path.abspath(inPath), inKey)
+
+        entry = self.entries.get(cache_key)
+        if entry is not None and (entry.mtime, entry.size) == (stat.st_mtime_ns, stat.st_size):
+            return entry
+
+        with self.lock:
+            loading_lock = self.loading_locks.setdefault(cache_key, threading.Lock())
+
+        # Only one thread loads a given file; the others wait and reuse it
+        with loading_lock:
+            entry = self.entries.get(cache_key)
+            stat = os.stat(inPath)
+            if entry is not None and (entry.mtime, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                return entry
+
+            digest = file_digest(inPath)
+            if entry is not None and entry.digest == digest:
+                # File touched but not changed: keep the cleaned frame
+                entry.mtime = stat.st_mtime_ns
+                return entry
+
+            derived = {}
+            if entry is not None and entry.fingerprints is not None and inRefresher is not None:
+                frame, fingerprints, derived = inRefresher(entry, inPath)
+            else:
+                frame = inLoader(inPath, digest)
+                frame, fingerprints = frame if isinstance(frame, tuple) else (frame, None)
+            # One block per dtype now: otherwise each session's view would
+            # consolidate (copy) the blocks again on its first query
+            if frame is not None:
+                frame._consolidate_inplace()
+                lock_frame(frame)
+            # New digest, new version: every cache keyed by the version starts over
+            entry = DatasetEntry(inPath, frame, stat.st_mtime_ns, stat.st_size, digest, inKey, fingerprints)
+            entry.derived.update(derived)
+            self.entries[cache_key] = entry
+            return entry
+
+
+#..... Apply 'inFunc' once per distinct value instead of once per row
+def map_distinct(inSeries: pd.core.series.Series, inFunc, inNaValue=np.nan) -> pd.core.series.Series:
+    codes, uniques = pd.factorize(inSeries)
+    # Code -1 (missing value) picks the last item: 'inNaValue'
+    values = np.array([inFunc(x) for x in uniques] + [inNaValue], dtype=object)
+    return pd.Series(values[codes], index=inSeries.index, name=inSeries.name)
+
+
+#..... Bytes held by each column. Strings shared by several rows count once
+#      (memory_usage(deep=True) counts them once per row). Non-ASCII strings
+#      grow a little the first time pandas hashes them (cached UTF-8 copy).
+def frame_memory(inDF: pd.core.frame.DataFrame) -> pd.core.series.Series:
+    usage = inDF.memory_usage(deep=True)
+    for col in inDF.columns:
+        if inDF[col].dtype == object:
+            values = inDF[col].to_numpy()
+            distinct = {id(x): x for x in values}
+            usage[col] = values.nbytes + sum(sys.getsizeof(x) for x in distinct.values())
+    return usage
+
+
+#..... Hash of each raw row, by restaurant_id: tells which rows changed between two files
+def row_fingerprints(inDF: pd.core.frame.DataFrame) -> pd.core.series.Series:
+    hashes = pd.util.hash_pandas_object(inDF, index=False).to_numpy()
+    return pd.Series(hashes, index=inDF['restaurant_id'].to_numpy())
+
+
+#..... Memory per column (bytes) before and after a schema change, with a total row
+def memory_report(inBefore: pd.core.series.Series, inAfter: pd.core.series.Series) -> pd.core.frame.DataFrame:
+    df = pd.DataFrame({'before': inBefore, 'after': inAfter}).fillna(0).astype(np.int64)
+    df.loc['total'] = df.sum()
+    df['ratio'] = (df['after'] / df['before']).round(3)
+    return df
+
+
+#..... Map each distinct value of 'inSeries' to the (ascending) positions holding it
+def build_value_index(inSeries: pd.core.series.Series) -> dict:
+    codes, uniques = pd.factorize(inSeries)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    index = {}
+    for i, value in enumerate(uniques):
+        positions = order[bounds[i]:bounds[i + 1]]
+        positions.flags.writeable = False
+        index[value] = positions
+    return index
+
+
+#..... Write an Arrow table tagged with the digest of its source CSV and the cleansing
+#      version (read back by DbUtil.snapshot_is_fresh)
+def write_tagged(inTable, inFile, inSourceDigest: str) -> None:
+    import pyarrow.feather as feather
+    metadata = dict(inTable.schema.metadata or {})
+    metadata[b'source_sha256'] = inSourceDigest.encode()
+    metadata[b'cleansing_version'] = CLEANSING_VERSION.encode()
+    # Uncompressed: reading it back is a plain copy, no decompression
+    feather.write_feather(inTable.replace_schema_metadata(metadata), inFile, compression='uncompressed')
+    return
+
+#..... SHA-256 of a file, read in blocks
+def file_digest(inPath, inBlockSize=1 << 20) -> str:
+    sha = hashlib.sha256()
+    with open(inPath, 'rb') as fp:
+        for block in iter(lambda: fp.read(inBlockSize), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+#..... Make the frame's numpy blocks read-only, so no session can change them
+def lock_frame(inDF: pd.core.frame.DataFrame) -> None:
+    for values in inDF._mgr.arrays:
+        if isinstance(values, np.ndarray):
+            values.flags.writeable = False
+    return
+
+
+#..... One store per process: Streamlit keeps imported modules between reruns
+DATASET_STORE = DatasetStore()
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
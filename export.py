@@ -0,0 +1,111 @@
+
+import os
+import gzip
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+#..... Download formats: label -> (file extension, mime type)
+EXPORT_FORMATS = {
+    'CSV': ('.csv', 'text/csv'),
+    'CSV compactado (gzip)': ('.csv.gz', 'application/gzip'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+#..... Rows written per chunk: the whole CSV never exists as one string
+EXPORT_CHUNK_ROWS = 50_000
+
+#--------- CLASSE: ARQUIVOS EXPORTADOS, UM POR SELEÇÃO E FORMATO --------------
+class ExportCache():
+
+    #..... CONSTRUCTOR: files live in 'inDirectory' (default: a temp dir per process)
+    def __init__(self, inDirectory=None, inMaxEntries=16) -> None:
+        self.directory = inDirectory
+        self.max_entries = inMaxEntries
+        self.entries = OrderedDict()        # key -> file path
+        self.lock = threading.Lock()
+        return
+
+    #..... Path of an already exported file, or None
+    def ready(self, inKey):
+        with self.lock:
+            path = self.entries.get(inKey)
+            if path is not None and os.path.exists(path):
+                self.entries.move_to_end(inKey)
+                return path
+        return None
+
+    #..... Path of the file for (selection, format), exported on the first request
+    def get_file(self, inKey, inDF: pd.core.frame.DataFrame, inFormat: str) -> str:
+        path = self.ready(inKey) if inKey is not None else None
+        if path is not None:
+            return path
+
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='restaurants_export_')
+        # No key (data outside the shared store): a new file every time
+        key = inKey if inKey is not None else ('uncached', os.getpid(), threading.get_ident(), id(inDF))
+        name = hashlib.sha1(repr(key).encode()).hexdigest() + EXPORT_FORMATS[inFormat][0]
+        path = os.path.join(self.directory, name)
+
+        # Written aside and renamed: a concurrent session never sees half a file
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        export_file(inDF, tmp, inFormat)
+        os.replace(tmp, path)
+
+        if inKey is None:
+            return path
+        with self.lock:
+            self.entries[inKey] = path
+            self.entries.move_to_end(inKey)
+            while len(self.entries) > self.max_entries:
+                _, dropped = self.entries.popitem(last=False)
+                if dropped != path and os.path.exists(dropped):
+                    os.remove(dropped)
+        return path
+
+
+#..... Write 'inDF' to 'inPath' in the given format, chunk by chunk
+def export_file(inDF: pd.core.frame.DataFrame, inPath, inFormat: str) -> None:
+    if inFormat == 'CSV':
+        with open(inPath, 'w', encoding='utf-8', newline='') as fp:
+            write_csv_chunks(inDF, fp)
+    elif inFormat == 'CSV compactado (gzip)':
+        with gzip.open(inPath, 'wt', encoding='utf-8', newline='') as fp:
+            write_csv_chunks(inDF, fp)
+    elif inFormat == 'Parquet':
+        write_parquet_chunks(inDF, inPath)
+    else:
+        raise ValueError(f'unknown export format: {inFormat}')
+    return
+
+#..... Same text as inDF.to_csv(), without building it as a single string
+def write_csv_chunks(inDF: pd.core.frame.DataFrame, inFile, inChunkRows=EXPORT_CHUNK_ROWS) -> None:
+    if len(inDF) == 0:
+        inDF.to_csv(inFile)
+        return
+    for start in range(0, len(inDF), inChunkRows):
+        inDF.iloc[start:start + inChunkRows].to_csv(inFile, header=(start == 0))
+    return
+
+#..... One Parquet row group per chunk, so only one chunk is converted at a time
+def write_parquet_chunks(inDF: pd.core.frame.DataFrame, inPath, inChunkRows=EXPORT_CHUNK_ROWS) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(inDF, preserve_index=True)
+    with pq.ParquetWriter(inPath, schema) as writer:
+        for start in range(0, max(len(inDF), 1), inChunkRows):
+            chunk = inDF.iloc[start:start + inChunkRows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=True))
+    return
+
+
+#..... One cache per process: Streamlit keeps imported modules between reruns
+EXPORTS = ExportCache()
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
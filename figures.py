@@ -0,0 +1,121 @@
+
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+#..... Estimated JSON size of a figure: the layout with its template, and each
+#      trace's attributes besides its points (measured on bar_figure's charts)
+FIGURE_BASE_BYTES = 7000
+FIGURE_TRACE_BYTES = 300
+
+#--------- CLASSE: CACHE DE GRÁFICOS JÁ CONSTRUÍDOS (go.Figure) ---------------
+class FigureCache():
+
+    #..... CONSTRUCTOR: bounded by the bytes of the cached figures (estimated JSON size)
+    def __init__(self, inMaxBytes=32 * 2**20) -> None:
+        #
+        # The key comes from DbUtil.figure_key (chart id, filters, dataset
+        # version). A hit skips the query and the figure build. st.plotly_chart
+        # only reads the figure (to_dict), so one object serves every session.
+        #
+        self.max_bytes = inMaxBytes
+        self.entries = OrderedDict()        # key -> (figure, bytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        return
+
+    #..... Figure for 'inKey'; 'inBuild' returns it on a miss (no key: not cached)
+    def get_figure(self, inKey, inBuild):
+        if inKey is None:
+            return inBuild()
+
+        with self.lock:
+            if inKey in self.entries:
+                self.entries.move_to_end(inKey)
+                self.hits += 1
+                return self.entries[inKey][0]
+            self.misses += 1
+
+        figure = inBuild()
+        size = figure_bytes(figure)
+
+        with self.lock:
+            if inKey not in self.entries and size <= self.max_bytes:
+                self.entries[inKey] = (figure, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, dropped) = self.entries.popitem(last=False)
+                    self.bytes -= dropped
+                    self.evictions += 1
+        return figure
+
+    #..... Counters, for the logs and the debug panels
+    def stats(self) -> dict:
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.bytes, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+        return
+
+
+#..... Approximate JSON size of a figure, from the text of its points: the
+#      figure is not serialized here (st.plotly_chart does it once, to send it)
+def figure_bytes(inFigure) -> int:
+    size = FIGURE_BASE_BYTES
+    for trace in inFigure.data:
+        size += FIGURE_TRACE_BYTES
+        for values in (trace['x'], trace['y']):
+            if values is not None:
+                size += sum(len(str(v)) + 3 for v in values)
+    return size
+
+#..... Bar chart of inDF (one trace per 'inColor' value), as px.bar(..., text_auto=True)
+#      draws it, built straight from graph_objects without the express machinery
+def bar_figure(inDF: pd.core.frame.DataFrame, inX: str, inY: str, inColor=None):
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+
+    if inColor is None:
+        groups = [('', inDF)]
+    else:
+        groups = inDF.groupby(inColor, sort=False, observed=True)
+
+    traces = []
+    for i, (name, df) in enumerate(groups):
+        hover = f'{inX}=%{{x}}<br>{inY}=%{{y}}<extra></extra>'
+        if inColor is not None:
+            hover = f'{inColor}={name}<br>' + hover
+        traces.append(go.Bar(x=df[inX].tolist(), y=df[inY].tolist(), name=str(name),
+                             legendgroup=str(name), offsetgroup=str(name), alignmentgroup='True',
+                             showlegend=inColor is not None, orientation='v',
+                             marker_color=qualitative.Plotly[i % len(qualitative.Plotly)].lower(),
+                             hovertemplate=hover, texttemplate='%{y}', textposition='auto'))
+
+    fig = go.Figure(traces)
+    fig.update_layout(xaxis_title_text=inX, yaxis_title_text=inY, legend_tracegroupgap=0,
+                      margin_t=60, barmode='relative')
+    if inColor is not None:
+        fig.update_layout(legend_title_text=inColor)
+    return fig
+
+#..... st.plotly_chart of a (cached) figure: a go.Figure is taken as already
+#      validated, so Streamlit only serializes it
+def show_figure(inFigure, use_container_width: bool = True) -> None:
+    import streamlit as st
+    st.plotly_chart(inFigure, use_container_width=use_container_width)
+    return
+
+
+#..... One cache per process: Streamlit keeps imported modules between reruns
+FIGURES = FigureCache()
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
@@ -0,0 +1,280 @@
+
+import os
+import sys
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+#..... RESTAURANTS_PROFILE=1 turns the timers on (off: no method is wrapped at all)
+PROFILE_ENV = 'RESTAURANTS_PROFILE'
+#..... One JSON line per rerun appended to this file
+PROFILE_FILE_ENV = 'RESTAURANTS_PROFILE_FILE'
+#..... Prometheus text rewritten after each rerun (node_exporter textfile collector)
+PROFILE_PROM_ENV = 'RESTAURANTS_PROFILE_PROM'
+#..... RESTAURANTS_PROFILE_RSS=1 also reads the resident memory around every span
+#      (two reads of /proc/self/statm per call); otherwise only around each rerun
+PROFILE_RSS_ENV = 'RESTAURANTS_PROFILE_RSS'
+
+#..... Bytes per page of /proc/self/statm
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+#--------- CLASSE: TEMPOS E MEMÓRIA POR MÉTODO, AGRUPADOS POR RERUN ------------
+class Profiler():
+
+    #..... CONSTRUCTOR
+    def __init__(self) -> None:
+        #
+        # Each thread keeps its stack of open spans (Streamlit runs a session's
+        # rerun in one thread). A finished span is added to the process totals
+        # (Prometheus counters) and, inside rerun(), to the rerun's records,
+        # keyed by its path ('MainPage/DbUtil.home_kpis'): the flame breakdown.
+        #
+        self.enabled = profile_enabled()
+        self.span_rss = self.enabled and flag_enabled(PROFILE_RSS_ENV)
+        self.local = threading.local()
+        self.totals = {}                    # span name -> [calls, seconds, rss bytes]
+        self.reruns = {}                    # page -> [reruns, seconds]
+        self.lock = threading.Lock()
+        return
+
+    #..... Open a span: returns the token for exit()
+    def enter(self, inName: str) -> tuple:
+        stack = self.local.__dict__.setdefault('stack', [])
+        stack.append(inName)
+        return (inName, time.perf_counter(), resident_bytes() if self.span_rss else 0)
+
+    #..... Close the span opened by enter()
+    def exit(self, inToken: tuple) -> None:
+        name, start, rss = inToken
+        seconds = time.perf_counter() - start
+        rss = resident_bytes() - rss if self.span_rss else 0
+        stack = self.local.stack
+        path = '/'.join(stack)
+        stack.pop()
+        with self.lock:
+            total = self.totals.setdefault(name, [0, 0.0, 0])
+            total[0] += 1
+            total[1] += seconds
+            total[2] += rss
+        records = getattr(self.local, 'records', None)
+        if records is not None:
+            record = records.setdefault(path, [0, 0.0, 0])
+            record[0] += 1
+            record[1] += seconds
+            record[2] += rss
+        return
+
+    @contextmanager
+    def span(self, inName: str):
+        if not self.enabled:
+            yield
+            return
+        token = self.enter(inName)
+        try:
+            yield
+        finally:
+            self.exit(token)
+
+    #..... One page rerun: its spans are collected, then exported
+    @contextmanager
+    def rerun(self, inPage: str):
+        if not self.enabled:
+            yield
+            return
+        self.local.records = {}
+        self.local.stack = [inPage]
+        start, rss = time.perf_counter(), resident_bytes()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            records = self.local.records
+            self.local.records = None
+            self.local.stack = []
+            records[inPage] = [1, seconds, resident_bytes() - rss]
+            with self.lock:
+                rerun = self.reruns.setdefault(inPage, [0, 0.0])
+                rerun[0] += 1
+                rerun[1] += seconds
+            # Spans carry their memory only when sampled (RESTAURANTS_PROFILE_RSS); the rerun always does
+            self.local.last = {'page': inPage, 'time': time.time(), 'seconds': seconds,
+                               'spans': [{'path': path, 'calls': r[0], 'seconds': r[1],
+                                          'rss_bytes': r[2] if self.span_rss or path == inPage else None}
+                                         for path, r in records.items()]}
+            self.export(self.local.last)
+        return
+
+    #..... Last rerun of this thread (page, seconds, spans), or None
+    def last_rerun(self):
+        return getattr(self.local, 'last', None)
+
+    #..... Counters of the process in the Prometheus text format
+    def prometheus(self) -> str:
+        lines = ['# HELP restaurants_span_calls_total Calls of each instrumented method.',
+                 '# TYPE restaurants_span_calls_total counter']
+        with self.lock:
+            totals = sorted(self.totals.items())
+            reruns = sorted(self.reruns.items())
+        lines += [f'restaurants_span_calls_total{{span="{name}"}} {t[0]}' for name, t in totals]
+        lines += ['# HELP restaurants_span_seconds_total Time spent in each instrumented method.',
+                  '# TYPE restaurants_span_seconds_total counter']
+        lines += [f'restaurants_span_seconds_total{{span="{name}"}} {t[1]:.6f}' for name, t in totals]
+        if self.span_rss:
+            lines += ['# HELP restaurants_span_rss_bytes_total Resident memory growth during each method.',
+                      '# TYPE restaurants_span_rss_bytes_total counter']
+            lines += [f'restaurants_span_rss_bytes_total{{span="{name}"}} {t[2]}' for name, t in totals]
+        lines += ['# HELP restaurants_reruns_total Reruns of each page.',
+                  '# TYPE restaurants_reruns_total counter']
+        lines += [f'restaurants_reruns_total{{page="{page}"}} {r[0]}' for page, r in reruns]
+        lines += ['# HELP restaurants_rerun_seconds_total Time spent in the reruns of each page.',
+                  '# TYPE restaurants_rerun_seconds_total counter']
+        lines += [f'restaurants_rerun_seconds_total{{page="{page}"}} {r[1]:.6f}' for page, r in reruns]
+        lines += ['# HELP restaurants_resident_bytes Resident memory of the process.',
+                  '# TYPE restaurants_resident_bytes gauge',
+                  f'restaurants_resident_bytes {resident_bytes()}']
+        return '\n'.join(lines) + '\n'
+
+    #..... JSON line and Prometheus file, when their variables are set
+    def export(self, inRerun: dict) -> None:
+        path = os.environ.get(PROFILE_FILE_ENV)
+        if path:
+            with self.lock, open(path, 'a', encoding='utf-8') as fp:
+                fp.write(json.dumps(inRerun, ensure_ascii=False) + '\n')
+        path = os.environ.get(PROFILE_PROM_ENV)
+        if path:
+            # Written aside and renamed: the collector never reads half a file
+            tmp = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as fp:
+                fp.write(self.prometheus())
+            os.replace(tmp, path)
+        return
+
+    #----- DEBUG PANEL (STREAMLIT SIDEBAR) ------------------------------------
+
+    #..... Flame breakdown of this thread's last rerun, at the end of the sidebar
+    def sidebar_panel(self) -> None:
+        last = self.last_rerun()
+        if not self.enabled or last is None:
+            return
+        import pandas as pd
+        import streamlit as st
+        import plotly.graph_objects as go
+
+        spans = pd.DataFrame(last['spans'])
+        spans['parent'] = spans['path'].map(lambda p: p.rpartition('/')[0])
+        spans['span'] = spans['path'].map(lambda p: p.rpartition('/')[2])
+        spans['ms'] = (spans['seconds'] * 1000).round(2)
+        spans['rss KiB'] = (spans['rss_bytes'] / 1024).round(0)
+
+        with st.sidebar.expander(f'Tempo do rerun: {last["seconds"] * 1000:.0f} ms'):
+            # Unrounded values: a child may not exceed its parent
+            fig = go.Figure(go.Icicle(ids=spans['path'], labels=spans['span'], parents=spans['parent'],
+                                      values=spans['seconds'] * 1000, branchvalues='total'))
+            fig.update_layout(margin=dict(t=0, l=0, r=0, b=0), height=320)
+            st.plotly_chart(fig, use_container_width=True)
+            table = spans.sort_values('seconds', ascending=False).loc[:, ['path', 'calls', 'ms', 'rss KiB']]
+            st.dataframe(table, use_container_width=True)
+        return
+
+
+#..... True when RESTAURANTS_PROFILE asks for the timers
+def profile_enabled() -> bool:
+    return flag_enabled(PROFILE_ENV)
+
+def flag_enabled(inVariable: str) -> bool:
+    return os.environ.get(inVariable, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+#..... Resident memory of the process (Linux: /proc/self/statm; elsewhere, the peak)
+def resident_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+#..... 'inFunc' timed as the span 'inName'
+def timed(inName: str, inFunc):
+    if getattr(inFunc, '__instrumented__', False):
+        return inFunc
+
+    @functools.wraps(inFunc)
+    def wrapper(*args, **kwargs):
+        token = PROFILER.enter(inName)
+        try:
+            return inFunc(*args, **kwargs)
+        finally:
+            PROFILER.exit(token)
+    wrapper.__instrumented__ = True
+    return wrapper
+
+#..... Wrap the methods of 'inClass' (default: the constructor and every public one) with timers
+def instrument_class(inClass, inMethods=None) -> None:
+    if not PROFILER.enabled:
+        return
+    for name, attr in list(vars(inClass).items()):
+        wanted = (name == '__init__' or not name.startswith('_')) if inMethods is None else name in inMethods
+        if not wanted:
+            continue
+        label = f'{inClass.__name__}.{name}'
+        if isinstance(attr, staticmethod):
+            setattr(inClass, name, staticmethod(timed(label, attr.__func__)))
+        elif callable(attr):
+            setattr(inClass, name, timed(label, attr))
+    return
+
+#..... Timers on the data layer, the Plotly figures/charts and the folium map (once)
+_INSTALLED = False
+
+#..... Chart functions of figures.py timed by install()
+FIGURE_FUNCTIONS = ['bar_figure', 'show_figure']
+
+def install() -> None:
+    global _INSTALLED
+    if not PROFILER.enabled or _INSTALLED:
+        return
+    _INSTALLED = True
+    import streamlit as st
+    import figures
+    from dbutil import DbUtil
+    from rollup import RollupCube
+    from cuisines import CuisineIndex
+    from leaderboard import CuisineLeaderboard
+    from spatial import SpatialIndex
+    from sqlstore import SqlBackend
+    from sketches import CountrySketches
+    from kpis import KpiTable
+    from mapview import CityMapCache
+    from export import ExportCache
+    from figures import FigureCache
+
+    for cls in (DbUtil, RollupCube, CuisineIndex, CuisineLeaderboard, SpatialIndex,
+                SqlBackend, CountrySketches, KpiTable, CityMapCache, ExportCache, FigureCache):
+        instrument_class(cls)
+    for name in FIGURE_FUNCTIONS:
+        setattr(figures, name, timed(f'figures.{name}', getattr(figures, name)))
+    st.plotly_chart = timed('st.plotly_chart', st.plotly_chart)
+    return
+
+#..... install(), plus the sidebar and main page of a page class
+def instrument_page(inPageClass) -> None:
+    install()
+    instrument_class(inPageClass, ['BarraLateral', 'MainPage'])
+    if PROFILER.enabled:
+        # The page imported the figure functions by name, before install() wrapped them
+        import figures
+        page = vars(sys.modules[inPageClass.__module__])
+        for name in FIGURE_FUNCTIONS:
+            if name in page:
+                page[name] = getattr(figures, name)
+    return
+
+
+#..... One profiler per process
+PROFILER = Profiler()
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
@@ -0,0 +1,100 @@
+
+import os
+import glob
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import ijson
+
+#..... Same columns (and names) as dataset/zomato.csv, so GeneralCleansing applies as is
+CSV_COLUMNS = [
+    'Restaurant ID', 'Restaurant Name', 'Country Code', 'City', 'Address',
+    'Locality', 'Locality Verbose', 'Longitude', 'Latitude', 'Cuisines',
+    'Average Cost for two', 'Currency', 'Has Table booking', 'Has Online delivery',
+    'Is delivering now', 'Switch to order menu', 'Price range', 'Aggregate rating',
+    'Rating color', 'Rating text', 'Votes',
+]
+
+#..... The API gives the currency symbol; the CSV, its label (unknown symbols kept as they are)
+CURRENCY_NAMES = {
+    'Rs.': 'Indian Rupees(Rs.)', '$': 'Dollar($)', 'R$': 'Brazilian Real(R$)',
+    'IDR': 'Indonesian Rupiah(IDR)', 'NZ$': 'NewZealand($)', 'P': 'Botswana Pula(P)',
+    'QR': 'Qatari Rial(QR)', 'R': 'Rand(R)', 'LKR': 'Sri Lankan Rupee(LKR)',
+    'TL': 'Turkish Lira(TL)', 'AED': 'Emirati Diram(AED)', '£': 'Pounds(£)',
+}
+
+#..... Path of each 'restaurant' object inside the API responses
+RESTAURANT_PREFIX = 'item.restaurants.item.restaurant'
+
+#--------- ARQUIVOS JSON DA API ZOMATO (dataset/archive/file*.json) ----------
+
+#..... Number of the API, NaN only when it is missing (a real 0 stays 0.0)
+def to_float(inValue) -> float:
+    if inValue is None or inValue == '':
+        return float('nan')
+    return float(inValue)
+
+#..... Flatten one 'restaurant' object into a CSV-like row
+def flatten_restaurant(inRest: dict) -> tuple:
+    location = inRest.get('location', {})
+    rating = inRest.get('user_rating', {})
+    return (
+        int(inRest['R']['res_id']),
+        inRest.get('name'),
+        location.get('country_id'),
+        location.get('city'),
+        location.get('address'),
+        location.get('locality'),
+        location.get('locality_verbose'),
+        to_float(location.get('longitude')),
+        to_float(location.get('latitude')),
+        inRest.get('cuisines') or None,
+        inRest.get('average_cost_for_two'),
+        CURRENCY_NAMES.get(inRest.get('currency'), inRest.get('currency')),
+        inRest.get('has_table_booking'),
+        inRest.get('has_online_delivery'),
+        inRest.get('is_delivering_now'),
+        inRest.get('switch_to_order_menu'),
+        inRest.get('price_range'),
+        to_float(rating.get('aggregate_rating')),
+        rating.get('rating_color'),
+        rating.get('rating_text'),
+        int(rating.get('votes') or 0),
+    )
+
+#..... Stream one file: only one restaurant dict is alive at a time
+def read_archive_file(inJSONfile) -> pd.core.frame.DataFrame:
+    rows = []
+    seen = set()
+    with open(inJSONfile, 'rb') as fp:
+        for rest in ijson.items(fp, RESTAURANT_PREFIX, use_float=True):
+            row = flatten_restaurant(rest)
+            if row[0] not in seen:
+                seen.add(row[0])
+                rows.append(row)
+    return pd.DataFrame.from_records(rows, columns=CSV_COLUMNS)
+
+#..... Files of an archive directory, in name order
+def archive_files(inDirectory) -> list:
+    return sorted(glob.glob(os.path.join(inDirectory, 'file*.json')))
+
+#..... Parse every file in parallel (one process per file) and merge them
+def read_archive(inJSONfiles: list, inWorkers=None) -> pd.core.frame.DataFrame:
+    if len(inJSONfiles) <= 1 or inWorkers == 1:
+        frames = [read_archive_file(f) for f in inJSONfiles]
+    else:
+        workers = min(inWorkers or os.cpu_count() or 1, len(inJSONfiles))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(read_archive_file, inJSONfiles))
+
+    # Files without restaurants would turn every column into 'object'
+    frames = [df for df in frames if len(df)]
+    if not frames:
+        return pd.DataFrame(columns=CSV_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    # The same restaurant may come in several files: keep the first one
+    df.drop_duplicates(subset=['Restaurant ID'], inplace=True, ignore_index=True)
+    return df
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
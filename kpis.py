@@ -0,0 +1,64 @@
+
+import pandas as pd
+
+#..... Columns whose distinct values are KPIs of the Home header
+KPI_DISTINCT = ['country_name', 'city', 'restaurant_name', 'unique_cuisine']
+
+#--------- CLASSE: TABELA DE KPIs POR PAÍS (CABEÇALHO DA HOME) ----------------
+class KpiTable():
+
+    #----- INITIAL METHODS: CONSTRUCTOR ---------------------------------------
+    #..... CONSTRUCTOR: one row per country, built once at load time
+    def __init__(self, inDF: pd.core.frame.DataFrame) -> None:
+        #
+        # Per country: restaurants, sum of votes and the sets of distinct
+        # values. Counts and sums add, sets unite, so any selection is
+        # answered by combining at most one row per country (15), however
+        # many restaurants the dataset has.
+        #
+        countries = inDF['country_name'].astype(object)
+        grouped = inDF.groupby(countries, sort=True)
+        self.table = pd.DataFrame({'restaurants': grouped.size(),
+                                   'votes': grouped['votes'].sum()})
+        self.sets = {}                      # column -> {country: frozenset}
+        for column in KPI_DISTINCT:
+            values = inDF[column].astype(object)
+            self.sets[column] = {country: frozenset(v.dropna().unique())
+                                 for country, v in values.groupby(countries, sort=True)}
+        return
+
+    #..... Same table after an incremental refresh: only the countries in
+    #      'inCountries' (touched by the delta) are recomputed, from the new frame
+    def updated(self, inDF: pd.core.frame.DataFrame, inCountries) -> 'KpiTable':
+        fresh = KpiTable(inDF.loc[inDF['country_name'].isin(list(inCountries))])
+        table = KpiTable.__new__(KpiTable)
+        kept = self.table.loc[~self.table.index.isin(list(inCountries))]
+        table.table = pd.concat([kept, fresh.table]).sort_index()
+        table.sets = {}
+        for column in KPI_DISTINCT:
+            sets = {c: s for c, s in self.sets[column].items() if c not in inCountries}
+            sets.update(fresh.sets[column])
+            table.sets[column] = dict(sorted(sets.items()))
+        return table
+
+    #..... Header KPIs of the selected countries (None = all). Distinct counts come
+    #      from the sets, or from 'inSketches' (CountrySketches) when given; the
+    #      columns whose sketch count is an estimate are listed in 'approximate'
+    def header(self, list_of_countries=None, inSketches=None) -> dict:
+        rows = self.table if list_of_countries is None else self.table.loc[self.table.index.isin(list_of_countries)]
+        kpis = {'restaurants': int(rows['restaurants'].sum()),
+                'votes': int(rows['votes'].sum()),
+                'approximate': []}
+        for column in KPI_DISTINCT:
+            if inSketches is not None:
+                sketch = inSketches.distinct_sketch(column, list(rows.index))
+                kpis[column] = sketch.count()
+                if not sketch.exact:
+                    kpis['approximate'].append(column)
+            else:
+                kpis[column] = len(frozenset().union(*(self.sets[column][c] for c in rows.index)))
+        return kpis
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
@@ -0,0 +1,71 @@
+
+import os
+
+#..... How the pages show their sections: 'tabs' (default), 'expanders' or 'all'
+SECTIONS_ENV = 'RESTAURANTS_SECTIONS'
+SECTIONS_MODES = ['tabs', 'expanders', 'all']
+
+#--------- CLASSE: SUB-RESULTADOS COMPARTILHADOS DENTRO DE UM RERUN -----------
+class RerunResults():
+
+    #..... CONSTRUCTOR: one per page object, i.e. per rerun
+    def __init__(self) -> None:
+        self.values = {}
+        return
+
+    #..... Value of 'inName', computed on its first use in this rerun
+    def get(self, inName, inCompute):
+        if inName not in self.values:
+            self.values[inName] = inCompute()
+        return self.values[inName]
+
+
+#--------- CLASSE: SEÇÕES DA PÁGINA CALCULADAS SÓ QUANDO EXIBIDAS -------------
+class LazySections():
+
+    #..... CONSTRUCTOR: 'inKey' names the widgets of this group of sections
+    def __init__(self, inKey: str, inMode=None) -> None:
+        #
+        # Streamlit runs the body of every st.tabs / st.expander on each rerun,
+        # open or not, so the sections are plain functions called only when
+        # shown:
+        #   tabs:      a horizontal radio; only the chosen section runs
+        #   expanders: the first one open; the others run once the user ticks
+        #              their checkbox (kept in the session, so it stays loaded)
+        #   all:       every section, one after the other (the old layout)
+        #
+        self.key = inKey
+        self.mode = inMode or sections_mode()
+        self.sections = []                  # (title, render function)
+        return
+
+    def add(self, inTitle: str, inRender) -> 'LazySections':
+        self.sections.append((inTitle, inRender))
+        return self
+
+    def render(self) -> None:
+        import streamlit as st
+
+        if self.mode == 'all':
+            for _, section in self.sections:
+                section()
+        elif self.mode == 'tabs':
+            titles = [title for title, _ in self.sections]
+            chosen = st.radio('Seção', titles, horizontal=True, key=self.key, label_visibility='collapsed')
+            dict(self.sections)[chosen]()
+        else:
+            for i, (title, section) in enumerate(self.sections):
+                with st.expander(title, expanded=(i == 0)):
+                    if i == 0 or st.checkbox('Carregar', key=f'{self.key}:{i}'):
+                        section()
+        return
+
+
+#..... Sections mode from RESTAURANTS_SECTIONS (unknown values: 'tabs')
+def sections_mode() -> str:
+    mode = os.environ.get(SECTIONS_ENV, '').strip().lower()
+    return mode if mode in SECTIONS_MODES else 'tabs'
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
@@ -0,0 +1,75 @@
+
+import numpy as np
+import pandas as pd
+
+#--------- CLASSE: RANKING DE RESTAURANTES POR CULINÁRIA ----------------------
+class CuisineLeaderboard():
+
+    #----- INITIAL METHODS: CONSTRUCTOR ---------------------------------------
+    #..... CONSTRUCTOR: rank every cuisine's restaurants once, at load time
+    def __init__(self, inDF: pd.core.frame.DataFrame) -> None:
+        #
+        # Rows are ordered by (cuisine, best rating, lowest restaurant_id), so
+        # each cuisine is a contiguous slice [start, end) already in ranking
+        # order. The best k of a cuisine are the first k rows of its slice
+        # whose country is selected: no sort at query time.
+        #
+        cuisine_codes, self.cuisines = pd.factorize(inDF['unique_cuisine'], sort=True)
+        country_codes, self.countries = pd.factorize(inDF['country_name'])
+        ratings = rating_keys(inDF['aggregate_rating'])
+        ids = inDF['restaurant_id'].to_numpy()
+
+        order = np.lexsort((ids, -ratings, cuisine_codes))
+        order = order[cuisine_codes[order] >= 0]         # rows without cuisine
+        self.positions = order                            # row positions in 'inDF'
+        self.country_codes = country_codes[order]
+
+        bounds = np.searchsorted(cuisine_codes[order], np.arange(len(self.cuisines) + 1))
+        self.slices = {cuisine: (bounds[i], bounds[i + 1]) for i, cuisine in enumerate(self.cuisines)}
+        return
+
+    #..... Row positions of the best 'k' restaurants of 'cuisine', best first
+    def top(self, cuisine, k: int, list_of_countries=None) -> np.ndarray:
+        start, end = self.slices.get(cuisine, (0, 0))
+        if k < 1 or start == end:
+            return np.empty(0, dtype=int)
+        if list_of_countries is None:
+            return self.positions[start:min(start + k, end)]
+
+        # Scan the ranking in growing chunks until k rows of the selected countries show up
+        allowed = np.isin(self.countries, list_of_countries)
+        found = []
+        missing = k
+        chunk = max(4 * k, 64)
+        while start < end and missing > 0:
+            stop = min(start + chunk, end)
+            hits = np.flatnonzero(allowed[self.country_codes[start:stop]])[:missing] + start
+            found.append(self.positions[hits])
+            missing -= len(hits)
+            start, chunk = stop, chunk * 2
+        return np.concatenate(found) if found else np.empty(0, dtype=int)
+
+
+#..... Ratings as sort keys: missing ratings rank last, as in sort_values()
+def rating_keys(inRating: pd.core.series.Series) -> np.ndarray:
+    ratings = inRating.to_numpy(dtype=float, na_value=np.nan)
+    return np.where(np.isnan(ratings), -np.inf, ratings)
+
+#..... Positions of the 'k' best rows (highest rating, then lowest id), best first.
+#      Partial selection: only rows tied with the k-th rating get sorted.
+def top_k_order(inRating: pd.core.series.Series, inIds: pd.core.series.Series, k=None) -> np.ndarray:
+    ratings = rating_keys(inRating)
+    ids = inIds.to_numpy()
+    if k is None or k >= len(ratings):
+        return np.lexsort((ids, -ratings))
+    if k < 1:
+        return np.empty(0, dtype=int)
+
+    threshold = -np.partition(-ratings, k - 1)[k - 1]
+    rows = np.flatnonzero(ratings >= threshold)
+    order = np.lexsort((ids[rows], -ratings[rows]))[:k]
+    return rows[order]
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
@@ -0,0 +1,84 @@
+
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+#..... Marker drawn on the browser from one compact row: [lat, lon, color, popup]
+MARKER_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'info-sign', prefix: 'glyphicon', markerColor: row[2]});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup(row[3]);
+    return marker;
+}
+"""
+
+#--------- CLASSE: MAPA DE CIDADES (MARCADORES AGRUPADOS) ---------------------
+class CityMapCache():
+
+    #..... CONSTRUCTOR
+    def __init__(self, inMaxEntries=32) -> None:
+        self.max_entries = inMaxEntries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        return
+
+    #..... Map HTML for the selection, built once per (dataset version, countries).
+    #      inRows() returns the selected rows: only called when the map is built
+    def get_html(self, inKey, inRows, inColorName) -> str:
+        if inKey is None:
+            return city_map_html(inRows(), inColorName)
+
+        with self.lock:
+            if inKey in self.entries:
+                self.entries.move_to_end(inKey)
+                return self.entries[inKey]
+
+        html = city_map_html(inRows(), inColorName)
+
+        with self.lock:
+            self.entries[inKey] = html
+            self.entries.move_to_end(inKey)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return html
+
+
+#..... One marker per (country, city, rating, color), at the median position
+def city_markers(inDF: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+    colunas = ['country_name', 'city', 'aggregate_rating', 'rating_color', 'latitude', 'longitude']
+    df = ( inDF.loc[:, colunas]
+               .groupby(['country_name', 'city', 'aggregate_rating', 'rating_color'], observed=True)
+               .median()
+               .reset_index() )
+    return df
+
+#..... Whole map page (HTML). The markers go in bulk, as one data array that
+#      the browser clusters by zoom level, instead of one folium.Marker each.
+#      Limitation: every marker is still in the HTML (FastMarkerCluster only
+#      builds them in the browser), so the page grows with the selection;
+#      one marker per (country, city, rating, color) is what keeps it small.
+def city_map_html(inDF: pd.core.frame.DataFrame, inColorName) -> str:
+    # folium is the heaviest import of the Home: loaded for the first map built
+    import folium
+    from folium.plugins import FastMarkerCluster
+
+    df = city_markers(inDF)
+
+    # One color lookup per distinct color code, not per marker
+    colors = df['rating_color'].astype(str)
+    colors = colors.map({code: inColorName(code) for code in colors.unique()})
+    popups = df['city'].astype(str) + ': ' + df['aggregate_rating'].astype(str)
+    data = list(zip(df['latitude'].round(6), df['longitude'].round(6), colors, popups))
+
+    CityMap = folium.Map(zoom_start=11)
+    FastMarkerCluster(data, callback=MARKER_CALLBACK).add_to(CityMap)
+    return folium.Figure().add_child(CityMap).render()
+
+
+#..... One cache per process: Streamlit keeps imported modules between reruns
+CITY_MAPS = CityMapCache()
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
@@ -0,0 +1,111 @@
+import streamlit as st
+from dbutil import DbUtil
+from instrument import PROFILER, instrument_page
+
+#--------- CLASSE: PÁGINA-4 'VISÃO PROXIMIDADE' -------------------------------
+class AppProximidade:
+    """
+    Classe responsável pela interface da visão de proximidade no aplicativo.
+    Usa o índice espacial do DbUtil para listar os restaurantes mais próximos
+    de um ponto, os que estão dentro de um raio e a densidade por região.
+    """
+
+    def __init__(self) -> None:
+        """
+        Construtor da classe. Inicializa o ponto de referência e a instância utilitária.
+        """
+        self.util: DbUtil = None
+        self.latitude: float = 0.0
+        self.longitude: float = 0.0
+        self.city: str = ''
+        self.qtd_vizinhos: int = 10
+        self.raio_km: float = 5.0
+
+    def BarraLateral(self) -> None:
+        """
+        Método para construir a barra lateral do aplicativo.
+        Define o ponto de referência (centro de uma cidade ou coordenadas),
+        a quantidade de vizinhos e o raio de busca.
+        """
+        # Icone e Título do App
+        from PIL import Image
+        image_path = 'Restaurant_Icon.png'
+        image = Image.open(image_path)
+        st.sidebar.image(image, width=60)
+
+        st.sidebar.markdown('## Filtros')
+        st.sidebar.write('Escolha a **CIDADE** de referência:')
+
+        # Centro de cada cidade: mediana das coordenadas dos seus restaurantes,
+        # por (país, cidade): cidades homônimas em países diferentes não se misturam
+        centros = self.util.cached().city_centers()
+        cidades = sorted(centros.index, key=lambda x: (x[1], x[0]))
+        cidade = st.sidebar.selectbox('Cidade:', options=cidades, format_func=lambda x: f'{x[1]} ({x[0]})')
+        self.city = cidade[1]
+        self.latitude = st.sidebar.number_input('Latitude:', value=float(centros.loc[cidade, 'latitude']), format='%.6f')
+        self.longitude = st.sidebar.number_input('Longitude:', value=float(centros.loc[cidade, 'longitude']), format='%.6f')
+
+        st.sidebar.markdown("""---""")
+        self.qtd_vizinhos = st.sidebar.slider('Restaurantes mais próximos:', value=10, min_value=1, max_value=50)
+        self.raio_km = st.sidebar.slider('Raio de busca (km):', value=5.0, min_value=0.5, max_value=50.0, step=0.5)
+
+        # Assinatura do autor
+        st.sidebar.markdown("""---""")
+        st.sidebar.write('')
+        st.sidebar.caption('Powered by Marcelo- 2024')
+        st.sidebar.caption(':blue[servicoseletricosloiola@gmail.com]')
+        st.sidebar.caption('[github](https://github.com/MarceloAlmeida369)')
+
+    def MainPage(self):
+        """
+        Método para construir a página principal do aplicativo.
+        Exibe os vizinhos mais próximos, os restaurantes no raio e a densidade por região.
+        """
+        st.write('# World Restaurants - Visão Proximidade')
+
+        st.divider()
+        with st.container():
+            st.write(f'### Os {self.qtd_vizinhos} restaurantes mais próximos')
+            df2 = self.util.nearest_restaurants(self.latitude, self.longitude, self.qtd_vizinhos)
+            st.dataframe(df2.drop(columns=['latitude', 'longitude']), use_container_width=True)
+
+        st.divider()
+        with st.container():
+            df3 = self.util.restaurants_within(self.latitude, self.longitude, self.raio_km)
+            st.write(f'### {len(df3)} restaurantes em até {self.raio_km:g} km')
+            if len(df3) > 0:
+                st.map(df3.loc[:, ['latitude', 'longitude']])
+
+        st.divider()
+        with st.container():
+            st.write('### Regiões com mais restaurantes (células de 0,25°)')
+            df4 = self.util.restaurant_density()
+            df4.columns = ['Latitude', 'Longitude', 'Qtd. Restaurantes']
+            st.dataframe(df4.head(10), use_container_width=True)
+
+
+#--------- MAIN HOME PROCEDURE ------------------------------------------------
+def main():
+    """
+    Função principal para configuração da aplicação Streamlit.
+    Carrega os dados do cache compartilhado e executa a página de proximidade.
+    """
+    st.set_page_config(page_title="Proximidade", page_icon="📍", layout='wide')
+
+    csv_path = 'dataset/zomato.csv'
+
+    # RESTAURANTS_PROFILE=1: tempos e memória por método, painel no fim da barra lateral
+    instrument_page(AppProximidade)
+    with PROFILER.rerun('Proximidade'):
+        util = DbUtil()
+        util.LoadShared(csv_path)  # Dados limpos uma vez por versão do arquivo, compartilhados entre sessões
+
+        HomePage = AppProximidade()
+        HomePage.util = util
+        HomePage.BarraLateral()
+        HomePage.MainPage()
+    PROFILER.sidebar_panel()
+
+#--------- START ME UP --------------------------------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+#..... How the partials of each aggregate are merged (nunique: distinct pairs, see below)
+PARTIAL_MERGE = {'count': 'sum', 'sum': 'sum', 'size': 'sum', 'max': 'max', 'min': 'min'}
+
+#..... Frame shared with the forked workers (they inherit it, nothing is pickled)
+_SHARED = None
+_SHARED_LOCK = threading.Lock()
+
+#--------- AGREGAÇÃO PARTICIONADA: PARCIAIS EM PARALELO + MERGE ---------------
+#
+# groupby(inKeys).agg(**inAggs) computed per partition of the rows, in a pool,
+# and merged: counts and sums are summed, max/min re-reduced, and nunique
+# merged from the distinct (keys, value) pairs of each partition, so the
+# answer is exact. Partitioned by some of the keys (inBy), every group lives
+# in one partition and its float sums add the same rows in the same order as
+# the serial groupby: bit-identical. Row ranges may differ in the last ulp.
+# Workers are forked processes that inherit the frame and receive only their
+# row positions, but only from a single-threaded caller (build scripts,
+# benchmarks): a fork of the multi-threaded Streamlit server would inherit
+# locks other threads hold (DatasetEntry.lock, logging, allocators) and can
+# hang. There, and where fork is not available, the pool runs threads.
+#
+
+#..... inDF.groupby(inKeys, observed=True, dropna=False).agg(**inAggs).reset_index(), rows in key order
+def partitioned_aggregate(inDF: pd.core.frame.DataFrame, inKeys: list, inAggs: dict,
+                          inWorkers=None, inBy=None) -> pd.core.frame.DataFrame:
+    #
+    # inAggs:    name -> (column, 'count' | 'sum' | 'size' | 'max' | 'min' | 'nunique')
+    # inWorkers: pool size (default: every core); 1 runs serially
+    # inBy:      None splits by row ranges; column(s), e.g. ['city', 'unique_cuisine'],
+    #            keep each of their value combinations inside one partition
+    #
+    workers = inWorkers or os.cpu_count() or 1
+    parts = partition_positions(inDF, workers, inBy)
+    if workers == 1 or len(parts) <= 1:
+        return merge_partials([partial_aggregate(inDF, inKeys, inAggs)], inKeys, inAggs, inDF.dtypes)
+
+    # Imported here: the serial build (the default) never loads the pools
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    if 'fork' in multiprocessing.get_all_start_methods() and threading.active_count() == 1:
+        global _SHARED
+        with _SHARED_LOCK:
+            _SHARED = (inDF, inKeys, inAggs)
+            try:
+                with ProcessPoolExecutor(max_workers=min(workers, len(parts)),
+                                         mp_context=multiprocessing.get_context('fork')) as pool:
+                    partials = list(pool.map(shared_partial, parts))
+            finally:
+                _SHARED = None
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(parts))) as pool:
+            partials = list(pool.map(lambda rows: partial_aggregate(inDF.iloc[rows], inKeys, inAggs), parts))
+    return merge_partials(partials, inKeys, inAggs, inDF.dtypes)
+
+#..... Row positions of each partition: 'inParts' row ranges, or whole values of 'inBy'
+def partition_positions(inDF: pd.core.frame.DataFrame, inParts: int, inBy=None) -> list:
+    rows = len(inDF)
+    if rows == 0:
+        return [np.arange(0)]
+    if inBy is None:
+        bounds = np.linspace(0, rows, min(inParts, rows) + 1).astype(int)
+        return [np.arange(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+    # Group of each row: codes of the value combination of the 'inBy' columns
+    codes = np.zeros(rows, dtype=np.int64)
+    for column in ([inBy] if isinstance(inBy, str) else inBy):
+        column_codes, uniques = pd.factorize(inDF[column], use_na_sentinel=False)
+        codes = codes * (len(uniques) + 1) + column_codes
+    codes, _ = pd.factorize(codes)
+
+    # Largest groups first, each into the lightest partition so far
+    sizes = np.bincount(codes)
+    count = min(inParts, len(sizes))
+    owner = np.empty(len(sizes), dtype=np.int64)
+    loads = np.zeros(count, dtype=np.int64)
+    for group in np.argsort(-sizes, kind='stable'):
+        owner[group] = np.argmin(loads)
+        loads[owner[group]] += sizes[group]
+    row_owner = owner[codes]
+    return [np.flatnonzero(row_owner == i) for i in range(count)]
+
+#..... Partial aggregates of one partition
+def partial_aggregate(inDF: pd.core.frame.DataFrame, inKeys: list, inAggs: dict) -> dict:
+    plain = {name: spec for name, spec in inAggs.items() if spec[1] != 'nunique'}
+    grouped = inDF.groupby(inKeys, observed=True, dropna=False)
+    partial = {'plain': grouped.agg(**plain) if plain else grouped.size().to_frame('_rows')}
+    for name, (column, _) in inAggs.items():
+        if inAggs[name][1] == 'nunique':
+            # Distinct (keys, value) pairs: sets merge exactly, counts would not
+            partial[name] = inDF.loc[inDF[column].notna(), inKeys + [column]].drop_duplicates()
+    return partial
+
+#..... Merge the partials of every partition into the final answer
+#      (inDtypes: the frame's, so categorical keys keep their dtype)
+def merge_partials(inPartials: list, inKeys: list, inAggs: dict, inDtypes=None) -> pd.core.frame.DataFrame:
+    plain = {name: spec for name, spec in inAggs.items() if spec[1] != 'nunique'}
+    merge = {name: (name, PARTIAL_MERGE[func]) for name, (_, func) in plain.items()} or {'_rows': ('_rows', 'sum')}
+    df = ( pd.concat([p['plain'] for p in inPartials])
+             .groupby(level=list(range(len(inKeys))), observed=True, dropna=False)
+             .agg(**merge) )
+    for name, (column, func) in inAggs.items():
+        if func == 'nunique':
+            pairs = pd.concat([p[name] for p in inPartials]).drop_duplicates()
+            counts = pairs.groupby(inKeys, observed=True, dropna=False)[column].nunique()
+            df[name] = counts.reindex(df.index, fill_value=0)
+    df = df.loc[:, list(inAggs)]
+    df.index.names = inKeys
+    df = df.reset_index()
+    if inDtypes is None:
+        return df
+    # Partials with other categories were concatenated as objects: restore
+    # the categoricals, then sort by the keys (missing values last)
+    df = df.astype({key: inDtypes[key] for key in inKeys if isinstance(inDtypes[key], pd.CategoricalDtype)})
+    return df.sort_values(inKeys, kind='stable').reset_index(drop=True)
+
+#..... Worker side of the process pool: the frame comes from the fork
+def shared_partial(inRows: np.ndarray) -> dict:
+    frame, keys, aggs = _SHARED
+    return partial_aggregate(frame.iloc[inRows], keys, aggs)
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
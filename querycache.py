@@ -0,0 +1,151 @@
+
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+#--------- CLASSE: CACHE DE CONSULTAS (LRU) POR ESTADO DOS FILTROS ------------
+class QueryCache():
+
+    #..... CONSTRUCTOR: bounded by number of entries and by bytes of the cached frames
+    def __init__(self, inMaxEntries=512, inMaxBytes=32 * 2**20, inMaxAnswerBytes=2**20) -> None:
+        #
+        # Meant for chart-sized answers (aggregates, rankings, KPIs). Answers
+        # above 'inMaxAnswerBytes' (row-level frames) are returned as computed
+        # and not kept: each would pin a copy of the rows for the process.
+        #
+        self.max_entries = inMaxEntries
+        self.max_bytes = inMaxBytes
+        self.max_answer_bytes = inMaxAnswerBytes
+        self.entries = OrderedDict()        # key -> (answer, bytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversized = 0
+        self.lock = threading.Lock()
+        return
+
+    #..... Cached answer for 'inKey', computed by 'inCompute' on a miss
+    def get(self, inKey, inCompute):
+        with self.lock:
+            if inKey in self.entries:
+                self.entries.move_to_end(inKey)
+                self.hits += 1
+                return answer_copy(self.entries[inKey][0])
+            self.misses += 1
+
+        answer = inCompute()
+        size = answer_bytes(answer)
+        if size > self.max_answer_bytes:
+            with self.lock:
+                self.oversized += 1
+            return answer
+        freeze(answer)
+
+        with self.lock:
+            if inKey not in self.entries:
+                self.entries[inKey] = (answer, size)
+                self.bytes += size
+                while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                    _, (_, dropped) = self.entries.popitem(last=False)
+                    self.bytes -= dropped
+                    self.evictions += 1
+        return answer_copy(answer)
+
+    #..... Counters, for the logs and the debug panels
+    def stats(self) -> dict:
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.bytes, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions, 'oversized': self.oversized}
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+        return
+
+
+#--------- CLASSE: CONSULTAS MEMORIZADAS DE UM OBJETO (DbUtil, RollupCube...) -
+class CachedQueries():
+
+    #..... CONSTRUCTOR: 'inNamespace' identifies the dataset (store key and version)
+    def __init__(self, inTarget, inNamespace, inCache: QueryCache) -> None:
+        self.target = inTarget
+        self.namespace = inNamespace
+        self.cache = inCache
+        return
+
+    #..... target.method(*args), answered from the cache when the arguments allow it
+    def __getattr__(self, inName):
+        method = getattr(self.target, inName)
+
+        def query(*args, **kwargs):
+            if self.namespace is None:
+                return method(*args, **kwargs)
+            try:
+                key = query_key(self.namespace, type(self.target).__name__, inName, args, kwargs)
+            except TypeError:
+                # Frames and other unhashable arguments: no canonical key
+                return method(*args, **kwargs)
+            return self.cache.get(key, lambda: method(*args, **kwargs))
+        return query
+
+
+#..... Canonical form of a filter argument. Lists are selections (isin), so
+#      their order does not change the answer: ['India', 'Brazil'] == ['Brazil', 'India']
+def canonical(inValue):
+    if inValue is None or isinstance(inValue, (bool, int, float, str)):
+        return inValue
+    if isinstance(inValue, (np.integer, np.floating, np.bool_)):
+        return inValue.item()
+    if isinstance(inValue, (list, tuple, set, frozenset)):
+        return ('set', tuple(sorted({repr(canonical(x)) for x in inValue})))
+    raise TypeError(f'argument of type {type(inValue).__name__} has no canonical form')
+
+#..... SHA-1 of the canonical (namespace, object, method, arguments)
+def query_key(inNamespace, inTarget, inMethod, inArgs, inKwargs) -> str:
+    state = (inNamespace, inTarget, inMethod,
+             tuple(canonical(x) for x in inArgs),
+             tuple(sorted((k, canonical(v)) for k, v in inKwargs.items())))
+    return hashlib.sha1(repr(state).encode()).hexdigest()
+
+#..... Cached frames are shared by every session: make them read-only
+def freeze(inAnswer) -> None:
+    if isinstance(inAnswer, pd.DataFrame):
+        for values in inAnswer._mgr.arrays:
+            if isinstance(values, np.ndarray):
+                values.flags.writeable = False
+    elif isinstance(inAnswer, dict):
+        for value in inAnswer.values():
+            freeze(value)
+    return
+
+#..... Shallow copy for the caller: the pages rename columns (df.columns = [...])
+def answer_copy(inAnswer):
+    if isinstance(inAnswer, (pd.DataFrame, pd.Series)):
+        return inAnswer.copy(deep=False)
+    if isinstance(inAnswer, dict):
+        return {k: answer_copy(v) for k, v in inAnswer.items()}
+    if isinstance(inAnswer, list):
+        return list(inAnswer)
+    return inAnswer
+
+#..... Bytes of the numpy data held by an answer (shared strings not counted)
+def answer_bytes(inAnswer) -> int:
+    if isinstance(inAnswer, (pd.DataFrame, pd.Series)):
+        return int(np.sum(inAnswer.memory_usage(index=True, deep=False)))
+    if isinstance(inAnswer, dict):
+        return sum(answer_bytes(v) for v in inAnswer.values())
+    if isinstance(inAnswer, list):
+        return 8 * len(inAnswer)
+    return 0
+
+
+#..... One cache per process: Streamlit keeps imported modules between reruns
+QUERY_CACHE = QueryCache()
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
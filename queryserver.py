@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from dbutil import DbUtil
+from rollup import RATING_HIGH, RATING_LOW
+from querycache import query_key
+from instrument import PROFILER, install
+
+#--------- SERVIDOR: CONSULTAS DO DbUtil EM HTTP/JSON (SEM STREAMLIT) ---------
+#
+# Um processo asyncio com um único DbUtil carregado (o mesmo store
+# compartilhado das páginas, recarregado quando o CSV muda). Rodar:
+#
+#     python queryserver.py [dataset/zomato.csv] [--port 8765]
+#
+#     GET  /health
+#     GET  /queries
+#     GET  /metrics (Prometheus; tempos por método com RESTAURANTS_PROFILE=1)
+#     GET  /query/<nome>?countries=India,Brazil&cuisines=...&limit=10
+#     POST /batch   {"queries": [{"query": "<nome>", "params": {...}}, ...]}
+#
+# Respostas em cache por (versão dos dados, consulta, parâmetros), com ETag:
+# If-None-Match devolve 304 sem recalcular. Pedidos iguais simultâneos
+# esperam um único cálculo.
+#
+
+#..... Parameters accepted by the queries, with their defaults
+QUERY_PARAMS = {'countries': None, 'cuisines': None, 'limit': None, 'k': 10, 'ascending': False}
+
+#..... Seconds between checks of the CSV for a new version
+VERSION_CHECK_SECONDS = 1.0
+
+#..... Cities per ranking in AppCidades.MainPage
+CITY_RANKING_SIZE = 10
+
+#..... Queries served: name -> function(util, params) -> DataFrame
+def run_qty_restaurants_per_country(util, params):
+    return util.cached(util.rollup()).qty_restaurants_per_country(params['countries'])
+
+def run_qty_cities_per_country(util, params):
+    return util.cached(util.rollup()).qty_cities_per_country(params['countries'])
+
+def run_best_cuisines(util, params):
+    return util.cached(util.rollup()).best_cuisines(params['ascending'], params['countries'], params['cuisines'])
+
+def run_best_restaurants(util, params):
+    return util.best_restaurants_in(params['countries'], params['cuisines'], params['k'])
+
+def run_cities_restaurants(util, params):
+    return util.cached(util.rollup()).qty_restaurants_per_city(params['countries'])
+
+def run_cities_best_rated(util, params):
+    return util.cached(util.rollup()).qty_rated_restaurants_per_city(RATING_HIGH, params['countries'])
+
+def run_cities_worst_rated(util, params):
+    return util.cached(util.rollup()).qty_rated_restaurants_per_city(RATING_LOW, params['countries'])
+
+def run_cities_cuisines(util, params):
+    return util.cached(util.city_cuisines()).qty_cuisines_per_city(params['countries'])
+
+SERVER_QUERIES = {
+    'qty_restaurants_per_country': run_qty_restaurants_per_country,
+    'qty_cities_per_country': run_qty_cities_per_country,
+    'best_cuisines': run_best_cuisines,
+    'best_restaurants': run_best_restaurants,
+    'cities_restaurants': run_cities_restaurants,
+    'cities_best_rated': run_cities_best_rated,
+    'cities_worst_rated': run_cities_worst_rated,
+    'cities_cuisines': run_cities_cuisines,
+}
+
+#..... Rankings of the cities page: only the top cities, as in its charts
+CITY_RANKINGS = ['cities_restaurants', 'cities_best_rated', 'cities_worst_rated', 'cities_cuisines']
+
+#--------- CLASSE: ERRO NO PEDIDO (HTTP 4xx) -----------------------------------
+class RequestError(Exception):
+    def __init__(self, inStatus: int, inMessage: str) -> None:
+        super().__init__(inMessage)
+        self.status = inStatus
+
+
+#--------- CLASSE: MOTOR DE CONSULTAS COM CACHE DE RESPOSTAS ------------------
+class QueryServer():
+
+    #..... CONSTRUCTOR: 'inCSVfile' is loaded through the shared store (DbUtil.LoadShared)
+    def __init__(self, inCSVfile, inThreads=4, inMaxResponses=1024) -> None:
+        self.csv = inCSVfile
+        self.max_responses = inMaxResponses
+        self.responses = OrderedDict()      # key -> JSON body (bytes)
+        self.inflight = {}                  # key -> Future of a body being computed
+        self.pool = ThreadPoolExecutor(max_workers=inThreads, thread_name_prefix='query')
+        self.local = threading.local()
+        self.checked = (float('-inf'), None)     # (monotonic time, version)
+        return
+
+    #..... Engine of the current thread, on the current version of the CSV (a stat per call)
+    def engine(self) -> DbUtil:
+        util = getattr(self.local, 'util', None)
+        if util is None:
+            util = self.local.util = DbUtil()
+        util.LoadShared(self.csv)
+        return util
+
+    #..... Version of the loaded data (part of every cache key and ETag)
+    def version(self) -> str:
+        return self.engine().dataset.version
+
+    #..... Same, checked on the file at most every VERSION_CHECK_SECONDS
+    async def current_version(self) -> str:
+        checked, version = self.checked
+        if time.monotonic() - checked >= VERSION_CHECK_SECONDS:
+            version = await asyncio.get_running_loop().run_in_executor(self.pool, self.version)
+            self.checked = (time.monotonic(), version)
+        return version
+
+    #..... (JSON body, ETag) of one query; None as body when 'inETag' still matches
+    async def answer(self, inName: str, inParams: dict, inETag=None) -> tuple:
+        if inName not in SERVER_QUERIES:
+            raise RequestError(404, f'unknown query: {inName}')
+        params = query_params(inParams)
+        loop = asyncio.get_running_loop()
+        version = await self.current_version()
+        key, etag = response_key(version, inName, params)
+        if inETag is not None and etag in [tag.strip() for tag in inETag.split(',')]:
+            return None, etag
+
+        body = self.responses.get(key)
+        if body is not None:
+            self.responses.move_to_end(key)
+            return body, etag
+
+        # Identical requests in flight share one computation
+        future = self.inflight.get(key)
+        if future is None:
+            future = loop.run_in_executor(self.pool, self.compute, inName, params)
+            self.inflight[key] = future
+            try:
+                body, used = await future
+            finally:
+                del self.inflight[key]
+            # The checked version can be up to VERSION_CHECK_SECONDS old: the
+            # answer is cached (and tagged) under the version it was computed on
+            if used != version:
+                self.checked = (time.monotonic(), used)
+                key, etag = response_key(used, inName, params)
+            self.responses[key] = body
+            while len(self.responses) > self.max_responses:
+                self.responses.popitem(last=False)
+        else:
+            body, used = await future
+            etag = response_key(used, inName, params)[1]
+        return body, etag
+
+    #..... Run a query (worker thread): (serialized answer, version it was computed on)
+    def compute(self, inName: str, inParams: dict) -> tuple:
+        util = self.engine()
+        version = util.dataset.version
+        df = SERVER_QUERIES[inName](util, inParams)
+        limit = inParams['limit']
+        if limit is None and inName in CITY_RANKINGS:
+            limit = CITY_RANKING_SIZE
+        if limit is not None:
+            df = df.head(limit)
+        answer = {'query': inName, 'version': version, 'rows': len(df),
+                  'columns': list(df.columns), 'data': json.loads(df.to_json(orient='values'))}
+        return json.dumps(answer, ensure_ascii=False).encode('utf-8'), version
+
+    #..... Several queries in one request, computed concurrently
+    async def batch(self, inQueries: list) -> bytes:
+        async def one(item):
+            try:
+                if not isinstance(item, dict) or 'query' not in item:
+                    raise RequestError(400, 'each item needs a "query"')
+                body, _ = await self.answer(item['query'], item.get('params') or {})
+                return json.loads(body)
+            except RequestError as error:
+                return {'query': item.get('query') if isinstance(item, dict) else None,
+                        'error': str(error), 'status': error.status}
+        results = await asyncio.gather(*(one(item) for item in inQueries))
+        return json.dumps({'results': results}, ensure_ascii=False).encode('utf-8')
+
+    #----- HTTP/1.1 (keep-alive) ----------------------------------------------
+
+    async def handle(self, inReader: asyncio.StreamReader, inWriter: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await read_request(inReader)
+                except RequestError as error:
+                    # The rest of the stream can not be framed: answer and close
+                    inWriter.write(http_response(error.status, json.dumps({'error': str(error)}).encode(), {}, False))
+                    await inWriter.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, extra, payload = await self.route(method, target, headers, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                inWriter.write(http_response(status, payload, extra, keep_alive))
+                await inWriter.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            inWriter.close()
+        return
+
+    async def route(self, inMethod: str, inTarget: str, inHeaders: dict, inBody: bytes) -> tuple:
+        url = urlsplit(inTarget)
+        try:
+            if inMethod == 'GET' and url.path == '/health':
+                version = await self.current_version()
+                return 200, {}, json.dumps({'status': 'ok', 'version': version}).encode()
+            if inMethod == 'GET' and url.path == '/metrics':
+                # Prometheus text: counters of the instrumented methods (RESTAURANTS_PROFILE=1)
+                return 200, {'Content-Type': 'text/plain; version=0.0.4'}, PROFILER.prometheus().encode()
+            if inMethod == 'GET' and url.path == '/queries':
+                return 200, {}, json.dumps({'queries': list(SERVER_QUERIES), 'params': list(QUERY_PARAMS)}).encode()
+            if inMethod == 'GET' and url.path.startswith('/query/'):
+                params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                body, etag = await self.answer(url.path[len('/query/'):], params, inHeaders.get('if-none-match'))
+                return (304, {'ETag': etag}, b'') if body is None else (200, {'ETag': etag}, body)
+            if inMethod == 'POST' and url.path == '/batch':
+                try:
+                    queries = json.loads(inBody or b'{}')['queries']
+                except (ValueError, KeyError, TypeError):
+                    raise RequestError(400, 'expected {"queries": [...]}')
+                if not isinstance(queries, list):
+                    raise RequestError(400, '"queries" must be a list')
+                return 200, {}, await self.batch(queries)
+            raise RequestError(404, f'no route for {inMethod} {url.path}')
+        except RequestError as error:
+            return error.status, {}, json.dumps({'error': str(error)}).encode()
+        except Exception as error:
+            # A failing query answers 500; the connection and the server go on
+            return 500, {}, json.dumps({'error': f'{type(error).__name__}: {error}'}).encode()
+
+
+#..... (cache key, ETag) of a query's answer on a version of the data
+def response_key(inVersion: str, inName: str, inParams: dict) -> tuple:
+    key = query_key(inVersion, 'queryserver', inName, (), inParams)
+    return key, f'"{inVersion}-{key[:16]}"'
+
+#..... Query parameters from a query string or JSON: lists, numbers and flags checked
+def query_params(inParams: dict) -> dict:
+    unknown = set(inParams) - set(QUERY_PARAMS)
+    if unknown:
+        raise RequestError(400, f'unknown parameters: {", ".join(sorted(unknown))}')
+    params = dict(QUERY_PARAMS)
+    for name in ('countries', 'cuisines'):
+        value = inParams.get(name)
+        if isinstance(value, str):
+            value = [item.strip() for item in value.split(',') if item.strip()]
+        if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+            raise RequestError(400, f'{name}: expected a list of names')
+        params[name] = value
+    for name in ('limit', 'k'):
+        if inParams.get(name) is not None:
+            try:
+                params[name] = int(inParams[name])
+            except (TypeError, ValueError):
+                raise RequestError(400, f'{name}: expected an integer')
+            if params[name] < 1:
+                raise RequestError(400, f'{name}: expected a positive integer')
+    if 'ascending' in inParams:
+        value = inParams['ascending']
+        params['ascending'] = value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'yes')
+    return params
+
+#..... (method, target, headers, body) of the next request, None at end of stream
+async def read_request(inReader: asyncio.StreamReader):
+    line = await inReader.readline()
+    if not line.strip():
+        return None
+    parts = line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise ConnectionError('malformed request line')
+    headers = {}
+    while True:
+        line = await inReader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0) or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise RequestError(400, 'invalid Content-Length')
+    body = await inReader.readexactly(length) if length else b''
+    return parts[0].upper(), parts[1], headers, body
+
+HTTP_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+
+def http_response(inStatus: int, inBody: bytes, inHeaders: dict, inKeepAlive: bool) -> bytes:
+    headers = {'Content-Type': 'application/json; charset=utf-8',
+               'Content-Length': str(len(inBody)),
+               'Cache-Control': 'no-cache',
+               'Connection': 'keep-alive' if inKeepAlive else 'close'}
+    headers.update(inHeaders)
+    head = f'HTTP/1.1 {inStatus} {HTTP_REASONS.get(inStatus, "")}\r\n'
+    head += ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+    return (head + '\r\n').encode('latin-1') + inBody
+
+async def serve(inCSVfile, inHost: str, inPort: int, inThreads: int) -> None:
+    install()       # timers on the data layer when RESTAURANTS_PROFILE=1
+    server = QueryServer(inCSVfile, inThreads)
+    # Load (and clean) before accepting requests
+    await server.current_version()
+    listener = await asyncio.start_server(server.handle, inHost, inPort)
+    print(f'queryserver: http://{inHost}:{inPort} ({inCSVfile})', flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor HTTP/JSON das consultas do DbUtil.')
+    parser.add_argument('csv', nargs='?', default='dataset/zomato.csv', help='arquivo CSV de origem')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--threads', type=int, default=4, help='threads que executam as consultas')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.csv, args.host, args.port, args.threads))
+    except KeyboardInterrupt:
+        pass
+
+#--------- START ME UP --------------------------------------------------------
+if __name__ == "__main__":
+    main()
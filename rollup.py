@@ -0,0 +1,224 @@
+
+import numpy as np
+import pandas as pd
+from partitioned import partitioned_aggregate
+
+#..... Cell dimensions. 'country_code' follows 'country_name' (1:1), so it adds no cells
+ROLLUP_DIMENSIONS = ['country_code', 'country_name', 'city', 'unique_cuisine',
+                     'price_range', 'rating_bucket']
+
+#..... Additive partials kept by each cell
+ROLLUP_MEASURES = ['restaurants', 'votes_sum', 'votes_count', 'cost_sum', 'cost_count',
+                   'rating_tenths', 'rating_count']
+
+#..... How each partial is computed from the rows of a cell
+ROLLUP_AGGREGATES = {
+    'restaurants': ('restaurant_id', 'count'),
+    'votes_sum': ('votes', 'sum'),
+    'votes_count': ('votes', 'count'),
+    'cost_sum': ('average_cost_for_two', 'sum'),
+    'cost_count': ('average_cost_for_two', 'count'),
+    'rating_tenths': ('rating_tenths', 'sum'),
+    'rating_count': ('aggregate_rating', 'count'),
+}
+
+#..... Partitions of the parallel build: dimensions, so each cell is built by one worker
+ROLLUP_PARTITION = ['city', 'unique_cuisine']
+
+#..... Rating buckets, with the limits used by the dashboards (< 2.5 and > 4.0)
+RATING_LOW = 'low'      # aggregate_rating < 2.5
+RATING_MID = 'mid'      # 2.5 <= aggregate_rating <= 4.0
+RATING_HIGH = 'high'    # aggregate_rating > 4.0
+
+#--------- CLASSE: CUBO PRÉ-AGREGADO (PAÍS x CIDADE x CULINÁRIA x ...) --------
+class RollupCube():
+
+    #----- INITIAL METHODS: CONSTRUCTOR ---------------------------------------
+    #..... CONSTRUCTOR: aggregate the cleaned frame once, at load time
+    #      (inWorkers > 1: partitioned, in a pool; processes offline, threads in the server)
+    def __init__(self, inDF: pd.core.frame.DataFrame, inWorkers=None) -> None:
+        #
+        # Each cell keeps additive partials only (counts and sums), so any
+        # selection is answered by summing the matching cells. Cells are far
+        # fewer than rows, and their number does not grow with new restaurants
+        # of an existing (country, city, cuisine, price, rating) combination.
+        #
+        self.cells = rollup_cells(inDF, inWorkers)
+        return
+
+    #..... Cube over cells already aggregated (the file written by build_snapshot.py)
+    @staticmethod
+    def from_cells(inCells: pd.core.frame.DataFrame) -> 'RollupCube':
+        cube = RollupCube.__new__(RollupCube)
+        cube.cells = inCells
+        return cube
+
+    #..... New cube with rows added and removed: partials of the delta, summed cell by cell
+    def updated(self, inAdded: pd.core.frame.DataFrame, inRemoved: pd.core.frame.DataFrame) -> 'RollupCube':
+        removed = rollup_cells(inRemoved)
+        removed[ROLLUP_MEASURES] = -removed[ROLLUP_MEASURES]
+        cells = ( pd.concat([self.cells, rollup_cells(inAdded), removed], ignore_index=True)
+                    .groupby(ROLLUP_DIMENSIONS, dropna=False, sort=False)[ROLLUP_MEASURES].sum()
+                    .reset_index() )
+        return RollupCube.from_cells(cells.loc[cells['restaurants'] > 0].reset_index(drop=True))
+
+    #..... Cells that match the selection (None = everything)
+    def select(self, list_of_countries=None, list_of_cuisines=None) -> pd.core.frame.DataFrame:
+        cells = self.cells
+        if list_of_countries is not None:
+            cells = cells.loc[cells['country_name'].isin(list_of_countries)]
+        if list_of_cuisines is not None:
+            cells = cells.loc[cells['unique_cuisine'].isin(list_of_cuisines)]
+        return cells
+
+    #----- COUNTRIES ----------------------------------------------------------
+
+    def countries_with_more_restaurants(self, NumCountries: int) -> list:
+        if NumCountries < 1:
+            return []
+        df = self.qty_restaurants_per_country()
+        return df.loc[0:(NumCountries-1), 'country_name'].tolist()
+
+    def qty_restaurants_per_country(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        df = ( self.select(list_of_countries)
+                   .groupby('country_name', observed=True)['restaurants'].sum()
+                   .rename('restaurant_id')
+                   .to_frame()
+                   .sort_values(by=['restaurant_id'], ascending=False)
+                   .reset_index() )
+        return df
+
+    def qty_cities_per_country(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        df = ( self.select(list_of_countries)
+                   .groupby('country_name', observed=True)['city'].nunique()
+                   .to_frame()
+                   .sort_values(by=['city'], ascending=False)
+                   .reset_index() )
+        return df
+
+    def mean_rating_per_country(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        # (mean number of votes, as in DbUtil.mean_rating_per_country)
+        sums = ( self.select(list_of_countries)
+                     .groupby('country_name', observed=True)[['votes_sum', 'votes_count']].sum() )
+        df = ( (sums['votes_sum'] / sums['votes_count']).rename('votes')
+                   .to_frame()
+                   .sort_values(by=['votes'], ascending=False)
+                   .reset_index() )
+        df['votes'] = df.loc[:,'votes'].apply( lambda x: round(x, 0) )
+        return df
+
+    def mean_costfor2_per_country(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        sums = ( self.select(list_of_countries)
+                     .groupby(['country_code','country_name'], observed=True)[['cost_sum', 'cost_count']].sum() )
+        df = ( (sums['cost_sum'] / sums['cost_count']).rename('average_cost_for_two')
+                   .to_frame()
+                   .sort_values('average_cost_for_two', ascending=False)
+                   .reset_index() )
+        df['average_cost_for_two'] = df.loc[:,'average_cost_for_two'].apply( lambda x: round(x, 1) )
+        return df
+
+    #----- CITIES -------------------------------------------------------------
+
+    def qty_restaurants_per_city(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        df = ( self.select(list_of_countries)
+                   .groupby(['country_name', 'city'], observed=True)['restaurants'].sum()
+                   .rename('restaurant_id')
+                   .to_frame()
+                   .sort_values(by='restaurant_id', ascending=False)
+                   .reset_index() )
+        return df
+
+    #..... Restaurants per city within one rating bucket (RATING_LOW / RATING_HIGH)
+    def qty_rated_restaurants_per_city(self, inBucket: str, list_of_countries=None) -> pd.core.frame.DataFrame:
+        cells = self.select(list_of_countries)
+        cells = cells.loc[cells['rating_bucket'] == inBucket]
+        df = ( cells.groupby(['country_name', 'city'], observed=True)['restaurants'].sum()
+                    .rename('aggregate_rating')
+                    .to_frame()
+                    .sort_values(by='aggregate_rating', ascending=False)
+                    .reset_index() )
+        return df
+
+    #----- CUISINES -----------------------------------------------------------
+
+    def cuisines_with_more_restaurants(self, NumCuisines: int,
+                                       list_of_countries=None, list_of_cuisines=None) -> list:
+        if NumCuisines < 1:
+            return []
+        df = ( self.select(list_of_countries, list_of_cuisines)
+                   .groupby('unique_cuisine', observed=True)['restaurants'].sum()
+                   .to_frame()
+                   .sort_values(by=['restaurants'], ascending=False)
+                   .reset_index() )
+        return df.loc[0:(NumCuisines-1), 'unique_cuisine'].tolist()
+
+    def best_cuisines(self, ascending_order: bool,
+                      list_of_countries=None, list_of_cuisines=None) -> pd.core.frame.DataFrame:
+        return ranked_cuisines(self.cuisine_means(list_of_countries, list_of_cuisines), ascending_order)
+
+    #..... Rating partials per cuisine (rating_tenths, rating_count), unsorted: one
+    #      groupby for the best and the worst cuisines (ranked_cuisines(means, False / True))
+    def cuisine_means(self, list_of_countries=None, list_of_cuisines=None) -> pd.core.frame.DataFrame:
+        return ( self.select(list_of_countries, list_of_cuisines)
+                     .groupby('unique_cuisine', observed=True)[['rating_tenths', 'rating_count']].sum() )
+
+
+#..... Cells (dimensions + additive partials) of the rows of 'inDF'
+def rollup_cells(inDF: pd.core.frame.DataFrame, inWorkers=None) -> pd.core.frame.DataFrame:
+    df = inDF.loc[:, ['country_code', 'country_name', 'city', 'unique_cuisine',
+                      'price_range', 'restaurant_id', 'votes',
+                      'average_cost_for_two', 'aggregate_rating']]
+    df = df.assign(rating_bucket=rating_bucket(df['aggregate_rating']),
+                   rating_tenths=rating_tenths(df['aggregate_rating']))
+    if inWorkers is not None and inWorkers > 1:
+        cells = partitioned_aggregate(df, ROLLUP_DIMENSIONS, ROLLUP_AGGREGATES, inWorkers, ROLLUP_PARTITION)
+    else:
+        cells = ( df.groupby(ROLLUP_DIMENSIONS, observed=True, dropna=False)
+                    .agg(**ROLLUP_AGGREGATES)
+                    .reset_index() )
+    # Plain values in the answers, whatever the frame's dtypes (snapshot or
+    # compact schema): unused categories would show up in the charts
+    categorical = [col for col in ROLLUP_DIMENSIONS if isinstance(cells[col].dtype, pd.CategoricalDtype)]
+    if categorical:
+        cells = cells.astype({col: object for col in categorical})
+        # ...and cells sorted by value, as groupby sorts plain columns
+        cells = cells.sort_values(ROLLUP_DIMENSIONS, kind='stable').reset_index(drop=True)
+    return cells
+
+#..... Rating partials per cuisine of the rows of 'inDF' (as RollupCube.cuisine_means)
+def cuisine_means(inDF: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+    df = inDF.loc[:, ['unique_cuisine', 'aggregate_rating']]
+    df = df.assign(rating_tenths=rating_tenths(df['aggregate_rating']))
+    return df.groupby('unique_cuisine', observed=True).agg(rating_tenths=('rating_tenths', 'sum'),
+                                                           rating_count=('aggregate_rating', 'count'))
+
+#..... Cuisines ranked by mean rating (from cuisine_means), rounded to 0.1 after sorting
+def ranked_cuisines(inMeans: pd.core.frame.DataFrame, ascending_order: bool) -> pd.core.frame.DataFrame:
+    #
+    # Sums are integer tenths, so they are the same whatever the order in
+    # which cells or rows were added, and the mean is divided once, here.
+    # Rounding is half up on the exact fraction: (2s + n) // 2n tenths.
+    # Ties keep the cuisine names in alphabetical order.
+    #
+    tenths = inMeans['rating_tenths'].astype(np.int64)
+    count = inMeans['rating_count'].astype(np.int64)
+    df = ( pd.DataFrame({'mean': tenths / count,
+                         'aggregate_rating': ((2 * tenths + count) // (2 * count)) / 10},
+                        index=inMeans.index)
+             .rename_axis('unique_cuisine')
+             .reset_index()
+             .sort_values(by=['mean', 'unique_cuisine'], ascending=[ascending_order, True])
+             .reset_index(drop=True) )
+    return df.loc[:, ['unique_cuisine', 'aggregate_rating']]
+
+#..... Ratings as integer tenths (missing ratings: 0, and not counted by 'count')
+def rating_tenths(inRating: pd.core.series.Series) -> pd.core.series.Series:
+    return (inRating * 10).round().fillna(0).astype(np.int64)
+
+#..... Bucket of each rating: RATING_LOW, RATING_MID or RATING_HIGH
+def rating_bucket(inRating: pd.core.series.Series) -> np.ndarray:
+    return np.select([inRating < 2.5, inRating > 4.0], [RATING_LOW, RATING_HIGH], RATING_MID)
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
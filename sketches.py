@@ -0,0 +1,309 @@
+
+import math
+import numpy as np
+import pandas as pd
+
+#..... Columns with distinct-count sketches and with quantile sketches
+SKETCH_DISTINCT = ['country_name', 'city', 'restaurant_name', 'unique_cuisine']
+SKETCH_QUANTILES = ['aggregate_rating', 'average_cost_for_two']
+
+#..... HyperLogLog precision: 2**14 registers, standard error 1.04 / 128 = 0.8%
+HLL_PRECISION = 14
+
+#..... Up to this many distinct values a sketch keeps their hashes and counts
+#      exactly (128 KiB at most); the registers only take over beyond it
+HLL_EXACT_LIMIT = 16384
+
+#..... 2**-rank for every possible register value
+HLL_POWERS = np.ldexp(1.0, -np.arange(65))
+
+#..... Quantile sketches: answers within 1% of the true value (relative error)
+QUANTILE_ACCURACY = 0.01
+
+#..... Up to this many distinct values a quantile sketch keeps the exact histogram
+QUANTILE_EXACT_LIMIT = 4096
+
+#--------- CLASSE: CONTAGEM DE DISTINTOS (EXATA, DEPOIS HYPERLOGLOG) ----------
+class HyperLogLog():
+
+    #..... CONSTRUCTOR: empty sketch with 2**inPrecision registers (11..16)
+    def __init__(self, inPrecision=HLL_PRECISION) -> None:
+        #
+        # Each value is hashed to 64 bits. Up to HLL_EXACT_LIMIT distinct
+        # hashes the sketch keeps them (sorted): the count is exact, and a
+        # collision among 16k 64-bit hashes has odds below 1e-11. Beyond it,
+        # the first 'p' bits pick a register, which keeps the longest run of
+        # leading zeros seen in the other bits (standard error 1.04/sqrt(m)).
+        # Sketches merge by union of the hashes or register-wise max.
+        #
+        if not 11 <= inPrecision <= 16:
+            raise ValueError(f'HyperLogLog precision must be in 11..16: {inPrecision}')
+        self.precision = inPrecision
+        self.hashes = np.empty(0, dtype=np.uint64)       # exact mode
+        self.registers = None                            # estimated mode
+        return
+
+    #..... True while the sketch holds every distinct hash
+    @property
+    def exact(self) -> bool:
+        return self.registers is None
+
+    #..... Sketch of the values of a column (missing values are not counted)
+    @staticmethod
+    def of(inValues: pd.core.series.Series, inPrecision=HLL_PRECISION) -> 'HyperLogLog':
+        sketch = HyperLogLog(inPrecision)
+        sketch.add_hashes(np.unique(hll_hashes(inValues)))
+        return sketch
+
+    #..... Union of sketches with the same precision
+    @staticmethod
+    def merged(inSketches: list, inPrecision=HLL_PRECISION) -> 'HyperLogLog':
+        sketch = HyperLogLog(inPrecision)
+        exact = [other.hashes for other in inSketches if other.exact]
+        if exact:
+            sketch.add_hashes(np.unique(np.concatenate(exact)))
+        for other in inSketches:
+            if not other.exact:
+                sketch.to_registers()
+                np.maximum(sketch.registers, other.registers, out=sketch.registers)
+        return sketch
+
+    #..... Add unique hashes: kept while they fit, else folded into the registers
+    def add_hashes(self, inHashes: np.ndarray) -> None:
+        if self.exact:
+            hashes = np.union1d(self.hashes, inHashes)
+            if len(hashes) <= HLL_EXACT_LIMIT:
+                self.hashes = hashes
+                return
+            self.to_registers()
+        index, rank = hll_positions(inHashes, self.precision)
+        np.maximum.at(self.registers, index, rank)
+        return
+
+    #..... Switch to the registers (estimated mode), folding the kept hashes into them
+    def to_registers(self) -> None:
+        if not self.exact:
+            return
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        index, rank = hll_positions(self.hashes, self.precision)
+        np.maximum.at(self.registers, index, rank)
+        self.hashes = np.empty(0, dtype=np.uint64)
+        return
+
+    #..... Number of distinct values (exact mode) or its estimate
+    def count(self) -> int:
+        if self.exact:
+            return len(self.hashes)
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(HLL_POWERS[self.registers])
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros > 0:
+            # Small cardinalities: linear counting of the empty registers
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    #..... Relative standard error of count() (0 in exact mode)
+    def error(self) -> float:
+        return 0.0 if self.exact else 1.04 / math.sqrt(1 << self.precision)
+
+
+#--------- CLASSE: QUANTIS (EXATOS, DEPOIS COM ERRO RELATIVO GARANTIDO) -------
+class QuantileSketch():
+
+    #..... CONSTRUCTOR: empty sketch, answers within inAccuracy of the true value
+    def __init__(self, inAccuracy=QUANTILE_ACCURACY) -> None:
+        #
+        # Up to QUANTILE_EXACT_LIMIT distinct values the sketch is their
+        # histogram (value -> count), so quantiles are exact: ratings have
+        # about 30 distinct values. Beyond it, logarithmic buckets (DDSketch):
+        # bucket k holds the values in (gamma**(k-1), gamma**k],
+        # gamma = (1+a)/(1-a), so any value read back from its bucket is
+        # within a relative error 'a'. Zero and negative values go to their
+        # own counter. Counts add on merge in both modes.
+        #
+        self.accuracy = inAccuracy
+        self.gamma = (1 + inAccuracy) / (1 - inAccuracy)
+        self.values = np.empty(0, dtype=float)           # exact mode: sorted values
+        self.value_counts = np.empty(0, dtype=np.int64)  #             and their counts
+        self.offset = 0                                  # key of counts[0]
+        self.counts = None                               # bucket mode
+        self.zeros = 0
+        return
+
+    #..... True while the sketch holds the exact histogram
+    @property
+    def exact(self) -> bool:
+        return self.counts is None
+
+    #..... Sketch of the values of a column (missing values are not counted)
+    @staticmethod
+    def of(inValues: pd.core.series.Series, inAccuracy=QUANTILE_ACCURACY) -> 'QuantileSketch':
+        values = inValues.to_numpy(dtype=float, na_value=np.nan)
+        values, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+        return QuantileSketch.from_histogram(values, counts, inAccuracy)
+
+    #..... Sketch of a histogram (sorted unique values, counts)
+    @staticmethod
+    def from_histogram(inValues: np.ndarray, inCounts: np.ndarray, inAccuracy=QUANTILE_ACCURACY) -> 'QuantileSketch':
+        sketch = QuantileSketch(inAccuracy)
+        sketch.values, sketch.value_counts = inValues, inCounts.astype(np.int64)
+        if len(inValues) > QUANTILE_EXACT_LIMIT:
+            sketch.to_buckets()
+        return sketch
+
+    #..... Union of sketches with the same accuracy
+    @staticmethod
+    def merged(inSketches: list, inAccuracy=QUANTILE_ACCURACY) -> 'QuantileSketch':
+        exact = [s for s in inSketches if s.exact]
+        values = np.concatenate([s.values for s in exact]) if exact else np.empty(0)
+        counts = np.concatenate([s.value_counts for s in exact]) if exact else np.empty(0, dtype=np.int64)
+        values, inverse = np.unique(values, return_inverse=True)
+        sketch = QuantileSketch.from_histogram(values, np.bincount(inverse, counts, len(values)), inAccuracy)
+
+        buckets = [s for s in inSketches if not s.exact]
+        if buckets:
+            sketch.to_buckets()
+            buckets.append(sketch)
+            sketch.zeros = sum(s.zeros for s in buckets)
+            filled = [s for s in buckets if len(s.counts)]
+            if filled:
+                offset = min(s.offset for s in filled)
+                top = max(s.offset + len(s.counts) for s in filled)
+                counts = np.zeros(top - offset, dtype=np.int64)
+                for s in filled:
+                    start = s.offset - offset
+                    counts[start:start + len(s.counts)] += s.counts
+                sketch.offset, sketch.counts = offset, counts
+        return sketch
+
+    #..... Switch to the logarithmic buckets, folding the histogram into them
+    def to_buckets(self) -> None:
+        if not self.exact:
+            return
+        positive = self.values > 0
+        self.zeros = int(self.value_counts[~positive].sum())
+        self.counts = np.zeros(0, dtype=np.int64)
+        if positive.any():
+            keys = np.ceil(np.log(self.values[positive]) / math.log(self.gamma)).astype(np.int64)
+            self.offset = int(keys.min())
+            self.counts = np.bincount(keys - self.offset, self.value_counts[positive]).astype(np.int64)
+        self.values = np.empty(0, dtype=float)
+        self.value_counts = np.empty(0, dtype=np.int64)
+        return
+
+    def count(self) -> int:
+        if self.exact:
+            return int(self.value_counts.sum())
+        return self.zeros + int(self.counts.sum())
+
+    #..... Value of rank floor(q * (n - 1)) (0 <= q <= 1), as quantile(interpolation='lower');
+    #      NaN when the sketch is empty
+    def quantile(self, q: float) -> float:
+        total = self.count()
+        if total == 0:
+            return float('nan')
+        rank = math.floor(q * (total - 1))
+        if self.exact:
+            return float(self.values[int(np.searchsorted(np.cumsum(self.value_counts), rank, side='right'))])
+        if rank < self.zeros:
+            return 0.0
+        key = int(np.searchsorted(np.cumsum(self.counts), rank - self.zeros, side='right')) + self.offset
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    #..... Relative error of quantile() (0 in exact mode)
+    def error(self) -> float:
+        return 0.0 if self.exact else self.accuracy
+
+
+#--------- CLASSE: ESBOÇOS POR PAÍS, COMBINÁVEIS PARA QUALQUER SELEÇÃO --------
+class CountrySketches():
+
+    #----- INITIAL METHODS: CONSTRUCTOR ---------------------------------------
+    #..... CONSTRUCTOR: one sketch per (country, column), built at load time
+    def __init__(self, inDF: pd.core.frame.DataFrame,
+                 inPrecision=HLL_PRECISION, inAccuracy=QUANTILE_ACCURACY) -> None:
+        self.precision = inPrecision
+        self.accuracy = inAccuracy
+        self.distinct_sketches = {}         # column -> {country: HyperLogLog}
+        self.quantile_sketches = {}         # column -> {country: QuantileSketch}
+
+        groups = inDF.groupby(inDF['country_name'].astype(object), sort=True).indices
+        for column in SKETCH_DISTINCT:
+            values = inDF[column]
+            self.distinct_sketches[column] = {
+                country: HyperLogLog.of(values.iloc[rows], inPrecision) for country, rows in groups.items()}
+        for column in SKETCH_QUANTILES:
+            values = inDF[column]
+            self.quantile_sketches[column] = {
+                country: QuantileSketch.of(values.iloc[rows], inAccuracy) for country, rows in groups.items()}
+        return
+
+    #..... Same sketches after an incremental refresh: only the countries in
+    #      'inCountries' (touched by the delta) are rebuilt, from the new frame
+    def updated(self, inDF: pd.core.frame.DataFrame, inCountries) -> 'CountrySketches':
+        rows = inDF.loc[inDF['country_name'].isin(list(inCountries))]
+        fresh = CountrySketches(rows, self.precision, self.accuracy)
+        sketches = CountrySketches.__new__(CountrySketches)
+        sketches.precision, sketches.accuracy = self.precision, self.accuracy
+        sketches.distinct_sketches = {column: replaced(self.distinct_sketches[column], fresh.distinct_sketches[column], inCountries)
+                                      for column in SKETCH_DISTINCT}
+        sketches.quantile_sketches = {column: replaced(self.quantile_sketches[column], fresh.quantile_sketches[column], inCountries)
+                                      for column in SKETCH_QUANTILES}
+        return sketches
+
+    #..... Distinct values of 'column' in the selected countries (None = all):
+    #      exact up to HLL_EXACT_LIMIT values, estimated beyond
+    def distinct(self, column, list_of_countries=None) -> int:
+        return self.distinct_sketch(column, list_of_countries).count()
+
+    #..... Quantile q of 'column' in the selected countries (None = all):
+    #      exact up to QUANTILE_EXACT_LIMIT distinct values, within the accuracy beyond
+    def quantile(self, column, q: float, list_of_countries=None) -> float:
+        return self.quantile_sketch(column, list_of_countries).quantile(q)
+
+    #..... Relative error of distinct() / quantile() for the selection: 0 when exact
+    def distinct_error(self, column, list_of_countries=None) -> float:
+        return self.distinct_sketch(column, list_of_countries).error()
+
+    def quantile_error(self, column, list_of_countries=None) -> float:
+        return self.quantile_sketch(column, list_of_countries).error()
+
+    def distinct_sketch(self, column, list_of_countries=None) -> HyperLogLog:
+        sketches = selected(self.distinct_sketches[column], list_of_countries)
+        return HyperLogLog.merged(sketches, self.precision)
+
+    def quantile_sketch(self, column, list_of_countries=None) -> QuantileSketch:
+        sketches = selected(self.quantile_sketches[column], list_of_countries)
+        return QuantileSketch.merged(sketches, self.accuracy)
+
+
+#..... Sketches of the selected countries (None = every country)
+def selected(inSketches: dict, list_of_countries=None) -> list:
+    if list_of_countries is None:
+        return list(inSketches.values())
+    return [inSketches[c] for c in set(list_of_countries) if c in inSketches]
+
+#..... Per-country sketches with those of 'inCountries' taken from 'inNew' (a country
+#      missing from it has no rows left)
+def replaced(inOld: dict, inNew: dict, inCountries) -> dict:
+    kept = {country: sketch for country, sketch in inOld.items() if country not in inCountries}
+    return {**kept, **inNew}
+
+#..... 64-bit hash of each value (missing values dropped)
+def hll_hashes(inValues: pd.core.series.Series) -> np.ndarray:
+    # Same hash for the same value, whether the column is object or categorical
+    return pd.util.hash_pandas_object(inValues.dropna(), index=False).to_numpy()
+
+#..... Register index and rank (leading zeros + 1) of each 64-bit hash
+def hll_positions(hashes: np.ndarray, inPrecision: int) -> tuple:
+    index = (hashes >> np.uint64(64 - inPrecision)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - inPrecision)) - 1)
+    # At most 53 bits: exact as a float, so frexp gives the bit length
+    bits = np.frexp(rest.astype(np.float64))[1]
+    rank = (64 - inPrecision) - bits + 1
+    return index, rank.astype(np.uint8)
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
@@ -0,0 +1,127 @@
+
+import numpy as np
+import pandas as pd
+from haversine import haversine_vector, Unit
+
+#..... Kilometers per degree of latitude (mean Earth radius, as used by haversine)
+KM_PER_DEGREE = 111.19508023
+
+#--------- CLASSE: ÍNDICE ESPACIAL (GRADE DE CÉLULAS EM GRAUS) ----------------
+class SpatialIndex():
+
+    #----- INITIAL METHODS: CONSTRUCTOR ---------------------------------------
+    #..... CONSTRUCTOR: bucket every restaurant into a lat/lon grid cell
+    def __init__(self, inDF: pd.core.frame.DataFrame, inCellDegrees=0.25) -> None:
+        #
+        # Rows are sorted by cell, so each occupied cell is a contiguous slice
+        # [start, end). Queries only look at the occupied cells near the point
+        # and compute haversine distances for the rows inside them.
+        #
+        self.cell_degrees = inCellDegrees
+        self.lon_cells = int(round(360 / inCellDegrees))
+
+        lat = inDF['latitude'].to_numpy(dtype=float)
+        lon = inDF['longitude'].to_numpy(dtype=float)
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+
+        cell_lat, cell_lon = self.cell_of(lat[valid], lon[valid])
+        order = np.lexsort((cell_lon, cell_lat))
+        self.positions = valid[order]              # row positions in 'inDF'
+        self.points = np.column_stack((lat[self.positions], lon[self.positions]))
+
+        keys = np.column_stack((cell_lat[order], cell_lon[order]))
+        changes = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+        starts = np.concatenate(([0], changes)) if len(keys) else np.empty(0, dtype=int)
+        self.cell_lat = keys[starts, 0] if len(keys) else np.empty(0, dtype=int)
+        self.cell_lon = keys[starts, 1] if len(keys) else np.empty(0, dtype=int)
+        self.cell_start = starts
+        self.cell_end = np.concatenate((starts[1:], [len(keys)])) if len(keys) else starts
+        return
+
+    #..... Grid cell (lat index, lon index) of each point
+    def cell_of(self, inLat, inLon):
+        cell_lat = np.floor((np.asarray(inLat) + 90) / self.cell_degrees).astype(int)
+        cell_lon = np.floor((np.asarray(inLon) + 180) / self.cell_degrees).astype(int) % self.lon_cells
+        return cell_lat, cell_lon
+
+    #..... Index rows in the occupied cells that may hold points within 'inRadiusKm'
+    def candidates(self, inLat: float, inLon: float, inRadiusKm: float) -> np.ndarray:
+        lat_span = inRadiusKm / KM_PER_DEGREE
+        cell_lat, cell_lon = self.cell_of(inLat, inLon)
+        reach_lat = int(np.ceil(lat_span / self.cell_degrees))
+        lines = np.abs(self.cell_lat - cell_lat) <= reach_lat
+
+        # Longitude degrees shrink with cos(lat): widest at the band's edge nearest a pole
+        edge = min(abs(inLat) + lat_span, 90.0)
+        cos_edge = np.cos(np.radians(edge))
+        if cos_edge > 1e-6:
+            reach_lon = int(np.ceil(lat_span / cos_edge / self.cell_degrees))
+            if 2 * reach_lon + 1 < self.lon_cells:
+                delta = np.abs(self.cell_lon - cell_lon)
+                delta = np.minimum(delta, self.lon_cells - delta)     # wraps at +-180
+                lines &= delta <= reach_lon
+
+        cells = np.flatnonzero(lines)
+        if len(cells) == 0:
+            return np.empty(0, dtype=int)
+        return np.concatenate([np.arange(self.cell_start[c], self.cell_end[c]) for c in cells])
+
+    #..... Distance (km) from the point to index rows 'inRows'
+    def distances(self, inLat: float, inLon: float, inRows: np.ndarray) -> np.ndarray:
+        if len(inRows) == 0:
+            return np.empty(0)
+        origin = np.repeat([[inLat, inLon]], len(inRows), axis=0)
+        return haversine_vector(origin, self.points[inRows], Unit.KILOMETERS)
+
+    #----- QUERIES: answers are (row positions, distances in km), nearest first
+
+    def within_radius(self, inLat: float, inLon: float, inRadiusKm: float):
+        rows = self.candidates(inLat, inLon, inRadiusKm)
+        dist = self.distances(inLat, inLon, rows)
+        inside = dist <= inRadiusKm
+        rows, dist = rows[inside], dist[inside]
+        order = np.argsort(dist, kind='stable')
+        return self.positions[rows[order]], dist[order]
+
+    def nearest(self, inLat: float, inLon: float, k: int):
+        k = min(k, len(self.positions))
+        if k < 1:
+            return np.empty(0, dtype=int), np.empty(0)
+
+        # Grow the radius until it holds k points: then it holds the k nearest
+        radius = self.cell_degrees * KM_PER_DEGREE
+        while True:
+            rows = self.candidates(inLat, inLon, radius)
+            dist = self.distances(inLat, inLon, rows)
+            if np.count_nonzero(dist <= radius) >= k or len(rows) == len(self.positions):
+                break
+            radius *= 2
+
+        best = np.argpartition(dist, k - 1)[:k] if len(dist) > k else np.arange(len(dist))
+        best = best[np.argsort(dist[best], kind='stable')]
+        return self.positions[rows[best]], dist[best]
+
+    #..... Batch versions: one answer per [lat, lon] point
+    def nearest_batch(self, inPoints, k: int) -> list:
+        return [self.nearest(lat, lon, k) for lat, lon in inPoints]
+
+    def within_radius_batch(self, inPoints, inRadiusKm: float) -> list:
+        return [self.within_radius(lat, lon, inRadiusKm) for lat, lon in inPoints]
+
+    #..... Restaurants per occupied cell (optionally only rows in 'inPositions')
+    def density(self, inPositions=None) -> pd.core.frame.DataFrame:
+        counts = self.cell_end - self.cell_start
+        if inPositions is not None:
+            keep = np.isin(self.positions, inPositions)
+            counts = np.add.reduceat(keep, self.cell_start) if len(keep) else counts
+        df = pd.DataFrame({
+            'latitude': (self.cell_lat + 0.5) * self.cell_degrees - 90,
+            'longitude': (self.cell_lon + 0.5) * self.cell_degrees - 180,
+            'restaurants': counts,
+        })
+        df = df.loc[df['restaurants'] > 0]
+        return df.sort_values(by='restaurants', ascending=False, kind='stable').reset_index(drop=True)
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
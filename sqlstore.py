@@ -0,0 +1,316 @@
+
+import os
+import json
+import math
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from rollup import RATING_LOW, RATING_MID, RATING_HIGH, ranked_cuisines
+from cuisines import normalized_cuisines
+from kpis import KPI_DISTINCT
+
+#..... Every column of the cleaned frame is stored, after its row label (file order = rowid)
+SQL_ROW_LABEL = 'row_label'
+
+#..... Indexes for the filters and groupings of the dashboards
+SQL_INDEXES = {
+    'ix_country': ['country_name', 'city'],
+    'ix_city': ['city'],
+    'ix_cuisine': ['unique_cuisine', 'country_name'],
+    'ix_rating': ['aggregate_rating', 'restaurant_id'],
+    'ix_label': [SQL_ROW_LABEL],
+}
+
+#..... Layout of the database: bump it when the tables change (older files are rebuilt)
+SQL_SCHEMA_VERSION = '3'
+
+#..... Same limits as rollup.rating_bucket()
+SQL_RATING_BUCKET = {
+    RATING_LOW: 'aggregate_rating < 2.5',
+    RATING_MID: 'aggregate_rating >= 2.5 AND aggregate_rating <= 4.0',
+    RATING_HIGH: 'aggregate_rating > 4.0',
+}
+
+#--------- CLASSE: BANCO SQLITE EM ARQUIVO, COMPARTILHADO ENTRE WORKERS -------
+class SqlBackend():
+
+    #----- INITIAL METHODS: CONSTRUCTOR ---------------------------------------
+    #..... CONSTRUCTOR: read-only access to a database built by build_database()
+    def __init__(self, inDatabase) -> None:
+        #
+        # Same query API as RollupCube, answered by SQL pushed down to the
+        # database file. Every worker process opens the same file; SQLite
+        # connections are per thread (Streamlit runs each session in one).
+        # It also answers the row-level views (filters, top-k, tables, map
+        # and export rows), so with RESTAURANTS_BACKEND=sqlite DbUtil keeps
+        # no frame: each query reads only the rows and columns it returns.
+        #
+        self.database = inDatabase
+        self.local = threading.local()
+        self.columns = None
+        return
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            uri = 'file:' + os.path.abspath(self.database) + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self.local.conn = conn
+        return conn
+
+    #..... Run 'inSql' with the selection filters added to its WHERE clause
+    def query(self, inSql: str, list_of_countries=None, list_of_cuisines=None,
+              inWhere=None, inParams=()) -> pd.core.frame.DataFrame:
+        where, params = [], list(inParams)
+        if inWhere:
+            where.append(inWhere)
+        if list_of_countries is not None:
+            where.append(f'country_name IN ({",".join("?" * len(list_of_countries))})')
+            params += list(list_of_countries)
+        if list_of_cuisines is not None:
+            where.append(f'unique_cuisine IN ({",".join("?" * len(list_of_cuisines))})')
+            params += list(list_of_cuisines)
+        sql = inSql.format(where=('WHERE ' + ' AND '.join(where)) if where else '')
+        return pd.read_sql_query(sql, self.connection(), params=params)
+
+    #..... Columns of the cleaned frame, in its order
+    def frame_columns(self) -> list:
+        if self.columns is None:
+            info = self.connection().execute('PRAGMA table_info(restaurants)').fetchall()
+            self.columns = [row[1] for row in info if row[1] != SQL_ROW_LABEL]
+        return self.columns
+
+    #----- ROWS (DbUtil WITHOUT A FRAME) ----------------------------------------
+
+    #..... Rows of the selection as the frame had them: file order, row labels, None as NaN.
+    #      Plain selections remember themselves (attrs), so DbUtil can refine them in SQL
+    def restaurants(self, list_of_countries=None, list_of_cuisines=None, inColumns=None,
+                    inWhere=None, inParams=()) -> pd.core.frame.DataFrame:
+        columns = ', '.join([SQL_ROW_LABEL] + list(inColumns or self.frame_columns()))
+        df = self.query(f'SELECT {columns} FROM restaurants {{where}} ORDER BY rowid',
+                        list_of_countries, list_of_cuisines, inWhere, inParams)
+        df = as_frame_rows(df)
+        if inWhere is None:
+            df.attrs['selection'] = (list_of_countries, list_of_cuisines)
+        return df
+
+    #..... Rows at positions of the file (rowid - 1), in the order given
+    def rows_at(self, inPositions, inColumns=None) -> pd.core.frame.DataFrame:
+        positions = [int(p) for p in inPositions]
+        columns = ', '.join(['rowid - 1 AS position', SQL_ROW_LABEL] + list(inColumns or self.frame_columns()))
+        df = pd.read_sql_query(f'SELECT {columns} FROM restaurants WHERE rowid - 1 IN (SELECT value FROM json_each(?))',
+                               self.connection(), params=[json.dumps(positions)])
+        df = df.set_index('position').reindex(positions)
+        return as_frame_rows(df.reset_index(drop=True))
+
+    #..... Positions (rowid - 1) of the rows with these labels
+    def positions_of(self, inLabels) -> np.ndarray:
+        df = pd.read_sql_query(f'SELECT rowid - 1 AS position FROM restaurants '
+                               f'WHERE {SQL_ROW_LABEL} IN (SELECT value FROM json_each(?)) ORDER BY rowid',
+                               self.connection(), params=[json.dumps([int(x) for x in inLabels])])
+        return df['position'].to_numpy()
+
+    #..... Distinct values of a column, sorted
+    def distinct_values(self, column) -> list:
+        return self.query(f'SELECT DISTINCT {column} AS value FROM restaurants {{where}} ORDER BY value',
+                          inWhere=f'{column} IS NOT NULL')['value'].tolist()
+
+    #..... Rows by best rating, then lowest restaurant_id (missing ratings last); top 'k' if given
+    def best_restaurants(self, inColumns: list, list_of_countries=None, list_of_cuisines=None, k=None,
+                         inWhere=None, inParams=()) -> pd.core.frame.DataFrame:
+        limit = '' if k is None else f'LIMIT {max(int(k), 0)}'
+        return self.query(f"""SELECT {', '.join(inColumns)} FROM restaurants {{where}}
+                              ORDER BY aggregate_rating DESC, restaurant_id {limit}""",
+                          list_of_countries, list_of_cuisines, inWhere, inParams)
+
+    #..... Restaurants of 'cuisine' tied at its best rating (ties by restaurant_id); top 'k' if given
+    def best_restaurants_from_cuisine(self, inColumns: list, cuisine, list_of_countries=None, k=None) -> pd.core.frame.DataFrame:
+        best = self.query('SELECT MAX(aggregate_rating) AS best FROM restaurants {where}',
+                          list_of_countries, [cuisine])['best'].iloc[0]
+        if best is None or pd.isna(best):
+            return pd.DataFrame(columns=inColumns)
+        return self.best_restaurants(inColumns, list_of_countries, [cuisine], k, 'aggregate_rating = ?', (float(best),))
+
+    #..... Filter on every cuisine served (restaurant_cuisines): any of them, or all with inMatchAll
+    @staticmethod
+    def serving_filter(list_of_cuisines, inMatchAll=False) -> tuple:
+        wanted = sorted(set(list_of_cuisines))
+        if inMatchAll and not wanted:
+            return '1 = 1', ()
+        return ("""restaurant_id IN (SELECT restaurant_id FROM restaurant_cuisines
+                                    WHERE cuisine IN (SELECT value FROM json_each(?))
+                                    GROUP BY restaurant_id HAVING COUNT(*) >= ?)""",
+                (json.dumps(wanted), len(wanted) if inMatchAll else 1))
+
+    #..... Restaurants and mean rating per cuisine served, as CuisineIndex.aggregates
+    def served_cuisines(self, list_of_countries=None, list_of_cuisines=None) -> pd.core.frame.DataFrame:
+        return self.query("""SELECT cuisine, COUNT(*) AS restaurants, AVG(aggregate_rating) AS aggregate_rating
+                             FROM restaurants JOIN restaurant_cuisines USING (restaurant_id) {where}
+                             GROUP BY cuisine ORDER BY restaurants DESC, cuisine""",
+                          list_of_countries, list_of_cuisines)
+
+    #----- HOME KPIs ----------------------------------------------------------
+
+    #..... Header KPIs of the selected countries, exact (same keys as KpiTable.header)
+    def home_kpis(self, list_of_countries=None) -> dict:
+        distinct = ', '.join(f'COUNT(DISTINCT {column}) AS {column}' for column in KPI_DISTINCT)
+        row = self.query(f'SELECT COUNT(*) AS restaurants, TOTAL(votes) AS votes, {distinct} FROM restaurants {{where}}',
+                         list_of_countries).iloc[0]
+        kpis = {'restaurants': int(row['restaurants']), 'votes': int(row['votes']), 'approximate': []}
+        kpis.update({column: int(row[column]) for column in KPI_DISTINCT})
+        return kpis
+
+    def distinct_count(self, column, list_of_countries=None) -> int:
+        return int(self.query(f'SELECT COUNT(DISTINCT {column}) AS n FROM restaurants {{where}}',
+                              list_of_countries)['n'].iloc[0])
+
+    #..... Quantile q of 'column', as quantile(interpolation='lower'); NaN without values
+    def quantile(self, column, q: float, list_of_countries=None) -> float:
+        total = int(self.query(f'SELECT COUNT({column}) AS n FROM restaurants {{where}}', list_of_countries)['n'].iloc[0])
+        if total == 0:
+            return float('nan')
+        rank = math.floor(q * (total - 1))
+        df = self.query(f'SELECT {column} AS value FROM restaurants {{where}} ORDER BY value LIMIT 1 OFFSET {rank}',
+                        list_of_countries, inWhere=f'{column} IS NOT NULL')
+        return float(df['value'].iloc[0])
+
+    #----- COUNTRIES ----------------------------------------------------------
+
+    def countries_with_more_restaurants(self, NumCountries: int) -> list:
+        if NumCountries < 1:
+            return []
+        df = self.qty_restaurants_per_country()
+        return df.loc[0:(NumCountries-1), 'country_name'].tolist()
+
+    def qty_restaurants_per_country(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        return self.query("""SELECT country_name, COUNT(restaurant_id) AS restaurant_id
+                             FROM restaurants {where}
+                             GROUP BY country_name ORDER BY restaurant_id DESC""", list_of_countries)
+
+    def qty_cities_per_country(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        return self.query("""SELECT country_name, COUNT(DISTINCT city) AS city
+                             FROM restaurants {where}
+                             GROUP BY country_name ORDER BY city DESC""", list_of_countries)
+
+    def mean_rating_per_country(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        # (mean number of votes, as in DbUtil.mean_rating_per_country)
+        df = self.query("""SELECT country_name, AVG(votes) AS votes
+                           FROM restaurants {where}
+                           GROUP BY country_name ORDER BY votes DESC""", list_of_countries)
+        df['votes'] = df.loc[:,'votes'].apply( lambda x: round(x, 0) )
+        return df
+
+    def mean_costfor2_per_country(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        df = self.query("""SELECT country_code, country_name, AVG(average_cost_for_two) AS average_cost_for_two
+                           FROM restaurants {where}
+                           GROUP BY country_code, country_name ORDER BY average_cost_for_two DESC""",
+                        list_of_countries)
+        df['average_cost_for_two'] = df.loc[:,'average_cost_for_two'].apply( lambda x: round(x, 1) )
+        return df
+
+    #----- CITIES -------------------------------------------------------------
+
+    def qty_restaurants_per_city(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        return self.query("""SELECT country_name, city, COUNT(restaurant_id) AS restaurant_id
+                             FROM restaurants {where}
+                             GROUP BY country_name, city ORDER BY restaurant_id DESC""", list_of_countries)
+
+    #..... Restaurants per city within one rating bucket (RATING_LOW / RATING_HIGH)
+    def qty_rated_restaurants_per_city(self, inBucket: str, list_of_countries=None) -> pd.core.frame.DataFrame:
+        return self.query("""SELECT country_name, city, COUNT(*) AS aggregate_rating
+                             FROM restaurants {where}
+                             GROUP BY country_name, city ORDER BY aggregate_rating DESC""",
+                          list_of_countries, inWhere=SQL_RATING_BUCKET[inBucket])
+
+    #..... Distinct cuisines per city, every cuisine of each restaurant (as CuisineIndex)
+    def qty_cuisines_per_city(self, list_of_countries=None) -> pd.core.frame.DataFrame:
+        return self.query("""SELECT country_name, city, COUNT(DISTINCT cuisine) AS unique_cuisine
+                             FROM restaurants LEFT JOIN restaurant_cuisines USING (restaurant_id) {where}
+                             GROUP BY country_name, city
+                             ORDER BY unique_cuisine DESC, country_name, city""", list_of_countries)
+
+    #----- CUISINES -----------------------------------------------------------
+
+    def cuisines_with_more_restaurants(self, NumCuisines: int,
+                                       list_of_countries=None, list_of_cuisines=None) -> list:
+        if NumCuisines < 1:
+            return []
+        df = self.query("""SELECT unique_cuisine, COUNT(*) AS restaurants
+                           FROM restaurants {where}
+                           GROUP BY unique_cuisine ORDER BY restaurants DESC LIMIT {limit}""".replace('{limit}', str(int(NumCuisines))),
+                        list_of_countries, list_of_cuisines)
+        return df.loc[0:(NumCuisines-1), 'unique_cuisine'].tolist()
+
+    def best_cuisines(self, ascending_order: bool,
+                      list_of_countries=None, list_of_cuisines=None) -> pd.core.frame.DataFrame:
+        return ranked_cuisines(self.cuisine_means(list_of_countries, list_of_cuisines), ascending_order)
+
+    #..... Rating partials per cuisine in integer tenths, unsorted (see RollupCube.cuisine_means)
+    def cuisine_means(self, list_of_countries=None, list_of_cuisines=None) -> pd.core.frame.DataFrame:
+        df = self.query("""SELECT unique_cuisine,
+                                  SUM(CAST(ROUND(aggregate_rating * 10) AS INTEGER)) AS rating_tenths,
+                                  COUNT(aggregate_rating) AS rating_count
+                           FROM restaurants {where}
+                           GROUP BY unique_cuisine""", list_of_countries, list_of_cuisines)
+        return df.set_index('unique_cuisine')
+
+#..... Version of the data inside a database file ('' when missing or unreadable)
+def database_version(inDatabase) -> str:
+    if not os.path.exists(inDatabase):
+        return ''
+    try:
+        uri = 'file:' + os.path.abspath(inDatabase) + '?mode=ro'
+        with sqlite3.connect(uri, uri=True) as conn:
+            row = conn.execute("SELECT value FROM metadata WHERE name = 'version'").fetchone()
+        return row[0] if row else ''
+    except sqlite3.Error:
+        return ''
+
+#..... Write the cleaned frame to 'inDatabase' (indexed), tagged with the data version
+def build_database(inDF: pd.core.frame.DataFrame, inDatabase, inVersion: str) -> None:
+    df = inDF.astype({col: object for col in inDF.columns if isinstance(inDF[col].dtype, pd.CategoricalDtype)})
+    # One row per (restaurant, cuisine served), every position of the 'cuisines' list
+    served = pd.DataFrame({'restaurant_id': inDF['restaurant_id'].to_numpy(),
+                           'cuisine': [sorted(set(normalized_cuisines(text))) for text in inDF['cuisines']]})
+    served = served.explode('cuisine').dropna()
+
+    # Built aside and renamed: other workers keep reading the previous file meanwhile
+    tmp = f'{inDatabase}.{os.getpid()}.{threading.get_ident()}.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        df.to_sql('restaurants', conn, index=True, index_label=SQL_ROW_LABEL)
+        for name, columns in SQL_INDEXES.items():
+            conn.execute(f'CREATE INDEX {name} ON restaurants ({", ".join(columns)})')
+        served.to_sql('restaurant_cuisines', conn, index=False)
+        conn.execute('CREATE INDEX ix_served ON restaurant_cuisines (restaurant_id, cuisine)')
+        conn.execute('CREATE TABLE metadata (name TEXT PRIMARY KEY, value TEXT)')
+        conn.execute("INSERT INTO metadata VALUES ('version', ?)", (inVersion,))
+        conn.commit()
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    os.replace(tmp, inDatabase)
+    return
+
+#..... True when 'inDatabase' holds data version 'inVersion' in the current layout
+def database_is_current(inDatabase, inVersion: str) -> bool:
+    return database_version(inDatabase) == f'{inVersion}-{SQL_SCHEMA_VERSION}'
+
+#..... Backend over 'inDatabase', (re)built from the frame when its version (data and
+#      schema) is not 'inVersion'
+def open_database(inDatabase, inDF: pd.core.frame.DataFrame, inVersion: str) -> SqlBackend:
+    if not database_is_current(inDatabase, inVersion):
+        build_database(inDF, inDatabase, f'{inVersion}-{SQL_SCHEMA_VERSION}')
+    return SqlBackend(inDatabase)
+
+#..... Query rows back as frame rows: row labels as the index, None as NaN
+def as_frame_rows(inDF: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+    df = inDF.set_index(SQL_ROW_LABEL).rename_axis(None)
+    return df.replace({None: np.nan})
+
+#--------------------------------------------------------------------------
+# end
+#--------------------------------------------------------------------------
@@ -0,0 +1,26 @@
+import os
+import sys
+import pytest
+
+#..... The modules are imported from the repository root, as the pages do
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from dbutil import DbUtil
+
+#..... Folder of the bundled data (zomato.csv, archive/)
+@pytest.fixture(scope='session')
+def dataset_dir():
+    return os.path.join(ROOT, 'dataset')
+
+#..... DbUtil with the bundled CSV loaded and cleaned, shared by every test (do not modify)
+@pytest.fixture(scope='session')
+def util(dataset_dir):
+    util = DbUtil()
+    util.LoadDataframe(os.path.join(dataset_dir, 'zomato.csv'))
+    util.GeneralCleansing()
+    return util
+
+#..... Its cleaned frame
+@pytest.fixture(scope='session')
+def cleaned(util):
+    return util.dtframe
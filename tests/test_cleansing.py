@@ -0,0 +1,35 @@
+import os
+import numpy as np
+import pandas as pd
+from dbutil import DbUtil
+
+#..... Raw rows with cells that are not text, as the JSON ingestion can give them
+def mixed_rows() -> pd.DataFrame:
+    return pd.DataFrame({
+        'restaurant_name': ['  Cafe A ', 42, np.nan, 'B'],
+        'city': [' Goa', 'Goa ', 3.5, None],
+        'locality': ['x ', 7, ' y', ''],
+        'locality_verbose': [' x, Goa', ' y ', 0, 'z'],
+        'cuisines': ['Cafe, Bakery', 12, np.nan, 'Italian'],
+        'switch_to_order_menu': [0, 0, 0, 0],
+    })
+
+def test_strip_matches_str_strip_on_non_text_cells():
+    util = DbUtil()
+    util.dtframe = mixed_rows()
+    expected = {col: util.dtframe[col].str.strip() for col in ['restaurant_name', 'city', 'locality', 'locality_verbose']}
+    util.StripColumns()
+    for col, values in expected.items():
+        pd.testing.assert_series_equal(util.dtframe[col].astype(object), values.astype(object), check_names=False)
+
+def test_unique_cuisine_of_non_text_cells_is_empty():
+    util = DbUtil()
+    util.dtframe = mixed_rows()
+    util.CleanseRows()
+    assert util.dtframe['unique_cuisine'].tolist() == ['Cafe', '', '', 'Italian']
+
+def test_cleansing_is_unchanged_on_the_csv(cleaned, dataset_dir):
+    raw = pd.read_csv(os.path.join(dataset_dir, 'zomato.csv'))
+    for col, raw_col in [('restaurant_name', 'Restaurant Name'), ('city', 'City')]:
+        expected = raw.drop_duplicates('Restaurant ID')[raw_col].str.strip()
+        assert cleaned[col].tolist() == expected.tolist()
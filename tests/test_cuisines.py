@@ -0,0 +1,61 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from cuisines import CuisineIndex, normalized_cuisines
+from sqlstore import open_database
+
+@pytest.fixture(scope='module')
+def index(cleaned):
+    return CuisineIndex(cleaned)
+
+#..... One row per (restaurant position, cuisine served), the brute-force way
+@pytest.fixture(scope='module')
+def served(cleaned):
+    lists = [sorted(set(normalized_cuisines(text))) for text in cleaned['cuisines']]
+    df = pd.DataFrame({'position': np.arange(len(cleaned)), 'cuisine': lists}).explode('cuisine').dropna()
+    df['rating'] = cleaned['aggregate_rating'].to_numpy(dtype=float)[df['position'].to_numpy()]
+    df['country_name'] = cleaned['country_name'].astype(object).to_numpy()[df['position'].to_numpy()]
+    df['city'] = cleaned['city'].astype(object).to_numpy()[df['position'].to_numpy()]
+    return df
+
+def test_normalized_cuisines():
+    assert normalized_cuisines(' Cafe,  Fast   Food ,,Cafe') == ['Cafe', 'Fast Food', 'Cafe']
+    assert normalized_cuisines(np.nan) == []
+
+def test_bitmap_any_and_all(index, served, cleaned):
+    rnd = random.Random(13)
+    by_row = served.groupby('position')['cuisine'].agg(set).reindex(range(len(cleaned)), fill_value=set())
+    for _ in range(40):
+        wanted = rnd.sample(index.vocabulary, rnd.randint(1, 4)) + ['No Such Cuisine'] * rnd.randint(0, 1)
+        any_expected = by_row.map(lambda names: bool(names & set(wanted))).to_numpy()
+        all_expected = by_row.map(lambda names: set(wanted) <= names).to_numpy()
+        assert (index.bitmap(wanted) == any_expected).all()
+        assert (index.bitmap(wanted, inMatchAll=True) == all_expected).all()
+    assert index.bitmap([]).sum() == 0
+    assert index.bitmap([], inMatchAll=True).all()
+
+def test_aggregates(index, served, cleaned):
+    rnd = random.Random(3)
+    countries = sorted(cleaned['country_name'].unique())
+    for selection in [None] + [rnd.sample(countries, rnd.randint(1, 5)) for _ in range(10)]:
+        if selection is None:
+            mask, rows = None, served
+        else:
+            mask = cleaned['country_name'].isin(selection).to_numpy()
+            rows = served.loc[served['country_name'].isin(selection)]
+        got = index.aggregates(mask).set_index('cuisine')
+        expected = rows.groupby('cuisine').agg(restaurants=('position', 'size'), aggregate_rating=('rating', 'mean'))
+        assert sorted(got.index) == sorted(expected.index)
+        assert (got['restaurants'] == expected['restaurants'].reindex(got.index)).all()
+        assert np.allclose(got['aggregate_rating'], expected['aggregate_rating'].reindex(got.index), equal_nan=True)
+
+def test_cuisines_per_city_counts_every_cuisine_in_the_index_and_in_sql(index, served, cleaned, tmp_path):
+    backend = open_database(str(tmp_path / 'zomato.sqlite'), cleaned, 'test')
+    for selection in [None, ['India'], ['Brazil', 'England', 'Qatar']]:
+        rows = served if selection is None else served.loc[served['country_name'].isin(selection)]
+        expected = rows.groupby(['country_name', 'city'])['cuisine'].nunique()
+        got = index.qty_cuisines_per_city(selection)
+        counts = got.set_index(['country_name', 'city'])['unique_cuisine']
+        assert (counts.reindex(expected.index) == expected).all()
+        pd.testing.assert_frame_equal(backend.qty_cuisines_per_city(selection), got, check_dtype=False)
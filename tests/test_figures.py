@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+from figures import FigureCache, bar_figure, figure_bytes
+
+def chart(inRows: int, inColor=None):
+    df = pd.DataFrame({'Cidade': [f'City {i}' for i in range(inRows)],
+                       'Qtd': np.arange(inRows) * 3.3,
+                       'País': [f'Country {i % 4}' for i in range(inRows)]})
+    return bar_figure(df, 'Cidade', 'Qtd', inColor)
+
+@pytest.mark.parametrize('rows, color', [(1, None), (10, None), (20, None), (10, 'País'), (200, 'País')])
+def test_size_estimate_is_close_to_the_json(rows, color):
+    figure = chart(rows, color)
+    actual = len(figure.to_json().encode('utf-8'))
+    assert abs(figure_bytes(figure) - actual) <= 0.1 * actual
+
+def test_cache_misses_do_not_serialize(monkeypatch):
+    import plotly.graph_objects as go
+    def no_json(*args, **kwargs):
+        raise AssertionError('figure serialized by the cache')
+    monkeypatch.setattr(go.Figure, 'to_json', no_json)
+    cache = FigureCache()
+    built = []
+    build = lambda: built.append(1) or chart(10)
+    first, second = cache.get_figure('k', build), cache.get_figure('k', build)
+    assert first is second and len(built) == 1
+    assert cache.stats()['bytes'] == figure_bytes(first)
+
+def test_cache_is_bounded_by_the_estimated_bytes():
+    cache = FigureCache(inMaxBytes=3 * figure_bytes(chart(10)))
+    for key in range(5):
+        cache.get_figure(key, lambda: chart(10))
+    stats = cache.stats()
+    assert stats['entries'] == 3 and stats['evictions'] == 2
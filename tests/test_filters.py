@@ -0,0 +1,43 @@
+import random
+import pandas as pd
+import pytest
+from dbutil import DbUtil, build_value_index
+
+#..... DbUtil over a frame with look-alike values (no shared store: indexes built on the spot)
+def lookalikes() -> DbUtil:
+    util = DbUtil()
+    util.dtframe = pd.DataFrame({
+        'restaurant_id': [1, 2, 3, 4, 5, 6],
+        'country_name': ['India', 'Indiana', 'india', ' India', 'Brazil', 'India'],
+        'unique_cuisine': ['Cafe', 'Cafe Bakery', 'cafe', 'Italian', 'Cafe', ''],
+    }, index=[10, 11, 12, 13, 14, 15])
+    return util
+
+def test_country_filter_matches_whole_values_only():
+    util = lookalikes()
+    assert util.get_items_with_these_countries(['India'])['restaurant_id'].tolist() == [1, 6]
+    assert util.get_items_with_these_countries(['Indiana'])['restaurant_id'].tolist() == [2]
+    assert util.get_items_with_these_countries(['Ind', 'INDIA']).empty
+    assert util.get_items_with_these_countries([]).empty
+
+def test_cuisine_filter_matches_whole_values_only():
+    util = lookalikes()
+    df = util.get_items_with_these_cuisines(util.dtframe, ['Cafe'])
+    assert df['restaurant_id'].tolist() == [1, 5]
+
+def test_value_index_positions_are_sorted_and_read_only():
+    index = build_value_index(pd.Series(['b', 'a', 'b', None, 'a', 'b']))
+    assert sorted(index) == ['a', 'b']
+    assert index['b'].tolist() == [0, 2, 5] and index['a'].tolist() == [1, 4]
+    with pytest.raises(ValueError):
+        index['a'][0] = 9
+
+def test_country_filter_matches_isin(util):
+    countries = util.get_all_countries()
+    rnd = random.Random(4)
+    cases = [[], countries, ['Nowhere'], countries[:1] * 3] + [
+        rnd.sample(countries, rnd.randint(1, len(countries))) + rnd.sample(['Nowhere', 'Brazil'], 1)
+        for _ in range(30)]
+    for selection in cases:
+        expected = util.dtframe.loc[util.dtframe['country_name'].isin(selection)]
+        pd.testing.assert_frame_equal(util.get_items_with_these_countries(selection), expected)
@@ -0,0 +1,39 @@
+import pytest
+import instrument
+from instrument import Profiler, PROFILE_ENV, PROFILE_RSS_ENV
+
+#..... Profiler with the given variables, counting the reads of the resident memory
+@pytest.fixture
+def profiler(monkeypatch):
+    reads = []
+    monkeypatch.setattr(instrument, 'resident_bytes', lambda: reads.append(1) or 4096 * len(reads))
+    def build(**inEnv):
+        monkeypatch.setenv(PROFILE_ENV, '1')
+        for name, value in inEnv.items():
+            monkeypatch.setenv(name, value)
+        return Profiler(), reads
+    return build
+
+def rerun_with_spans(inProfiler, inSpans: int) -> dict:
+    with inProfiler.rerun('Page'):
+        for _ in range(inSpans):
+            inProfiler.exit(inProfiler.enter('DbUtil.rows_of'))
+    return inProfiler.last_rerun()
+
+def test_memory_is_read_only_around_the_rerun_by_default(profiler, monkeypatch):
+    monkeypatch.delenv(PROFILE_RSS_ENV, raising=False)
+    prof, reads = profiler()
+    last = rerun_with_spans(prof, 1000)
+    assert len(reads) == 2
+    spans = {s['path']: s for s in last['spans']}
+    assert spans['Page/DbUtil.rows_of']['calls'] == 1000
+    assert spans['Page/DbUtil.rows_of']['rss_bytes'] is None
+    assert spans['Page']['rss_bytes'] is not None
+    assert 'restaurants_span_rss_bytes_total' not in prof.prometheus()
+
+def test_memory_per_span_is_opt_in(profiler):
+    prof, reads = profiler(**{PROFILE_RSS_ENV: '1'})
+    last = rerun_with_spans(prof, 10)
+    assert len(reads) == 2 + 2 * 10
+    assert all(s['rss_bytes'] is not None for s in last['spans'])
+    assert 'restaurants_span_rss_bytes_total' in prof.prometheus()
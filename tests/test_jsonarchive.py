@@ -0,0 +1,49 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from dbutil import DbUtil
+from jsonarchive import flatten_restaurant, to_float
+
+#..... Cleaned frames of the CSV and of the JSON dumps, on the restaurants of both
+@pytest.fixture(scope='module')
+def shared_frames(util, dataset_dir):
+    csv = util
+    archive = DbUtil()
+    archive.LoadJsonArchive(os.path.join(dataset_dir, 'archive'), 1)
+    archive.GeneralCleansing()
+
+    ids = np.intersect1d(csv.dtframe['restaurant_id'], archive.dtframe['restaurant_id'])
+    assert len(ids) > 0
+    frames = [df.drop_duplicates('restaurant_id').set_index('restaurant_id').loc[ids].sort_index()
+              for df in (csv.dtframe, archive.dtframe)]
+    return frames
+
+def test_to_float_keeps_zero():
+    assert to_float(0) == 0.0
+    assert to_float('0') == 0.0
+    assert np.isnan(to_float(None))
+    assert np.isnan(to_float(''))
+
+def test_flatten_keeps_zero_rating_and_coordinates():
+    row = flatten_restaurant({'R': {'res_id': 1}, 'location': {'longitude': 0, 'latitude': '0'},
+                              'user_rating': {'aggregate_rating': 0, 'votes': '0'}})
+    assert row[7] == 0.0 and row[8] == 0.0
+    assert row[17] == 0.0
+    assert row[20] == 0
+
+def test_archive_matches_csv_on_shared_restaurants(shared_frames):
+    csv, archive = shared_frames
+    assert list(archive.columns) == list(csv.columns)
+    for column in csv.columns:
+        expected, actual = csv[column], archive[column]
+        if pd.api.types.is_numeric_dtype(expected):
+            np.testing.assert_allclose(actual.astype(float), expected.astype(float), err_msg=column)
+        else:
+            same = (actual == expected) | (actual.isna() & expected.isna())
+            assert same.all(), column
+
+def test_archive_has_no_missing_ratings_where_csv_has_them(shared_frames):
+    csv, archive = shared_frames
+    assert csv['aggregate_rating'].notna().all()
+    assert archive['aggregate_rating'].notna().all()
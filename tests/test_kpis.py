@@ -0,0 +1,30 @@
+import pytest
+from dbutil import DbUtil, EXACT_STATS_ENV
+from kpis import KPI_DISTINCT
+
+SELECTIONS = [None, ['Brazil'], ['India', 'United States of America', 'Singapore']]
+
+def expected_header(inDF, inSelection) -> dict:
+    df = inDF if inSelection is None else inDF[inDF['country_name'].isin(inSelection)]
+    kpis = {'restaurants': len(df), 'votes': df['votes'].sum(), 'approximate': []}
+    kpis.update({column: df[column].nunique() for column in KPI_DISTINCT})
+    return kpis
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_home_header_comes_from_the_sketches_by_default(util, selection, monkeypatch):
+    monkeypatch.delenv(EXACT_STATS_ENV, raising=False)
+    assert not DbUtil.exact_stats()
+    # The dataset stays below the sketches' exact limits: same numbers, none approximate
+    assert util.home_kpis(selection) == expected_header(util.dtframe, selection)
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_exact_switch(util, selection, monkeypatch):
+    monkeypatch.setenv(EXACT_STATS_ENV, '1')
+    assert DbUtil.exact_stats()
+    assert util.home_kpis(selection) == expected_header(util.dtframe, selection)
+
+def test_sketch_counts_past_the_limit_are_marked(util, monkeypatch):
+    import sketches
+    monkeypatch.setattr(sketches, 'HLL_EXACT_LIMIT', 16)
+    kpis = util.kpi_table().header(None, sketches.CountrySketches(util.dtframe))
+    assert set(kpis['approximate']) == {'city', 'restaurant_name', 'unique_cuisine'}
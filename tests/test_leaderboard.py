@@ -0,0 +1,64 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from leaderboard import CuisineLeaderboard, top_k_order
+
+KS = [1, 2, 5, 10, 20, 100, 1000]
+
+#..... The full sort the partial selection replaces: best rating, then lowest restaurant_id
+def full_sort(inDF: pd.DataFrame, k=None) -> pd.DataFrame:
+    df = inDF.sort_values(['aggregate_rating', 'restaurant_id'], ascending=[False, True],
+                          kind='stable', na_position='last')
+    return df if k is None else df.head(k)
+
+@pytest.fixture(scope='module')
+def cuisines(cleaned):
+    counts = cleaned['unique_cuisine'].value_counts()
+    rnd = random.Random(11)
+    # the biggest cuisines (many ties per rating), plus random ones and a single-row one
+    return list(counts.index[:5]) + rnd.sample(list(counts.index), 10) + [counts.index[-1]]
+
+@pytest.mark.parametrize('k', KS + [None])
+def test_top_k_matches_the_full_sort(cleaned, k):
+    order = top_k_order(cleaned['aggregate_rating'], cleaned['restaurant_id'], k)
+    assert cleaned.iloc[order]['restaurant_id'].tolist() == full_sort(cleaned, k)['restaurant_id'].tolist()
+
+def test_top_k_matches_the_full_sort_per_cuisine(cleaned, cuisines):
+    for cuisine in cuisines:
+        df = cleaned.loc[cleaned['unique_cuisine'] == cuisine]
+        for k in KS:
+            order = top_k_order(df['aggregate_rating'], df['restaurant_id'], k)
+            assert df.iloc[order]['restaurant_id'].tolist() == full_sort(df, k)['restaurant_id'].tolist(), (cuisine, k)
+
+def test_top_k_ties_and_missing_ratings():
+    df = pd.DataFrame({'restaurant_id': [9, 3, 7, 1, 5, 2, 8],
+                       'aggregate_rating': [4.5, 4.5, np.nan, 4.5, 3.0, np.nan, 4.9]})
+    for k in range(0, len(df) + 2):
+        order = top_k_order(df['aggregate_rating'], df['restaurant_id'], k)
+        assert df.iloc[order]['restaurant_id'].tolist() == full_sort(df, k)['restaurant_id'].tolist(), k
+
+def test_leaderboard_matches_the_full_sort(cleaned, cuisines):
+    board = CuisineLeaderboard(cleaned)
+    countries = sorted(cleaned['country_name'].unique())
+    rnd = random.Random(3)
+    for cuisine in cuisines:
+        for selection in [None, countries[:1], rnd.sample(countries, 4)]:
+            df = cleaned.loc[cleaned['unique_cuisine'] == cuisine]
+            if selection is not None:
+                df = df.loc[df['country_name'].isin(selection)]
+            for k in KS:
+                got = cleaned.iloc[board.top(cuisine, k, selection)]['restaurant_id'].tolist()
+                assert got == full_sort(df, k)['restaurant_id'].tolist(), (cuisine, selection, k)
+
+def test_dbutil_best_restaurants(util, cuisines):
+    for k in KS + [None]:
+        got = util.best_restaurants(util.dtframe, k)['restaurant_id'].tolist()
+        assert got == full_sort(util.dtframe, k)['restaurant_id'].tolist(), k
+    for cuisine in cuisines:
+        df = util.dtframe.loc[util.dtframe['unique_cuisine'] == cuisine]
+        best = df.loc[df['aggregate_rating'] == df['aggregate_rating'].max()].sort_values('restaurant_id')
+        got = util.best_restaurants_from_cuisine(cuisine, util.dtframe)
+        assert got['restaurant_id'].tolist() == best['restaurant_id'].tolist(), cuisine
+        got = util.best_restaurants_per_cuisine([cuisine], 3)[cuisine]
+        assert got['restaurant_id'].tolist() == full_sort(df, 3)['restaurant_id'].tolist(), cuisine
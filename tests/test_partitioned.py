@@ -0,0 +1,19 @@
+import threading
+import concurrent.futures
+import pandas as pd
+from rollup import rollup_cells
+
+def test_no_fork_from_a_multi_threaded_process(util, monkeypatch):
+    # As inside the Streamlit server: another thread is alive (and may hold locks)
+    def no_processes(*args, **kwargs):
+        raise AssertionError('process pool started from a multi-threaded process')
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor', no_processes)
+    done = threading.Event()
+    other = threading.Thread(target=done.wait)
+    other.start()
+    try:
+        cells = rollup_cells(util.dtframe, 3)
+    finally:
+        done.set()
+        other.join()
+    pd.testing.assert_frame_equal(cells, rollup_cells(util.dtframe))
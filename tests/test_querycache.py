@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+from querycache import QueryCache
+
+def test_small_answers_are_cached():
+    cache = QueryCache(inMaxAnswerBytes=2**10)
+    calls = []
+    compute = lambda: calls.append(1) or pd.DataFrame({'restaurants': [3, 2, 1]})
+    first, second = cache.get('k', compute), cache.get('k', compute)
+    assert len(calls) == 1 and first.equals(second)
+    assert cache.stats()['entries'] == 1
+
+def test_row_level_answers_are_not_kept():
+    cache = QueryCache(inMaxAnswerBytes=2**10)
+    rows = pd.DataFrame({'votes': np.arange(10_000)})
+    answer = cache.get('rows', lambda: rows)
+    assert answer is rows and answer['votes'].values.flags.writeable
+    stats = cache.stats()
+    assert stats['entries'] == 0 and stats['bytes'] == 0 and stats['oversized'] == 1
@@ -0,0 +1,85 @@
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import pytest
+from conftest import ROOT
+
+#..... A free TCP port on the loopback
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+#..... queryserver.py running on the bundled CSV; yields its port
+@pytest.fixture(scope='module')
+def server(dataset_dir):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'queryserver.py'),
+                                os.path.join(dataset_dir, 'zomato.csv'), '--port', str(port)],
+                               cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    # The server prints its address once the data is loaded
+    line = process.stdout.readline()
+    assert line.startswith('queryserver:'), line
+    yield port
+    process.terminate()
+    process.wait(timeout=10)
+
+def request(inPort, inMethod, inPath, inBody=None, inHeaders=None) -> tuple:
+    connection = http.client.HTTPConnection('127.0.0.1', inPort, timeout=30)
+    connection.request(inMethod, inPath, body=inBody, headers=inHeaders or {})
+    response = connection.getresponse()
+    result = response.status, dict(response.getheaders()), response.read()
+    connection.close()
+    return result
+
+def test_query_and_not_modified(server, util):
+    status, headers, body = request(server, 'GET', '/query/best_restaurants?countries=Brazil&k=3')
+    assert status == 200
+    answer = json.loads(body)
+    expected = util.best_restaurants(util.get_items_with_these_countries(['Brazil']), 3)
+    assert answer['rows'] == 3
+    assert [row[answer['columns'].index('restaurant_id')] for row in answer['data']] == expected['restaurant_id'].tolist()
+
+    status, again, body = request(server, 'GET', '/query/best_restaurants?countries=Brazil&k=3',
+                                  inHeaders={'If-None-Match': headers['ETag']})
+    assert (status, body) == (304, b'')
+    assert again['ETag'] == headers['ETag']
+
+def test_batch(server):
+    queries = {'queries': [{'query': 'qty_restaurants_per_country', 'params': {'countries': ['India']}},
+                           {'query': 'best_cuisines', 'params': {'limit': 2}},
+                           {'query': 'nope'}]}
+    status, _, body = request(server, 'POST', '/batch', json.dumps(queries))
+    assert status == 200
+    results = json.loads(body)['results']
+    assert results[0]['rows'] == 1
+    assert results[1]['rows'] == 2
+    assert results[2]['status'] == 404
+
+@pytest.mark.parametrize('path', ['/query/best_restaurants?k=0', '/query/best_cuisines?limit=0',
+                                  '/query/best_cuisines?limit=x', '/query/best_cuisines?bogus=1'])
+def test_bad_parameters(server, path):
+    assert request(server, 'GET', path)[0] == 400
+
+def test_bad_content_length(server):
+    with socket.create_connection(('127.0.0.1', server), timeout=30) as sock:
+        sock.sendall(b'POST /batch HTTP/1.1\r\nContent-Length: abc\r\n\r\n')
+        reply = sock.makefile('rb').read()
+    assert reply.startswith(b'HTTP/1.1 400 ')
+
+def test_answer_is_keyed_on_the_version_it_was_computed_on(dataset_dir):
+    import asyncio
+    import time
+    from queryserver import QueryServer, query_params, response_key
+    engine = QueryServer(os.path.join(dataset_dir, 'zomato.csv'), inThreads=1)
+    # A version check that has not seen the current file yet
+    engine.checked = (time.monotonic(), 'stale')
+    body, etag = asyncio.run(engine.answer('best_cuisines', {'limit': '2'}))
+    version = engine.version()
+    assert json.loads(body)['version'] == version
+    assert etag.startswith(f'"{version}-')
+    assert engine.checked[1] == version
+    assert list(engine.responses) == [response_key(version, 'best_cuisines', query_params({'limit': '2'}))[0]]
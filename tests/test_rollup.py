@@ -0,0 +1,51 @@
+import random
+import pytest
+from rollup import RollupCube
+from sqlstore import open_database
+
+@pytest.fixture(scope='module')
+def selections(util):
+    rnd = random.Random(5)
+    countries, cuisines = util.get_all_countries(), util.get_all_cuisines()
+    cases = [(None, None)] + [([country], None) for country in countries]
+    for _ in range(200):
+        cases.append((rnd.sample(countries, rnd.randint(1, len(countries))),
+                      rnd.sample(cuisines, rnd.randint(1, 40)) if rnd.random() < 0.5 else None))
+    return cases
+
+#..... Rows of the selection, as the pages filter them before DbUtil.best_cuisines
+def selected_rows(util, list_of_countries, list_of_cuisines):
+    df = util.dtframe
+    if list_of_countries is not None:
+        df = df.loc[df['country_name'].isin(list_of_countries)]
+    if list_of_cuisines is not None:
+        df = df.loc[df['unique_cuisine'].isin(list_of_cuisines)]
+    return df
+
+def assert_same_ranking(expected, got):
+    assert got['unique_cuisine'].tolist() == expected['unique_cuisine'].tolist()
+    assert got['aggregate_rating'].tolist() == expected['aggregate_rating'].tolist()
+
+@pytest.mark.parametrize('ascending', [False, True])
+def test_cube_best_cuisines_match_the_rows(util, selections, ascending):
+    cube = RollupCube(util.dtframe)
+    for countries, cuisines in selections:
+        expected = util.best_cuisines(ascending, selected_rows(util, countries, cuisines))
+        assert_same_ranking(expected, cube.best_cuisines(ascending, countries, cuisines))
+
+@pytest.mark.parametrize('ascending', [False, True])
+def test_sql_best_cuisines_match_the_rows(util, selections, ascending, tmp_path_factory):
+    database = str(tmp_path_factory.mktemp('sql') / 'zomato.sqlite')
+    backend = open_database(database, util.dtframe, 'test')
+    for countries, cuisines in selections:
+        expected = util.best_cuisines(ascending, selected_rows(util, countries, cuisines))
+        assert_same_ranking(expected, backend.best_cuisines(ascending, countries, cuisines))
+
+def test_rounding_is_half_up_on_the_exact_mean(util):
+    # 3.25 (half a tenth) goes up, whatever float sum the rows would give
+    df = util.dtframe.iloc[:0]
+    df = df.reindex(range(4)).assign(unique_cuisine=['A', 'A', 'B', 'B'],
+                                     aggregate_rating=[3.2, 3.3, 0.1, 0.2])
+    got = util.best_cuisines(False, df)
+    assert got['unique_cuisine'].tolist() == ['A', 'B']
+    assert got['aggregate_rating'].tolist() == [3.3, 0.2]
@@ -0,0 +1,55 @@
+import random
+import numpy as np
+import pandas as pd
+from sketches import (CountrySketches, HyperLogLog, QuantileSketch, SKETCH_DISTINCT, SKETCH_QUANTILES,
+                      HLL_EXACT_LIMIT, QUANTILE_ACCURACY)
+
+QUANTILES = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 1]
+
+#..... Every single country, 300 random selections and all countries (None)
+def selections(inDF) -> list:
+    countries = sorted(inDF['country_name'].unique())
+    rnd = random.Random(19)
+    return ([[c] for c in countries] + [None] +
+            [rnd.sample(countries, rnd.randint(1, len(countries))) for _ in range(300)])
+
+def test_dataset_selections_are_exact(cleaned):
+    sketches = CountrySketches(cleaned)
+    for selection in selections(cleaned):
+        df = cleaned if selection is None else cleaned[cleaned['country_name'].isin(selection)]
+        for column in SKETCH_DISTINCT:
+            assert sketches.distinct(column, selection) == df[column].nunique(), (column, selection)
+            assert sketches.distinct_error(column, selection) == 0.0
+        for column in SKETCH_QUANTILES:
+            for q in QUANTILES:
+                expected = df[column].quantile(q, interpolation='lower')
+                assert sketches.quantile(column, q, selection) == expected, (column, q, selection)
+            assert sketches.quantile_error(column, selection) == 0.0
+
+def test_hyperloglog_error_bound_beyond_exact_limit():
+    values = pd.Series(np.arange(200_000).astype(str))
+    sketch = HyperLogLog.of(values)
+    assert not sketch.exact
+    # 4 standard errors: 3.3% with 2**14 registers
+    assert abs(sketch.count() / len(values) - 1) <= 4 * sketch.error()
+
+    merged = HyperLogLog.merged([HyperLogLog.of(values[i::4]) for i in range(4)])
+    assert np.array_equal(merged.registers, sketch.registers)
+
+def test_hyperloglog_switches_to_registers_on_merge():
+    values = pd.Series(np.arange(HLL_EXACT_LIMIT + 1000).astype(str))
+    halves = [HyperLogLog.of(values[:HLL_EXACT_LIMIT // 2 + 600]), HyperLogLog.of(values[HLL_EXACT_LIMIT // 2:])]
+    assert all(h.exact for h in halves)
+    merged = HyperLogLog.merged(halves)
+    assert not merged.exact
+    assert abs(merged.count() / len(values) - 1) <= 4 * merged.error()
+
+def test_quantile_accuracy_beyond_exact_limit():
+    values = pd.Series(np.random.default_rng(0).lognormal(3, 1, 100_000))
+    parts = [QuantileSketch.of(values[i::3]) for i in range(3)]
+    merged = QuantileSketch.merged(parts)
+    assert not merged.exact
+    assert merged.count() == len(values)
+    for q in QUANTILES:
+        expected = values.quantile(q, interpolation='lower')
+        assert abs(merged.quantile(q) / expected - 1) <= QUANTILE_ACCURACY
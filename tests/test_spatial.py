@@ -0,0 +1,60 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from haversine import haversine_vector, Unit
+from spatial import SpatialIndex
+
+#..... Distances (km) from the point to every restaurant with coordinates: the brute-force pass
+def brute_force(inDF: pd.DataFrame, inLat: float, inLon: float):
+    points = inDF.loc[:, ['latitude', 'longitude']].to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(points).any(axis=1))
+    origin = np.repeat([[inLat, inLon]], len(valid), axis=0)
+    return valid, haversine_vector(origin, points[valid], Unit.KILOMETERS)
+
+#..... Query points: restaurant positions, points around them, random points, the antimeridian and poles
+@pytest.fixture(scope='module')
+def points(cleaned):
+    rnd = random.Random(8)
+    rows = cleaned.sample(40, random_state=8)
+    near = [(lat + rnd.uniform(-0.3, 0.3), lon + rnd.uniform(-0.3, 0.3))
+            for lat, lon in zip(rows['latitude'], rows['longitude'])]
+    anywhere = [(rnd.uniform(-89, 89), rnd.uniform(-180, 180)) for _ in range(20)]
+    return near + anywhere + [(-36.85, 179.99), (-36.85, -179.99), (89.9, 0.0), (-89.9, 10.0)]
+
+@pytest.fixture(scope='module')
+def index(cleaned):
+    return SpatialIndex(cleaned)
+
+@pytest.mark.parametrize('k', [1, 5, 50])
+def test_nearest_matches_brute_force(cleaned, index, points, k):
+    for lat, lon in points:
+        valid, dist = brute_force(cleaned, lat, lon)
+        expected = np.sort(dist)[:k]
+        positions, distances = index.nearest(lat, lon, k)
+        np.testing.assert_allclose(distances, expected, rtol=0, atol=1e-9)
+        # any of the tied rows may come back: each one must be at its true distance
+        truth = dict(zip(valid, dist))
+        np.testing.assert_allclose([truth[p] for p in positions], distances, rtol=0, atol=1e-9)
+        assert len(set(positions)) == len(positions)
+
+@pytest.mark.parametrize('radius', [0.5, 5, 50, 500])
+def test_within_radius_matches_brute_force(cleaned, index, points, radius):
+    for lat, lon in points:
+        valid, dist = brute_force(cleaned, lat, lon)
+        expected = set(valid[dist <= radius])
+        positions, distances = index.within_radius(lat, lon, radius)
+        assert set(positions) == expected, (lat, lon, radius)
+        assert np.all(np.diff(distances) >= 0)
+
+def test_batch_queries_match_single_queries(index, points):
+    for (lat, lon), (positions, _) in zip(points, index.nearest_batch(points, 7)):
+        assert positions.tolist() == index.nearest(lat, lon, 7)[0].tolist()
+    for (lat, lon), (positions, _) in zip(points, index.within_radius_batch(points, 20)):
+        assert positions.tolist() == index.within_radius(lat, lon, 20)[0].tolist()
+
+def test_density_counts_every_restaurant(cleaned, index):
+    df = index.density()
+    assert df['restaurants'].sum() == cleaned[['latitude', 'longitude']].notna().all(axis=1).sum()
+    subset = index.density(np.arange(0, len(cleaned), 3))
+    assert subset['restaurants'].sum() == len(range(0, len(cleaned), 3))
@@ -0,0 +1,83 @@
+import os
+import shutil
+import pandas as pd
+import pytest
+from dbutil import DbUtil, DatasetStore
+
+COUNTRIES = ['India', 'Brazil', 'Nowhere']
+CUISINES = ['North Indian', 'Pizza', 'Cafe', 'Nothing']
+
+#..... DbUtil without a frame (RESTAURANTS_BACKEND=sqlite), on a copy of the bundled CSV
+@pytest.fixture(scope='module')
+def database_util(dataset_dir, tmp_path_factory):
+    folder = tmp_path_factory.mktemp('sqlite')
+    path = os.path.join(str(folder), 'zomato.csv')
+    shutil.copy(os.path.join(dataset_dir, 'zomato.csv'), path)
+    util = DbUtil()
+    util.dataset = DatasetStore().get(path, DbUtil.load_into_database, inKey='dbutil-sqlite')
+    util.dtframe = None
+    assert util.in_database() and util.dataset.frame is None
+    return util
+
+#..... Same rows and values; dtypes differ (categories and nullable columns come back as objects/floats)
+def assert_same_rows(inExpected, inGot) -> None:
+    pd.testing.assert_frame_equal(inGot, inExpected, check_dtype=False, check_categorical=False,
+                                  check_index_type=False)
+
+@pytest.mark.parametrize('countries', [None, ['India'], COUNTRIES, []])
+def test_filters_match_the_frame(util, database_util, countries):
+    if countries is None:
+        expected, got = util.dtframe, database_util.sql_backend().restaurants()
+    else:
+        expected = util.get_items_with_these_countries(countries)
+        got = database_util.get_items_with_these_countries(countries)
+    assert_same_rows(expected, got)
+    assert_same_rows(util.get_items_with_these_cuisines(expected, CUISINES),
+                     database_util.get_items_with_these_cuisines(got, CUISINES))
+    for match_all in [False, True]:
+        assert_same_rows(util.get_items_serving_cuisines(expected, CUISINES[:2], match_all),
+                         database_util.get_items_serving_cuisines(got, CUISINES[:2], match_all))
+
+@pytest.mark.parametrize('countries', [None, ['India'], COUNTRIES])
+def test_top_k_matches_the_frame(util, database_util, countries):
+    for cuisines in [None, CUISINES]:
+        for k in [None, 1, 10]:
+            assert_same_rows(util.best_restaurants_in(countries, cuisines, k),
+                             database_util.best_restaurants_in(countries, cuisines, k))
+    expected = util.dtframe if countries is None else util.get_items_with_these_countries(countries)
+    got = database_util.sql_backend().restaurants(countries)
+    assert_same_rows(util.best_restaurants(expected, 5), database_util.best_restaurants(got, 5))
+    for cuisine in CUISINES:
+        assert_same_rows(util.best_restaurants_from_cuisine(cuisine, expected, 3),
+                         database_util.best_restaurants_from_cuisine(cuisine, got, 3))
+    expected_board = util.best_restaurants_per_cuisine(CUISINES, 2, countries)
+    got_board = database_util.best_restaurants_per_cuisine(CUISINES, 2, countries)
+    for cuisine in CUISINES:
+        assert_same_rows(expected_board[cuisine], got_board[cuisine])
+
+def test_lists_and_served_cuisines_match_the_frame(util, database_util):
+    assert database_util.get_all_countries() == util.get_all_countries()
+    assert database_util.get_all_cuisines() == util.get_all_cuisines()
+    assert database_util.countries_with_more_restaurants(5) == util.countries_with_more_restaurants(5)
+    for countries in [None, ['India'], COUNTRIES]:
+        expected = util.dtframe if countries is None else util.get_items_with_these_countries(countries)
+        got = None if countries is None else database_util.get_items_with_these_countries(countries)
+        assert_same_rows(util.served_cuisines(None if countries is None else expected).reset_index(drop=True),
+                         database_util.served_cuisines(got).reset_index(drop=True))
+
+@pytest.mark.parametrize('countries', [None, ['India'], COUNTRIES])
+def test_kpis_are_exact(util, database_util, countries):
+    assert database_util.home_kpis(countries) == util.home_kpis(countries, inExact=True)
+    for column in ['city', 'unique_cuisine']:
+        assert database_util.distinct_count(column, countries) == util.distinct_count(column, countries, inExact=True)
+    for q in [0.0, 0.5, 0.9, 1.0]:
+        assert database_util.quantile('aggregate_rating', q, countries) == \
+               util.quantile('aggregate_rating', q, countries, inExact=True)
+
+def test_map_rows_match_the_frame(util, database_util):
+    assert_same_rows(util.city_centers(), database_util.city_centers())
+    assert_same_rows(util.nearest_restaurants(28.6, 77.2, 7), database_util.nearest_restaurants(28.6, 77.2, 7))
+    assert_same_rows(util.restaurants_within(-23.5, -46.6, 20), database_util.restaurants_within(-23.5, -46.6, 20))
+    selected = database_util.get_items_with_these_countries(['India'])
+    assert_same_rows(util.restaurant_density(util.get_items_with_these_countries(['India'])),
+                     database_util.restaurant_density(selected))
@@ -0,0 +1,101 @@
+import os
+import shutil
+import pandas as pd
+import dbutil
+from dbutil import DbUtil, DatasetStore, file_digest
+from rollup import RollupCube
+
+#..... Copy of the bundled CSV in a temporary folder (the store and the snapshot work on it)
+def copy_csv(inDatasetDir, inTmpPath) -> str:
+    path = os.path.join(str(inTmpPath), 'zomato.csv')
+    shutil.copy(os.path.join(inDatasetDir, 'zomato.csv'), path)
+    return path
+
+def test_snapshot_round_trip_hashes_the_csv_once(dataset_dir, tmp_path, cleaned, monkeypatch):
+    path = copy_csv(dataset_dir, tmp_path)
+    util = DbUtil()
+    util.dtframe = cleaned
+    util.SaveSnapshot(DbUtil.snapshot_file(path), file_digest(path))
+
+    calls = []
+    def counting_digest(inPath, *args):
+        calls.append(inPath)
+        return file_digest(inPath, *args)
+    monkeypatch.setattr(dbutil, 'file_digest', counting_digest)
+
+    entry = DatasetStore().get(path, DbUtil.load_and_cleanse)
+    assert calls == [path]
+    assert entry.fingerprints is None
+    pd.testing.assert_frame_equal(entry.frame, cleaned, check_categorical=False, check_dtype=False)
+
+#..... Every derived object of a loaded entry, built through a DbUtil on it
+def derived_objects(inEntry) -> dict:
+    util = DbUtil()
+    util.dataset, util.dtframe = inEntry, inEntry.view()
+    return {'rollup': util.rollup(), 'kpi_table': util.kpi_table(), 'sketches': util.sketches(),
+            'value_index': util.value_index('country_name'), 'spatial_index': util.spatial_index(),
+            'leaderboard': util.leaderboard(), 'cuisine_index': util.cuisine_index()}
+
+#..... The raw CSV with rows modified, removed and added
+def edited_csv(inPath) -> None:
+    raw = pd.read_csv(inPath)
+    raw.loc[10, 'Aggregate rating'] = 1.2
+    raw.loc[20, 'Cuisines'] = 'Sushi, Pizza'
+    raw.loc[30, 'City'] = 'Nowhere'
+    raw.loc[40, ['Restaurant Name', 'Votes']] = ['Renamed', 12345]
+    removed = raw.loc[raw['Country Code'] == 214].index          # every row of one country
+    raw = raw.drop(index=list(removed) + [50, 60])
+    added = raw.iloc[100:103].copy()
+    added['Restaurant ID'] = [1, 2, 3]
+    added['Country Code'] = 14
+    raw = pd.concat([raw.iloc[:500], added, raw.iloc[500:]])
+    raw.to_csv(inPath, index=False)
+
+def test_refresh_matches_a_full_reload(dataset_dir, tmp_path):
+    path = copy_csv(dataset_dir, tmp_path)
+    store = DatasetStore()
+    before = store.get(path, DbUtil.load_and_cleanse, inRefresher=DbUtil.refresh_cleansed)
+    derived_objects(before)
+    edited_csv(path)
+    refreshed = store.get(path, DbUtil.load_and_cleanse, inRefresher=DbUtil.refresh_cleansed)
+    assert refreshed is not before
+    # Carried over from the delta; the position-based ones are rebuilt on first use
+    assert set(refreshed.derived) == {'rollup', 'kpi_table', 'sketches'}
+    full = DatasetStore().get(path, DbUtil.load_and_cleanse)
+    got, expected = derived_objects(refreshed), derived_objects(full)
+
+    pd.testing.assert_frame_equal(refreshed.frame, full.frame)
+    sort = lambda cells: cells.sort_values(list(cells.columns)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(sort(got['rollup'].cells), sort(expected['rollup'].cells), check_dtype=False)
+
+    countries = sorted(full.frame['country_name'].unique())
+    for selection in [None, countries[:1], countries[2:6], ['India', 'Australia', 'Brazil']]:
+        for sketches in (None, 'sketches'):
+            header = lambda objects: objects['kpi_table'].header(selection, sketches and objects[sketches])
+            assert header(got) == header(expected)
+        for column in ['aggregate_rating', 'average_cost_for_two']:
+            assert got['sketches'].quantile(column, 0.5, selection) == expected['sketches'].quantile(column, 0.5, selection)
+    pd.testing.assert_frame_equal(got['kpi_table'].table, expected['kpi_table'].table)
+    assert 'United Arab Emirates' not in got['kpi_table'].table.index
+
+    assert got['value_index'].keys() == expected['value_index'].keys()
+    assert all((got['value_index'][k] == v).all() for k, v in expected['value_index'].items())
+    assert (got['spatial_index'].nearest(28.6, 77.2, 25)[0] == expected['spatial_index'].nearest(28.6, 77.2, 25)[0]).all()
+    assert (got['leaderboard'].top('Pizza', 10) == expected['leaderboard'].top('Pizza', 10)).all()
+    pd.testing.assert_frame_equal(got['cuisine_index'].qty_cuisines_per_city(), expected['cuisine_index'].qty_cuisines_per_city())
+
+def test_cube_built_offline_is_loaded_while_fresh(dataset_dir, tmp_path, cleaned, monkeypatch):
+    path = copy_csv(dataset_dir, tmp_path)
+    cube = RollupCube(cleaned, 2)
+    DbUtil.SaveCube(cube, DbUtil.cube_file(path), file_digest(path))
+
+    entry = DatasetStore().get(path, DbUtil.load_and_cleanse)
+    util = DbUtil()
+    util.dataset, util.dtframe = entry, entry.view()
+    # Loaded, not aggregated again
+    monkeypatch.setattr(DbUtil, 'aggregation_workers', staticmethod(lambda: 1 / 0))
+    pd.testing.assert_frame_equal(util.rollup().cells, RollupCube(cleaned).cells)
+
+    with open(path, 'a', encoding='utf-8') as fp:
+        fp.write('\n')
+    assert DbUtil.LoadCube(path) is None